@@ -5,6 +5,11 @@ import re
 import shutil
 import time
 
+try:
+    from pyvcsshark.parser.commitgraph import CommitGraph
+except ImportError:
+    CommitGraph = None
+
 class Repository(object):
 
     def __init__(self, config):
@@ -52,6 +57,25 @@ class Repository(object):
         branches = references-tags
         commits = set()
 
+        # The commit graph of vcsSHARK holds the parents of every commit, so the history can be walked without reading
+        # the commits from the object database. It is created next to the clone if it does not exist yet
+        if CommitGraph is not None:
+            self.logger.info("Walking the commit graph...")
+            graph = CommitGraph.open(self.repository)
+            tips = []
+            for branch in branches:
+                index = graph.index(self.repository.lookup_reference(branch).peel().id)
+
+                # References, which do not point to a commit (e.g. a tag of a tree), are not part of the graph
+                if index is None:
+                    self.logger.info("Skipping reference %s, which does not point to a commit" % branch)
+                    continue
+                tips.append(index)
+
+            for index in graph.walk(tips):
+                commits.add(graph.getHash(index))
+            return sorted(commits)
+
         self.logger.info("Getting branch information...")
         for branch in branches:
             self.logger.info("Getting information from branch %s" % branch)
@@ -1,5 +1,15 @@
 from mongoengine import Document, StringField, ListField, ObjectIdField, DictField, BooleanField, DateTimeField, \
-    IntField
+    IntField, EmbeddedDocument, EmbeddedDocumentField, BinaryField
+
+
+class RefTip(EmbeddedDocument):
+    """ Document that inherits from :class:`mongoengine.EmbeddedDocument`. Holds the target of one reference at the end of a run.
+
+    :property name: name of the reference (type: :class:`mongoengine.fields.StringField`)
+    :property revisionHash: hash of the target of the reference (type: :class:`mongoengine.fields.StringField`)
+    """
+    name = StringField(required=True)
+    revisionHash = StringField(max_length=50, required=True)
 
 
 class Project(Document):
@@ -8,6 +18,7 @@ class Project(Document):
     :property url: url to the project repository (type: :class:`mongoengine.fields.StringField`)
     :property name: name of the project (type: :class:`mongoengine.fields.StringField`)
     :property repositoryType: type of the repository (type: :class:`mongoengine.fields.StringField`)
+    :property refTips: targets of all references at the end of the last run (type: :class:`mongoengine.fields.ListField(:class:`mongoengine.fields.EmbeddedDocumentField(:class:`testimpshark.mongomodel.RefTip`)`)`)
 
     .. NOTE:: Unique (or primary key) is the field url.
     """
@@ -15,6 +26,7 @@ class Project(Document):
     url = StringField(max_length=400, required=True, unique=True)
     name = StringField(max_length=100, required=True)
     repositoryType = StringField(max_length=15)
+    refTips = ListField(EmbeddedDocumentField(RefTip))
 
 class File(Document):
     """ Document that inherits from :class:`mongoengine.Document`. Holds information for the file collection.
@@ -60,6 +72,18 @@ class TestState(Document):
     error = BooleanField()
 
 
+class EmbeddedHunk(EmbeddedDocument):
+    """ Document that inherits from :class:`mongoengine.EmbeddedDocument`. Holds a hunk, which is embedded in its file action \
+    (see: :class:`testimpshark.mongomodel.Hunk` for the fields). The field names in the database are shortened, as they \
+    are repeated for every hunk.
+    """
+    new_start = IntField(db_field='ns', required=True)
+    new_lines = IntField(db_field='nl', required=True)
+    old_start = IntField(db_field='os', required=True)
+    old_lines = IntField(db_field='ol', required=True)
+    content = StringField(db_field='c', required=True)
+
+
 class FileAction(Document):
     """ Document that inherits from :class:`mongoengine.Document`. Holds information for the fileaction collection.
 
@@ -77,14 +101,20 @@ class FileAction(Document):
     :property isBinary: indicates if the file is a binary file or not (type: :class:`mongoengine.fields.BooleanField`)
     :property oldFilePathId: object id of old file (if it was moved or copied) (type: :class:`mongoengine.fields.ObjectIdField`)
     :property hunkIds: list of ids to the different hunks of this action (type: :class:`mongoengine.fields.ListField(:class:`mongoengine.fields.ObjectIdField`)`)
+    :property hunks: list of the hunks of this action, if they are embedded (type: :class:`mongoengine.fields.ListField(:class:`mongoengine.fields.EmbeddedDocumentField(:class:`testimpshark.mongomodel.EmbeddedHunk`)`)`)
+    :property compressedHunks: hunks of this action, if they are compressed (type: :class:`mongoengine.fields.BinaryField`)
+    :property hunkCompression: compression of the compressed hunks: zlib or zstd (type: :class:`mongoengine.fields.StringField`)
 
     .. NOTE:: Unique (or primary key) are the fields: projectId, fileId, and revisionHash.
 
     .. NOTE:: oldFilePathId only exists, if the file was created due to a copy or move action
 
+    .. NOTE:: Only one of hunkIds, hunks and compressedHunks is set, depending on the hunk storage of the vcsSHARK run
+
 
     """
     MODES = ('A', 'M', 'D', 'C', 'T')
+    COMPRESSIONS = ('zlib', 'zstd')
     #pk fileId, revisionhash, projectId
     projectId = ObjectIdField(required=True,unique_with=['fileId', 'revisionHash'] )
     fileId = ObjectIdField(required=True,unique_with=['projectId', 'revisionHash'] )
@@ -98,6 +128,9 @@ class FileAction(Document):
     # oldFilePathId is only set, if we detected a copy or move operation
     oldFilePathId = ObjectIdField()
     hunkIds = ListField(ObjectIdField())
+    hunks = ListField(EmbeddedDocumentField(EmbeddedHunk))
+    compressedHunks = BinaryField()
+    hunkCompression = StringField(max_length=4, choices=COMPRESSIONS)
 
 
 class Commit(Document):
@@ -116,6 +149,10 @@ class Commit(Document):
     :property committerOffset: offset of the committerDate (type: :class:`mongoengine.fields.IntField`)
     :property message: commit message (type: :class:`mongoengine.fields.StringField`)
     :property fileActionIds: list of file action ids, which belong to the commit (type: :class:`mongoengine.fields.ListField(:class:`mongoengine.fields.ObjectIdField`)`)
+    :property similarityMode: detection of renamed and copied files, which produced the file actions: off, renames, copies or exact (type: :class:`mongoengine.fields.StringField`)
+    :property fileActionChunks: number of parts, in which the file actions of a big commit were stored, while the commit is not complete (type: :class:`mongoengine.fields.IntField`)
+    :property storedFileActionChunks: number of these parts, which are stored already (type: :class:`mongoengine.fields.IntField`)
+    :property streamedCommitterDate: committer date of a commit, which is set as committerDate, as soon as all parts are stored (type: :class:`mongoengine.fields.DateTimeField`)
 
     .. NOTE:: Unique (or primary key) are the fields projectId and revisionHash.
     """
@@ -134,7 +171,10 @@ class Commit(Document):
     committerOffset = IntField()
     message = StringField()
     fileActionIds = ListField(ObjectIdField())
-
+    similarityMode = StringField(max_length=10)
+    fileActionChunks = IntField()
+    storedFileActionChunks = IntField()
+    streamedCommitterDate = DateTimeField()
 
     def __str__(self):
         return ""
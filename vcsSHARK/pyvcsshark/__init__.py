@@ -73,6 +73,48 @@ def start():
     parser.add_argument('-p', '--db-port', help='Port, where the database server is listening', default=27017, type=int)
     parser.add_argument('--path', help='Path to the checked out repository directory', default=os.getcwd(), type=readable_dir)
     parser.add_argument('-n', '--project-name', help='Name of the project, that is analyzed', required=True)
+    parser.add_argument('--diff-level', help='Level of detail of the stored diffs: hunks and line statistics (full), only line statistics (stats) \
+                                             or only the changed paths (names)', default='full', choices=Config.DIFF_LEVELS)
+    parser.add_argument('--diff-cache-dir', help='Directory of the on-disk cache for parsed diffs. If not set, no cache is used', default=None)
+    parser.add_argument('--diff-cache-size', help='Maximum size of the diff cache in megabytes', default=1024, type=int)
+    parser.add_argument('--rename-detection', help='Detection of renamed and copied files: off, renames or copies (renames and copies)',
+                        default='copies', choices=Config.RENAME_DETECTIONS)
+    parser.add_argument('--rename-limit', help='If the deleted files times the added files of a commit exceed the square of this limit, \
+                                               only renames with identical content are detected', default=1000, type=int)
+    parser.add_argument('--worker-type', help='Type of the parsing workers: processes or threads', default='processes',
+                        choices=Config.WORKER_TYPES)
+    parser.add_argument('--cache-max-size', help='Size of the libgit2 object cache of every process in megabytes, threads share one \
+                                                  (0: derived from the memory)',
+                        default=0, type=int)
+    parser.add_argument('--mwindow-size', help='Size of a memory mapped packfile window in megabytes (0: libgit2 default)', default=0, type=int)
+    parser.add_argument('--mwindow-mapped-limit', help='Limit of memory mapped packfiles of every process in megabytes (0: derived from the memory)',
+                        default=0, type=int)
+    parser.add_argument('--include-paths', help='Glob patterns of the paths, which are diffed. If not set, every path is diffed',
+                        default=[], nargs='+')
+    parser.add_argument('--exclude-paths', help='Glob patterns of the paths, which are not diffed at all (e.g. vendor/*)',
+                        default=[], nargs='+')
+    parser.add_argument('--stats-only-size', help='For files above this size in bytes, only line statistics are stored (0: no limit)',
+                        default=0, type=int)
+    parser.add_argument('--split-threshold', help='Commits with more changed files are diffed by several workers in parallel (0: never split)',
+                        default=10000, type=int)
+    parser.add_argument('--ref-include', help='Glob patterns of the references, which are parsed. If not set, every reference is parsed',
+                        default=[], nargs='+')
+    parser.add_argument('--ref-exclude', help='Glob patterns of the references, which are ignored (e.g. refs/pull/*)',
+                        default=[], nargs='+')
+    parser.add_argument('--since', help='Only parse commits committed at or after this date (YYYY-MM-DD, YYYY-MM-DDTHH:MM:SS in UTC or e.g. 90d)',
+                        default=None)
+    parser.add_argument('--until', help='Only parse commits committed at or before this date (a date without time includes the whole day)',
+                        default=None)
+    parser.add_argument('--branches', help='Only parse the history of these branches (names or glob patterns)', default=[], nargs='+')
+    parser.add_argument('--report-file', help='Path of a JSON file, where the timings of the parser and the slowest commits are written to',
+                        default=None)
+    parser.add_argument('--report-top', help='Number of slowest commits in the timing report', default=20, type=int)
+    parser.add_argument('--hunk-storage', help='Storage of the hunks: one document per hunk (collection), embedded in the file action \
+                                               (embedded) or compressed in the file action (compressed)', default='collection',
+                        choices=Config.HUNK_STORAGES)
+    parser.add_argument('--hunk-deduplication', help='Store identical hunks of the project only once (only for the hunk storage collection)',
+                        action='store_true')
+    parser.add_argument('--memory-budget', help='Maximum size in megabytes of parsed commits, which are not stored yet', default=1024, type=int)
 
     logger.info("Reading out config from command line")
 
@@ -87,7 +129,30 @@ def start():
                     args.db_database,
                     args.db_hostname,
                     args.db_port,
-                    args.path
+                    args.path,
+                    args.diff_level,
+                    args.diff_cache_dir,
+                    args.diff_cache_size,
+                    args.rename_detection,
+                    args.rename_limit,
+                    args.memory_budget,
+                    args.worker_type,
+                    args.cache_max_size,
+                    args.mwindow_size,
+                    args.mwindow_mapped_limit,
+                    args.include_paths,
+                    args.exclude_paths,
+                    args.stats_only_size,
+                    args.split_threshold,
+                    args.ref_include,
+                    args.ref_exclude,
+                    args.since,
+                    args.until,
+                    args.branches,
+                    args.report_file,
+                    args.report_top,
+                    args.hunk_storage,
+                    args.hunk_deduplication
                     )
     
     # If config file was specified, overwrite the values
@@ -1,5 +1,5 @@
 import configparser
-from .utils import readable_dir
+from .utils import readable_dir, parse_date
 
 class ErrorLoadingConfig(Exception):
     """Exception class, which is used for config loading exceptions. """
@@ -19,15 +19,85 @@ class Config(object):
     :param db_port: port where the datastore is listening on
     :param db_authentication: database to authenticate against
     :param uri: path to the repository
+    :param diff_level: level of detail of the diffs, which are stored for every changed file. One of :attr:`DIFF_LEVELS`: \
+    **full** (hunks and line statistics), **stats** (only line statistics) or **names** (only the changed paths)
+    :param diff_cache_dir: directory of the on-disk cache for parsed diffs (see: :class:`pyvcsshark.parser.diffcache.DiffCache`). \
+    If it is None, no cache is used
+    :param diff_cache_size: maximum size of the diff cache in megabytes
+    :param rename_detection: which similarity detection is run on the changed files of a commit. One of :attr:`RENAME_DETECTIONS`: \
+    **off**, **renames** or **copies** (renames and copies)
+    :param rename_limit: if the number of deleted (and for copies: modified) files times the number of added files of a commit \
+    exceeds the square of this limit, only renames with identical content are detected
+    :param memory_budget: maximum size in megabytes of the parsed commits, which were handed over to the datastore, but are not stored yet. \
+    The parser blocks, while it is used up
+    :param worker_type: type of the parsing workers. One of :attr:`WORKER_TYPES`: **processes** or **threads**
+    :param cache_max_size: maximum size of the libgit2 object cache of every parsing process in megabytes (parsing threads share \
+    one cache). If it is 0, it is derived from the physical memory and the number of workers
+    :param mwindow_size: size of one memory mapped window of a packfile in megabytes. If it is 0, the libgit2 default is used
+    :param mwindow_mapped_limit: maximum size of memory mapped packfiles of every parsing process in megabytes. If it is 0, it is \
+    derived from the physical memory and the number of workers
+    :param include_paths: list of glob patterns (see: :mod:`fnmatch`). If it is not empty, only changed files, whose path or one \
+    of its parent directories matches a pattern, are diffed
+    :param exclude_paths: list of glob patterns. Changed files, whose path or one of its parent directories matches a pattern, \
+    are not diffed at all (e.g. vendored or generated code)
+    :param stats_only_size: size in bytes. For files above this size only the line statistics are stored and no hunks. \
+    If it is 0, the hunks of every file are stored
+    :param split_threshold: number of changed files. Commits with more changed files are split by path prefix and diffed by \
+    several parsing workers in parallel. If it is 0, commits are never split
+    :param ref_include: list of glob patterns (see: :mod:`fnmatch`). If it is not empty, only references, whose name matches \
+    one of them, are parsed (e.g. **refs/heads/***)
+    :param ref_exclude: list of glob patterns. References, whose name matches one of them, are ignored (e.g. **refs/pull/***)
+    :param since: only commits, which were committed at or after this date, are parsed (see: :func:`pyvcsshark.utils.parse_date`). \
+    The walk does not go beyond older commits
+    :param until: only commits, which were committed at or before this date, are parsed. A date without time includes the whole day
+    :param branches: list of branch names (e.g. **master** or **refs/remotes/origin/master**) or glob patterns of the branch references. \
+    If it is not empty, only the history of these branches is parsed
+    :param report_file: path of a JSON file, where the timing report of the parser is written to (see: \
+    :class:`pyvcsshark.parser.timingreport.TimingReport`). If it is None, no report is written
+    :param report_top: number of slowest commits, which are listed in the timing report
+    :param hunk_storage: how the datastore stores the hunks. One of :attr:`HUNK_STORAGES`: **collection** (one document per hunk), \
+    **embedded** (in the document of the file action) or **compressed** (as zstd or zlib compressed blob in the document of the file action)
+    :param hunk_deduplication: if it is true, identical hunks of a project (e.g. of cherry-picks and backports) are stored only once. \
+    It only applies to the hunk storage **collection**
+    
+    .. NOTE:: If since, until or branches is set, the run is a partial run (see: :func:`pyvcsshark.config.Config.isPartialRun`)
     """
     
+    DIFF_LEVELS = ('full', 'stats', 'names')
+    RENAME_DETECTIONS = ('off', 'renames', 'copies')
+    WORKER_TYPES = ('processes', 'threads')
+    HUNK_STORAGES = ('collection', 'embedded', 'compressed')
+    
     def __init__(self,
                  project_name,
                  db_driver="mongo",
                  db_database="vcsSHARK",
                  db_hostname="localhost",
                  db_port=27017,
-                 path="."
+                 path=".",
+                 diff_level="full",
+                 diff_cache_dir=None,
+                 diff_cache_size=1024,
+                 rename_detection="copies",
+                 rename_limit=1000,
+                 memory_budget=1024,
+                 worker_type="processes",
+                 cache_max_size=0,
+                 mwindow_size=0,
+                 mwindow_mapped_limit=0,
+                 include_paths=None,
+                 exclude_paths=None,
+                 stats_only_size=0,
+                 split_threshold=10000,
+                 ref_include=None,
+                 ref_exclude=None,
+                 since=None,
+                 until=None,
+                 branches=None,
+                 report_file=None,
+                 report_top=20,
+                 hunk_storage="collection",
+                 hunk_deduplication=False
                  ):
 
         self.project_name = project_name
@@ -36,8 +106,36 @@ class Config(object):
         self.db_hostname = db_hostname
         self.db_port = int(db_port)
         self.uri = path.rstrip('/')
+        self.diff_level = diff_level
+        self.diff_cache_dir = diff_cache_dir
+        self.diff_cache_size = int(diff_cache_size)
+        self.rename_detection = rename_detection
+        self.rename_limit = int(rename_limit)
+        self.memory_budget = int(memory_budget)
+        self.worker_type = worker_type
+        self.cache_max_size = int(cache_max_size)
+        self.mwindow_size = int(mwindow_size)
+        self.mwindow_mapped_limit = int(mwindow_mapped_limit)
+        self.include_paths = list(include_paths or [])
+        self.exclude_paths = list(exclude_paths or [])
+        self.stats_only_size = int(stats_only_size)
+        self.split_threshold = int(split_threshold)
+        self.ref_include = list(ref_include or [])
+        self.ref_exclude = list(ref_exclude or [])
+        self.since = parse_date(since)
+        self.until = parse_date(until, endOfDay=True)
+        self.branches = list(branches or [])
+        self.report_file = report_file
+        self.report_top = int(report_top)
+        self.hunk_storage = hunk_storage
+        self.hunk_deduplication = hunk_deduplication
         
     
+    def isPartialRun(self):
+        """ Returns true, if only a part of the history is parsed (a date range or a subset of the branches). Then, the branches
+        and tags of commits, which are already stored, are only extended and the references are not remembered for the next run."""
+        return self.since is not None or self.until is not None or bool(self.branches)
+    
     def _str2bool(self, v):
         """ Checks if a string containts yes, true, t or 1. This way we can check if
         a value is set to true in the config
@@ -52,8 +150,10 @@ class Config(object):
         :param section: section of the configruation, where the option is in
         :param option: option from which the value should be read
         :param returnBool: specifies if the return value should be a boolean
-        :param returnList: specifies if the return value should be a list"""
-        value = self.configParser.get(section,option)
+        :param returnList: specifies if the return value should be a list
+        
+        .. NOTE:: If the section or the option is not in the configuration file, the current value is kept"""
+        value = self.configParser.get(section, option, fallback=None)
         if(value != None and value):
             if(returnBool):
                 return self._str2bool(value)
@@ -84,6 +184,42 @@ class Config(object):
             self.db_hostname = self._readConfigOption("Database", "db_hostname")
             self.db_port = int(self._readConfigOption("Database", "db_port"))
             self.db_authentiacation = self._readConfigOption("Database", "db_authentication")
+            self.diff_level = self._readConfigOption("Parser", "diff_level")
+
+            self.diff_cache_dir = self._readConfigOption("Parser", "diff_cache_dir")
+            self.diff_cache_size = int(self._readConfigOption("Parser", "diff_cache_size"))
+            self.rename_detection = self._readConfigOption("Parser", "rename_detection")
+            self.rename_limit = int(self._readConfigOption("Parser", "rename_limit"))
+            self.memory_budget = int(self._readConfigOption("General", "memory_budget"))
+            self.worker_type = self._readConfigOption("Parser", "worker_type")
+            self.cache_max_size = int(self._readConfigOption("Parser", "cache_max_size"))
+            self.mwindow_size = int(self._readConfigOption("Parser", "mwindow_size"))
+            self.mwindow_mapped_limit = int(self._readConfigOption("Parser", "mwindow_mapped_limit"))
+            self.include_paths = [pattern.strip() for pattern in self._readConfigOption("Parser", "include_paths", returnList=True)]
+            self.exclude_paths = [pattern.strip() for pattern in self._readConfigOption("Parser", "exclude_paths", returnList=True)]
+            self.stats_only_size = int(self._readConfigOption("Parser", "stats_only_size"))
+            self.split_threshold = int(self._readConfigOption("Parser", "split_threshold"))
+            self.ref_include = [pattern.strip() for pattern in self._readConfigOption("Parser", "ref_include", returnList=True)]
+            self.ref_exclude = [pattern.strip() for pattern in self._readConfigOption("Parser", "ref_exclude", returnList=True)]
+            self.since = parse_date(self._readConfigOption("Parser", "since"))
+            self.until = parse_date(self._readConfigOption("Parser", "until"), endOfDay=True)
+            self.branches = [branch.strip() for branch in self._readConfigOption("Parser", "branches", returnList=True)]
+            self.report_file = self._readConfigOption("Parser", "report_file")
+            self.report_top = int(self._readConfigOption("Parser", "report_top"))
+            self.hunk_storage = self._readConfigOption("Database", "hunk_storage")
+            self.hunk_deduplication = self._readConfigOption("Database", "hunk_deduplication", returnBool=True)
+
+            if self.diff_level not in self.DIFF_LEVELS:
+                raise Exception("diff_level must be one of %s" % (", ".join(self.DIFF_LEVELS)))
+
+            if self.rename_detection not in self.RENAME_DETECTIONS:
+                raise Exception("rename_detection must be one of %s" % (", ".join(self.RENAME_DETECTIONS)))
+
+            if self.worker_type not in self.WORKER_TYPES:
+                raise Exception("worker_type must be one of %s" % (", ".join(self.WORKER_TYPES)))
+
+            if self.hunk_storage not in self.HUNK_STORAGES:
+                raise Exception("hunk_storage must be one of %s" % (", ".join(self.HUNK_STORAGES)))
 
             # Check if dirs are readable
             readable_dir(self.uri)
@@ -17,6 +17,8 @@ class BaseStore(metaclass=abc.ABCMeta):
     :property projectName: name of the project, which should be stored
     :property projectURL: url of the repository of the project, which should be stored
     :property repositoryType: type of the repository of the project, which should be stored
+    :property streamsFileActions: true, if the datastore implements :func:`pyvcsshark.datastores.basestore.BaseStore.addFileActions`. \
+    Otherwise, the parser hands over all changed files of a commit together with the commit
     
     
     
@@ -37,9 +39,12 @@ class BaseStore(metaclass=abc.ABCMeta):
     projectURL = None
     repositoryType = None
     
+    # Set to true by datastores, which implement addFileActions
+    streamsFileActions = False
+    
     @abc.abstractmethod
     def initialize(self, dbname=None, host=None, port=None, user=None , 
-                   password=None, projectname=None, repositoryURL=None, type=None, authentication_db=None):
+                   password=None, projectname=None, repositoryURL=None, type=None, authentication_db=None, config=None):
         """Initializes the datastore
         
         :param dbname: name of the database to use
@@ -51,6 +56,7 @@ class BaseStore(metaclass=abc.ABCMeta):
         :param repositoryURL: url of the repository, which is to be analyzed
         :param type: type of the repository, which is to be analyzed (e.g. "git")
         :param authentication_db: db where the user is authenticated against
+        :param config: object of class :class:`pyvcsshark.config.Config` with the options of the run (e.g. the diff level)
         """
         
         return
@@ -73,6 +79,65 @@ class BaseStore(metaclass=abc.ABCMeta):
         """
         return
 
+    def addCommits(self, commitModels):
+        """Adds a batch of commits to the datastore. Parsers hand over their commits in batches, so that a datastore, \
+        which sends the commits to other processes, does not need to do this for every single commit.
+        
+        :param commitModels: list of :class:`~pyvcsshark.dbmodels.models.CommitModel`
+        
+        .. WARNING:: This method is called by several processes at the same time without any lock. Implementations must be \
+        process safe (e.g. by using a :class:`~multiprocessing.Queue`).
+        
+        .. NOTE:: The default implementation calls :func:`pyvcsshark.datastores.basestore.BaseStore.addCommit` for every commit.
+        """
+        for commitModel in commitModels:
+            self.addCommit(commitModel)
+
+    def addFileActions(self, revisionHash, changedFiles):
+        """Adds a part of the changed files of a commit, before the commit itself is added. Parsers use it for commits with very \
+        many changes, so that they do not need to hold all changed files in memory at once. The commit, which is added afterwards, \
+        has the number of parts in its attribute streamedChunks and contains only the remaining changed files.
+        
+        It is only called, if :attr:`streamsFileActions` is true.
+        
+        :param revisionHash: revision hash of the commit
+        :param changedFiles: list of :class:`~pyvcsshark.dbmodels.models.FileModel`
+        
+        .. WARNING:: Like :func:`pyvcsshark.datastores.basestore.BaseStore.addCommits`, it is called by several processes at the same time \
+        without any lock. The parts of one commit and the commit itself can arrive in any order at the storage.
+        """
+        raise NotImplementedError("%s does not stream file actions" % (self.__class__.__name__))
+
+    def getStoredRevisionHashes(self):
+        """Returns a set of the revision hashes of all commits of the project, which are already stored in the datastore.
+        The parser does not diff these commits again. Instead, it calls :func:`pyvcsshark.datastores.basestore.BaseStore.addCommit` with a \
+        commit, which has no changed files, so that the datastore only needs to update the branches and tags of the commit.
+        
+        .. NOTE:: The default implementation returns an empty set. Therefore, every commit is parsed completely.
+        """
+        return set()
+
+    def getRefSnapshot(self):
+        """Returns the snapshot of the references, which was stored in the previous run via \
+        :func:`pyvcsshark.datastores.basestore.BaseStore.storeRefSnapshot`. It is a dictionary that maps the name of every reference \
+        to the hash of its target. The parser uses it to walk only the commits, which were added since the previous run.
+        
+        .. NOTE:: The default implementation returns an empty dictionary. Therefore, the whole history is walked.
+        """
+        return {}
+    
+    def storeRefSnapshot(self, snapshot):
+        """Stores the snapshot of the references for the next run. It is called after all commits were given to the datastore.
+        
+        :param snapshot: dictionary that maps the name of every reference to the hash of its target
+        
+        .. WARNING:: The snapshot must only be persisted after all commits, which were added before, are stored. Otherwise, \
+        commits could be missed in the next run, if the current one fails.
+        
+        .. NOTE:: The default implementation does not store anything.
+        """
+        return
+
     @abc.abstractmethod
     def deleteAll(self):
         """Deletes all data of one project from the datastore"""
@@ -0,0 +1,50 @@
+from collections import OrderedDict
+
+
+class IdCache(object):
+    """ Bounded cache, which maps the unique key of a document (e.g. the name and email of a person) to its object id. If the
+    cache is full, the least recently used entry is dropped. The storage processes use it, so that the documents, which come up
+    again and again, are not looked up for every commit.
+
+    :param maxSize: maximum number of entries
+
+    .. NOTE:: Every process has its own cache. A cache, which is filled before the processes are forked, is copied into each of them.
+    """
+
+    def __init__(self, maxSize):
+        self.maxSize = maxSize
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """ Returns the object id of the key or None, if it is not cached
+
+        :param key: unique key of the document
+        """
+        objectId = self.entries.get(key)
+        if objectId is not None:
+            self.entries.move_to_end(key)
+        return objectId
+
+    def put(self, key, objectId):
+        """ Caches the object id of the key and drops the least recently used entry, if the cache is full
+
+        :param key: unique key of the document
+        :param objectId: object id of class :class:`bson.objectid.ObjectId`
+        """
+        self.entries[key] = objectId
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxSize:
+            self.entries.popitem(last=False)
+
+    def warm(self, items):
+        """ Caches the object ids of the given (key, object id) tuples, as long as the cache is not full
+
+        :param items: iterable of tuples of the key and the object id
+        """
+        for key, objectId in items:
+            if len(self.entries) >= self.maxSize:
+                break
+            self.entries[key] = objectId
@@ -0,0 +1,61 @@
+import multiprocessing
+
+
+class MemoryBudget(object):
+    """ Budget for the memory of parsed commits, which were handed over to a datastore, but are not stored yet. It can be
+    shared between processes (it must be created before they are forked).
+
+    A producer calls :func:`pyvcsshark.datastores.memorybudget.MemoryBudget.acquire` with the approximate size of a batch
+    (see: :func:`pyvcsshark.dbmodels.models.CommitModel.getApproximateSize`) before it puts the batch into a queue and blocks
+    while the budget is used up. The consumer calls :func:`pyvcsshark.datastores.memorybudget.MemoryBudget.release`
+    after the batch is stored. This way, the parsing processes can not run ahead of the datastore.
+
+    :param maxBytes: maximum number of bytes that can be in flight
+
+    :property usedBytes: number of bytes, which are in flight at the moment
+    :property pendingBatches: number of batches, which are in flight at the moment (i.e. the depth of the queue)
+
+    .. NOTE:: A batch, which is bigger than the whole budget, is let through if nothing else is in flight. Otherwise, it would block forever.
+    """
+
+    def __init__(self, maxBytes):
+        self.maxBytes = maxBytes
+        self.condition = multiprocessing.Condition()
+        self._usedBytes = multiprocessing.RawValue('q', 0)
+        self._pendingBatches = multiprocessing.RawValue('q', 0)
+
+    @property
+    def usedBytes(self):
+        return self._usedBytes.value
+
+    @property
+    def pendingBatches(self):
+        return self._pendingBatches.value
+
+    def isUsedUp(self, size):
+        """ Returns true, if a batch of the given size does not fit into the budget at the moment
+
+        :param size: size of the batch in bytes
+        """
+        return self._pendingBatches.value > 0 and self._usedBytes.value+size > self.maxBytes
+
+    def acquire(self, size):
+        """ Takes the given number of bytes from the budget. Blocks, while the budget is used up.
+
+        :param size: size of the batch in bytes
+        """
+        with self.condition:
+            while self.isUsedUp(size):
+                self.condition.wait()
+            self._usedBytes.value += size
+            self._pendingBatches.value += 1
+
+    def release(self, size):
+        """ Gives the given number of bytes back to the budget and wakes up the waiting producers
+
+        :param size: size of the batch in bytes, as it was given to :func:`pyvcsshark.datastores.memorybudget.MemoryBudget.acquire`
+        """
+        with self.condition:
+            self._usedBytes.value -= size
+            self._pendingBatches.value -= 1
+            self.condition.notify_all()
@@ -1,25 +1,51 @@
-from pymongo.errors import DocumentTooLarge, DuplicateKeyError
+from bson import BSON, ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
 from pyvcsshark.datastores.basestore import BaseStore
+from pyvcsshark.datastores.memorybudget import MemoryBudget
+from pyvcsshark.datastores.idcache import IdCache
 from pyvcsshark.dbmodels.mongomodels import *
 from mongoengine import connect, NotUniqueError
 
 import multiprocessing
+import threading
 import logging
+import timeit
+import hashlib
 import os
+from queue import Empty
+from concurrent.futures import ThreadPoolExecutor
 
 
 class MongoStore(BaseStore):
     """ Datastore implementation for saving data to the mongodb. Inherits from :class:`pyvcsshark.datastores.basestore.BaseStore`.
 
     :property commitqueue: instance of a :class:`multiprocessing.JoinableQueue`, which  \
-    holds objects of :class:`pyvcsshark.dbmodels.models.CommitModel`, that should be put into the mongodb
+    holds tuples of a list of objects of :class:`pyvcsshark.dbmodels.models.CommitModel`, that should be put into the mongodb, and their size. \
+    Parts of the changed files of a commit (see: :func:`pyvcsshark.datastores.mongostore.MongoStore.addFileActions`) are put into it as tuples \
+    of a tuple of the revision hash and the changed files, and their size
+    :property memoryBudget: instance of :class:`pyvcsshark.datastores.memorybudget.MemoryBudget`, which bounds the size of the commits \
+    in the commitqueue. Its usedBytes and pendingBatches show the current state of the queue
+    :property processes: list of the storage processes of class :class:`pyvcsshark.datastores.mongostore.CommitStorageProcess`
+    :property hunkQueue: instance of a :class:`multiprocessing.Queue`, where every storage process puts the ids of the deduplicated \
+    hunks, which it did not delete, when it exits (see: :func:`pyvcsshark.datastores.mongostore.MongoStore.finalize`)
     :property NUMBER_OF_PROCESSES: holds the number of processes by calling :func:`multiprocessing.cpu_count`
+    :property MONITOR_INTERVAL: interval in seconds, in which the state of the commitqueue is logged
+    :property PEOPLE_CACHE_SIZE: maximum number of people ids, which every storage process caches (see: :class:`pyvcsshark.datastores.idcache.IdCache`)
+    :property FILE_CACHE_SIZE: maximum number of file ids, which every storage process caches
     :property logger: holds the logging instance, by calling logging.getLogger("store")
     """
 
     commitqueue = None
+    memoryBudget = None
+    processes = None
+    hunkQueue = None
+    refSnapshot = None
+    streamsFileActions = True
     NUMBER_OF_PROCESSES = multiprocessing.cpu_count()
+    MONITOR_INTERVAL = 30
+    PEOPLE_CACHE_SIZE = 10000
+    FILE_CACHE_SIZE = 100000
     logger = logging.getLogger("store")
 
     def __init__(self):
@@ -32,6 +58,7 @@ class MongoStore(BaseStore):
                    projectname,
                    repositoryURL,
                    type=None,
+                   config=None,
                    ):
         """Initializes the mongostore by connecting to the mongodb, creating the project in the project collection \
         and setting up processes (see: :class:`pyvcsshark.datastores.mongostore.CommitStorageProcess`, which
@@ -43,19 +70,36 @@ class MongoStore(BaseStore):
         :param projectname: name of the project of the repository which is parsed
         :param repositoryURL: url of the repository which is parsed
         :param type: type of the repository which is parsed (e.g. git)
+        :param config: object of class :class:`pyvcsshark.config.Config`. The diff level (hunks are only stored, if it is **full**), \
+        the memory budget, if it is a partial run (then, the branches and tags of stored commits are only extended), the hunk storage \
+        and the hunk deduplication are used here
         """
 
         self.repositoryURL = repositoryURL
+        diffLevel = 'full'
+        memoryBudget = 1024
+        additive = False
+        hunkStorage = 'collection'
+        hunkDeduplication = False
+        if config is not None:
+            diffLevel = config.diff_level
+            memoryBudget = config.memory_budget
+            additive = config.isPartialRun()
+            hunkStorage = config.hunk_storage
+            hunkDeduplication = config.hunk_deduplication
+        self.memoryBudget = MemoryBudget(memoryBudget*1024*1024)
 
         self.logger.info("Initializing MongoStore...")
         # Create queue for multiprocessing
         self.commitqueue = multiprocessing.JoinableQueue()
+        self.hunkQueue = multiprocessing.Queue()
         # We define, that the user we authenticate with is in the admin database
         self.logger.info("Connecting to MongoDB...")
         connect(dbname, host=host, port=port, connect=False)
 
         # Update project if project with the same url is already in the mongodb and add if not
         project = Project.objects(url=repositoryURL).upsert_one(url=repositoryURL, repositoryType=type, name=projectname)
+        self.projectId = project.id
 
         # Get the last commit by date of the project (if there is any)
         lastCommitDate = Commit.objects(projectId=project.id).only('committerDate').order_by('-committerDate').first()
@@ -63,14 +107,104 @@ class MongoStore(BaseStore):
         if lastCommitDate is not None:
             lastCommitDate = lastCommitDate.committerDate
 
+        self.deleteIncompleteCommits(project.id)
+
+        # The caches are warmed once, every process gets a copy of them
+        peopleCache, fileCache = self.createIdCaches(project.id)
+
         # Start worker, they will wait till something comes into the queue and then process it
+        self.processes = []
         for i in range(self.NUMBER_OF_PROCESSES):
-            process = CommitStorageProcess(self.commitqueue, project.id, lastCommitDate,  dbname, host, port)
+            process = CommitStorageProcess(self.commitqueue, self.memoryBudget, project.id, lastCommitDate,  dbname, host, port, diffLevel,
+                                           additive, hunkStorage, hunkDeduplication, peopleCache, fileCache, self.hunkQueue)
             process.daemon=True
             process.start()
+            self.processes.append(process)
 
         self.logger.info("Starting storage Process...")
 
+        self.monitorStopped = threading.Event()
+        monitor = threading.Thread(target=self.monitorQueue)
+        monitor.daemon = True
+        monitor.start()
+
+    def deleteIncompleteCommits(self, projectId):
+        """Deletes the commits of the project, whose file actions were stored in parts, but which were not completed (see: \
+        :func:`pyvcsshark.datastores.mongostore.CommitStorageProcess.completeCommit`), e.g. because the previous run was aborted, \
+        together with their file actions and hunks. They are parsed again.
+
+        :param projectId: object id of class :class:`bson.objectid.ObjectId` from the project
+        """
+        revisionHashes = list(Commit.objects(projectId=projectId, committerDate__exists=False).scalar('revisionHash'))
+        if not revisionHashes:
+            return
+
+        self.logger.info("Deleting %d incomplete commits of the previous run..." % (len(revisionHashes)))
+        self.deleteHunks(self.deleteFileActions(FileAction.objects(projectId=projectId, revisionHash__in=revisionHashes)))
+        Commit.objects(projectId=projectId, revisionHash__in=revisionHashes).delete()
+
+    @staticmethod
+    def deleteFileActions(fileActions):
+        """Deletes file actions and returns the set of the ids of their hunks, which are not deleted here (see: \
+        :func:`pyvcsshark.datastores.mongostore.MongoStore.deleteHunks`).
+
+        :param fileActions: queryset of class :class:`mongoengine.queryset.QuerySet` with the file actions
+        """
+        hunkIds = set()
+        for fileAction in fileActions.only('hunkIds'):
+            hunkIds.update(fileAction.hunkIds)
+        fileActions.delete()
+        return hunkIds
+
+    @staticmethod
+    def deleteHunks(hunkIds):
+        """Deletes the hunks with the given ids. Hunks, which are still referenced by file actions, are kept, as they can be shared, \
+        if the hunks are deduplicated (see: :func:`pyvcsshark.datastores.mongostore.CommitStorageProcess.getHunkId`).
+
+        :param hunkIds: iterable of the ids of the hunks
+
+        .. WARNING:: A file action, which references a deduplicated hunk, can still wait in a storage process. Therefore, deduplicated \
+        hunks must only be deleted, while no storage process runs.
+        """
+        hunkIds = set(hunkIds)
+        if hunkIds:
+            sharedHunkIds = set(FileAction.objects(hunkIds__in=list(hunkIds)).distinct('hunkIds'))
+            Hunk.objects(id__in=list(hunkIds - sharedHunkIds)).delete()
+
+    def createIdCaches(self, projectId):
+        """Creates the caches of the people and file ids (see: :class:`pyvcsshark.datastores.idcache.IdCache`) and warms them \
+        with the documents of the project, which are already stored. Returns a tuple of both caches.
+
+        :param projectId: object id of class :class:`bson.objectid.ObjectId` from the project
+
+        .. NOTE:: People do not belong to a project. Only the authors and committers of the stored commits of the project are cached.
+
+        .. NOTE:: Tags are not cached, as they can be deleted by every storage process (see: \
+        :func:`pyvcsshark.datastores.mongostore.CommitStorageProcess.checkAndUpdateBranchesAndTags`) and the copies of the cache \
+        in the other processes would still hand out their ids
+        """
+        peopleCache = IdCache(self.PEOPLE_CACHE_SIZE)
+        fileCache = IdCache(self.FILE_CACHE_SIZE)
+
+        commits = Commit.objects(projectId=projectId)
+        peopleIds = set(commits.distinct('authorId')) | set(commits.distinct('committerId'))
+        peopleIds.discard(None)
+        if peopleIds:
+            people = People.objects(id__in=list(peopleIds)).only('id', 'name', 'email').limit(self.PEOPLE_CACHE_SIZE)
+            peopleCache.warm(((person.name, person.email), person.id) for person in people)
+
+        files = File.objects(projectId=projectId).only('id', 'path').limit(self.FILE_CACHE_SIZE)
+        fileCache.warm((file.path, file.id) for file in files)
+
+        self.logger.info("Cached the ids of %d people and %d files" % (len(peopleCache), len(fileCache)))
+        return peopleCache, fileCache
+
+    def monitorQueue(self):
+        """Logs the depth and the size of the commitqueue every :attr:`MONITOR_INTERVAL` seconds, until the store is finalized"""
+        while not self.monitorStopped.wait(self.MONITOR_INTERVAL):
+            self.logger.info("Storage queue: %d batches with %0.1f MB waiting to be stored" %
+                             (self.memoryBudget.pendingBatches, self.memoryBudget.usedBytes/(1024*1024)))
+
 
 
     @property
@@ -81,10 +215,55 @@ class MongoStore(BaseStore):
 
     def addCommit(self, commitModel):
         """Adds commits of class :class:`pyvcsshark.dbmodels.models.CommitModel` to the commitqueue"""
+        self.addCommits([commitModel])
+        return
+
+    def addCommits(self, commitModels):
+        """Adds a list of commits of class :class:`pyvcsshark.dbmodels.models.CommitModel` to the commitqueue. The list is put into the
+        queue as a whole, so that it is pickled only once.
+
+        .. NOTE:: Blocks, while the memory budget is used up (see: :class:`pyvcsshark.datastores.memorybudget.MemoryBudget`)"""
+        size = sum(commitModel.getApproximateSize() for commitModel in commitModels)
+        if self.memoryBudget.isUsedUp(size):
+            self.logger.debug("Memory budget is used up (%d batches with %d bytes), waiting..." %
+                              (self.memoryBudget.pendingBatches, self.memoryBudget.usedBytes))
+        self.memoryBudget.acquire(size)
+
         # add to queue
-        self.commitqueue.put(commitModel)
+        self.commitqueue.put((commitModels, size))
         return
 
+    def addFileActions(self, revisionHash, changedFiles):
+        """Adds a part of the changed files of a commit to the commitqueue. They are stored as file actions and their ids are \
+        added to the commit document, which is created if it does not exist yet (see: \
+        :func:`pyvcsshark.datastores.mongostore.CommitStorageProcess.storeFileActions`).
+
+        :param revisionHash: revision hash of the commit
+        :param changedFiles: list of :class:`pyvcsshark.dbmodels.models.FileModel`
+
+        .. NOTE:: Blocks, while the memory budget is used up (see: :class:`pyvcsshark.datastores.memorybudget.MemoryBudget`)"""
+        size = sum(changedFile.getApproximateSize() for changedFile in changedFiles)
+        self.memoryBudget.acquire(size)
+        self.commitqueue.put(((revisionHash, changedFiles), size))
+
+    def getStoredRevisionHashes(self):
+        """Returns a set of the revision hashes of all commits of the project, which are already stored in the mongodb. Commits,
+        whose file actions were stored in parts, but which were not stored themselves, do not count."""
+        return set(Commit.objects(projectId=self.projectId, committerDate__exists=True).scalar('revisionHash'))
+
+    def getRefSnapshot(self):
+        """Returns the snapshot of the references of the previous run, which is stored in the project document"""
+        project = Project.objects(id=self.projectId).only('refTips').first()
+        return dict((refTip.name, refTip.revisionHash) for refTip in project.refTips)
+
+    def storeRefSnapshot(self, snapshot):
+        """Remembers the snapshot of the references. It is written into the project document in \
+        :func:`pyvcsshark.datastores.mongostore.MongoStore.finalize`, after all commits are stored.
+
+        :param snapshot: dictionary that maps the name of every reference to the hash of its target
+        """
+        self.refSnapshot = snapshot
+
     def deleteAll(self):
         """Deletes all data of one project from the datastore
 
@@ -120,38 +299,286 @@ class MongoStore(BaseStore):
         return
 
     def finalize(self):
-        """Wait till all commits are processed, by calling a join on the queue"""
+        """Wait till all commits are processed, by calling a join on the queue. Afterwards, the storage processes are stopped, the \
+        deduplicated hunks, which they did not delete, are deleted, if they are not referenced anymore (see: \
+        :func:`pyvcsshark.datastores.mongostore.CommitStorageProcess.resolveDuplicateCommit`), and the snapshot of the references is stored."""
         self.commitqueue.join()
+        self.monitorStopped.set()
+
+        # Every process hands over its hunks with its poison pill
+        for process in self.processes:
+            self.commitqueue.put((None, 0))
+        hunkIds = set()
+        for process in self.processes:
+            hunkIds.update(self.hunkQueue.get())
+        for process in self.processes:
+            process.join()
+        if hunkIds:
+            self.logger.info("Deleting the unreferenced ones of %d deduplicated hunks..." % (len(hunkIds)))
+            self.deleteHunks(hunkIds)
+
+        if self.refSnapshot is not None:
+            refTips = [RefTip(name=name, revisionHash=revisionHash) for name, revisionHash in self.refSnapshot.items()]
+            Project.objects(id=self.projectId).update_one(set__refTips=refTips)
         self.logger.info("Storing Process complete...")
         return
 
 
 class CommitStorageProcess(multiprocessing.Process):
     """Class that inherits from :class:`multiprocessing.Process` for processing instances of class :class:`pyvcsshark.dbmodels.models.CommitModel` \
-    and writing it into the mongodb
+    and writing it into the mongodb. The commit documents are not saved one by one, but collected and inserted together (see: \
+    :func:`pyvcsshark.datastores.mongostore.CommitStorageProcess.flushCommits`), as soon as :attr:`MAX_PENDING_COMMITS` commits or \
+    :attr:`MAX_PENDING_BYTES` bytes are collected or the first of them waits for :attr:`FLUSH_INTERVAL` seconds. The ids of the hunks, \
+    file actions and commits are created here, so that the documents do not wait for each other's ids.
 
-    :param queue: queue, where the :class:`pyvcsshark.dbmodels.models.CommitModel` are stored in
+    :param queue: queue, where the lists of :class:`pyvcsshark.dbmodels.models.CommitModel` are stored in
+    :param memoryBudget: object of class :class:`pyvcsshark.datastores.memorybudget.MemoryBudget`, which is released after a list is stored
     :param projectId: object id of class :class:`bson.objectid.ObjectId` from the project
     :param lastCommitDate: object of class :class:`datetime.datetime`, which holds the last commit that was parsed
+    :param diffLevel: level of detail of the changed files (see: :attr:`pyvcsshark.config.Config.DIFF_LEVELS`)
+    :param additive: if it is true, the branches and tags of commits, which are already stored, are only extended and never \
+    removed. It is used for partial runs, which do not see all branches and tags of a commit
+    :param hunkStorage: how the hunks are stored (see: :attr:`pyvcsshark.config.Config.HUNK_STORAGES`): as documents of the hunk \
+    collection, embedded in the file action or compressed in the file action (see: :func:`pyvcsshark.dbmodels.mongomodels.FileAction.compressHunks`)
+    :param hunkDeduplication: if it is true, identical hunks of the project are stored only once in the hunk collection and shared by \
+    the file actions (see: :func:`pyvcsshark.datastores.mongostore.CommitStorageProcess.getHunkId`)
+    :param peopleCache: object of class :class:`pyvcsshark.datastores.idcache.IdCache`, which maps the name and email of a person \
+    to the id of its document. If it is None, an empty cache is created
+    :param fileCache: object of class :class:`pyvcsshark.datastores.idcache.IdCache`, which maps the path of a file to the id of its document
+    :param hunkQueue: queue (e.g. :class:`multiprocessing.Queue`), where the process puts the list of the ids of the deduplicated hunks, \
+    which it did not delete, when it gets its poison pill
+
+    :property pendingCommits: list of tuples of the commit documents of class :class:`pyvcsshark.dbmodels.mongomodels.Commit`, which \
+    are not inserted yet, and their :class:`pyvcsshark.dbmodels.models.CommitModel`
+    :property pendingHunks: list of the hunk documents (see: :func:`mongoengine.Document.to_mongo`), which are not inserted yet
+    :property pendingHunkIds: set of the ids of the pending hunks, so that a deduplicated hunk is only collected once
+    :property pendingFileActions: list of the file action documents, which are not inserted yet
+    :property keptHunkIds: set of the ids of deduplicated hunks of deleted file actions, which could still be referenced by the file \
+    actions of other processes (see: :func:`pyvcsshark.datastores.mongostore.CommitStorageProcess.resolveDuplicateCommit`)
+    :property hunkIdsOfFileActions: dictionary, which maps the ids of the file actions, which were inserted since the last flush, to \
+    the ids of their hunks. A commit, which is a duplicate, removes the hunks of its file actions with it (see: \
+    :func:`pyvcsshark.datastores.mongostore.CommitStorageProcess.resolveDuplicateCommit`)
+    :property pendingSizes: list of the sizes of the tasks, which were taken from the queue, but are not marked as done yet
+    :property executor: object of class :class:`concurrent.futures.ThreadPoolExecutor`, which inserts the hunks and the file actions \
+    at the same time. It is created, when the process is started
+
+    .. NOTE:: A task is only marked as done and its size is only given back to the memory budget, after its commits are inserted. \
+    Therefore, :func:`pyvcsshark.datastores.mongostore.MongoStore.finalize` waits for the last insert.
     """
-    def __init__(self, queue, projectId, lastCommitDate, dbname, host, port):
+
+    MAX_PENDING_COMMITS = 1000
+    MAX_PENDING_BYTES = 16*1024*1024
+    FLUSH_INTERVAL = 1.0
+
+    # Error code of mongodb for a violated unique index and the maximum size of a document
+    DUPLICATE_KEY_ERROR = 11000
+    MAX_DOCUMENT_BYTES = 16*1024*1024
+
+    def __init__(self, queue, memoryBudget, projectId, lastCommitDate, dbname, host, port, diffLevel='full', additive=False,
+                 hunkStorage='collection', hunkDeduplication=False, peopleCache=None, fileCache=None, hunkQueue=None):
         multiprocessing.Process.__init__(self)
         connect(dbname, host=host, port=port)
         self.queue = queue
+        self.memoryBudget = memoryBudget
         self.projectId = projectId
         self.lastCommitDate = lastCommitDate
+        self.diffLevel = diffLevel
+        self.additive = additive
+        self.hunkStorage = hunkStorage
+        self.hunkDeduplication = hunkDeduplication
+        self.logger = logging.getLogger("store")
+        self.peopleCache = peopleCache if peopleCache is not None else IdCache(MongoStore.PEOPLE_CACHE_SIZE)
+        self.fileCache = fileCache if fileCache is not None else IdCache(MongoStore.FILE_CACHE_SIZE)
+        self.hunkQueue = hunkQueue
+        self.keptHunkIds = set()
+        self.pendingCommits = []
+        self.pendingHunks = []
+        self.pendingHunkIds = set()
+        self.pendingFileActions = []
+        self.hunkIdsOfFileActions = {}
+        self.pendingSizes = []
+        self.firstPendingTime = None
+        self.executor = None
 
     def run(self):
-        """ Endless loop for the processes, which consists of several steps:
+        """ Endless loop for the processes, which gets a list of objects of class :class:`pyvcsshark.dbmodels.models.CommitModel` \
+        from the queue and stores every commit via :func:`pyvcsshark.datastores.mongostore.CommitStorageProcess.storeCommit`.
+        Parts of the changed files of a commit are stored via :func:`pyvcsshark.datastores.mongostore.CommitStorageProcess.storeFileActions`.
+        The collected commit documents are inserted, if a limit is reached or if no task arrives, before the first of them waited
+        for :attr:`FLUSH_INTERVAL` seconds. The process exits, when it gets a poison pill (a task, which is None).
+        """
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        while True:
+            try:
+                task, size = self.queue.get(timeout=self.getFlushTimeout())
+            except Empty:
+                self.flushCommits()
+                continue
+
+            if task is None:
+                self.flushCommits()
+                if self.hunkQueue is not None:
+                    self.hunkQueue.put(list(self.keptHunkIds))
+                self.queue.task_done()
+                break
+
+            if isinstance(task, tuple):
+                self.storeFileActions(*task)
+            else:
+                for commit in task:
+                    self.storeCommit(commit)
+            self.pendingSizes.append(size)
+
+            if not self.pendingCommits or self.isFlushDue():
+                self.flushCommits()
+
+    def getFlushTimeout(self):
+        """ Returns the time in seconds, until the collected commits must be inserted, or None, if no commit is collected """
+        if self.firstPendingTime is None:
+            return None
+        return max(0, self.firstPendingTime+self.FLUSH_INTERVAL-timeit.default_timer())
+
+    def isFlushDue(self):
+        """ Returns true, if one of the limits of the collected commits is reached """
+        return len(self.pendingCommits) >= self.MAX_PENDING_COMMITS or sum(self.pendingSizes) >= self.MAX_PENDING_BYTES or \
+            self.getFlushTimeout() == 0
+
+    def flushCommits(self):
+        """ Inserts the collected documents, marks the tasks as done and gives their sizes back to the memory budget. The hunks and
+        file actions are inserted first (see: :func:`pyvcsshark.datastores.mongostore.CommitStorageProcess.insertFileActions`), the
+        commits afterwards (see: :func:`pyvcsshark.datastores.mongostore.CommitStorageProcess.insertCommits`).
+
+        .. NOTE:: A commit document is only inserted, after its file actions are stored. Otherwise, an aborted run could leave a \
+        commit, which counts as stored, without its file actions.
+        """
+        self.hunkIdsOfFileActions.update(self.insertFileActions())
+        if self.pendingCommits:
+            self.insertCommits(self.pendingCommits, self.hunkIdsOfFileActions)
 
-        1. Get a object of class :class:`pyvcsshark.dbmodels.models.CommitModel` from the queue
-        2. Check if this commit was stored before and if it is so: update branches and tags (if they have changed)
-        3. Store author and committer in mongodb
-        4. Store Tags in mongodb
-        5. Create a list of branches, where the commit belongs to
-        6. Save the different file actions, which were done in this commit in the mongodb
-        7. Save the commit itself
+        for size in self.pendingSizes:
+            self.memoryBudget.release(size)
+            self.queue.task_done()
+        self.pendingCommits = []
+        self.hunkIdsOfFileActions = {}
+        self.pendingSizes = []
+        self.firstPendingTime = None
+
+    def isTooLarge(self, document, contentBytes=None):
+        """ Returns true, if the document exceeds :attr:`MAX_DOCUMENT_BYTES`. It is only encoded, if its content could exceed the limit.
+
+        :param document: document (see: :func:`mongoengine.Document.to_mongo`)
+        :param contentBytes: upper bound of the size of the document in bytes (e.g. 4 bytes per character of its strings). If it is \
+        None, the document is always encoded
+        """
+        if contentBytes is not None and contentBytes <= self.MAX_DOCUMENT_BYTES:
+            return False
+        return len(BSON.encode(document)) > self.MAX_DOCUMENT_BYTES
+
+    def insertDocuments(self, documentClass, documents):
+        """ Inserts documents with one unordered bulk insert and returns the list of write errors (dictionaries with the index of \
+        the document, the error code and the error message)
 
+        :param documentClass: class of the documents (e.g. :class:`pyvcsshark.dbmodels.mongomodels.Hunk`)
+        :param documents: list of documents (see: :func:`mongoengine.Document.to_mongo`)
+        """
+        if not documents:
+            return []
+
+        try:
+            documentClass._get_collection().insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            return e.details['writeErrors']
+        return []
+
+    def insertFileActions(self):
+        """ Inserts the collected hunks and file actions. Both collections are written at the same time by the executor, as \
+        their ids were created before. Returns a dictionary, which maps the ids of the file actions to the ids of their hunks.
+
+        .. NOTE:: If the hunks are deduplicated, a hunk, whose id exists already, is stored. Its duplicate key error is ignored.
+        """
+        hunks, fileActions = self.pendingHunks, self.pendingFileActions
+        self.pendingHunks = []
+        self.pendingHunkIds = set()
+        self.pendingFileActions = []
+
+        hunkErrors = self.executor.submit(self.insertDocuments, Hunk, hunks)
+        fileActionErrors = self.executor.submit(self.insertDocuments, FileAction, fileActions)
+        for error in hunkErrors.result():
+            if self.hunkDeduplication and error['code'] == self.DUPLICATE_KEY_ERROR:
+                continue
+            self.logger.error("Could not store hunk %s: %s" % (hunks[error['index']]['_id'], error['errmsg']))
+        for error in fileActionErrors.result():
+            self.logger.error("Could not store file action of %s in %s: %s" % (fileActions[error['index']]['fileId'],
+                                                                               fileActions[error['index']]['revisionHash'], error['errmsg']))
+        return dict((fileAction['_id'], fileAction.get('hunkIds', [])) for fileAction in fileActions)
+
+    def insertCommits(self, pendingCommits, hunkIdsOfFileActions=None):
+        """ Inserts commit documents with one unordered bulk insert. A document, which violates the unique index, does not stop the
+        others. It is handed over to :func:`pyvcsshark.datastores.mongostore.CommitStorageProcess.resolveDuplicateCommit`.
+
+        :param pendingCommits: list of tuples of the commit documents of class :class:`pyvcsshark.dbmodels.mongomodels.Commit` and \
+        their :class:`pyvcsshark.dbmodels.models.CommitModel`
+        :param hunkIdsOfFileActions: dictionary, which maps the ids of the file actions, which were inserted before, to the ids of their hunks
+
+        .. NOTE:: pymongo raises :class:`pymongo.errors.DocumentTooLarge` in the middle of a bulk insert, after a part of the documents \
+        was inserted. Therefore, documents above :attr:`MAX_DOCUMENT_BYTES` are left out before.
+        """
+        documents = []
+        commits = []
+        for mongoCommit, commit in pendingCommits:
+            document = mongoCommit.to_mongo()
+            if self.isTooLarge(document):
+                self.logger.error("Could not store commit %s: document too large" % (commit.id))
+                continue
+            documents.append(document)
+            commits.append(commit)
+
+        hunkIdsOfFileActions = hunkIdsOfFileActions or {}
+        for error in self.insertDocuments(Commit, documents):
+            if error['code'] == self.DUPLICATE_KEY_ERROR:
+                document = documents[error['index']]
+                hunkIds = [hunkId for fileActionId in document.get('fileActionIds', [])
+                           for hunkId in hunkIdsOfFileActions.get(fileActionId, [])]
+                self.resolveDuplicateCommit(commits[error['index']], document, hunkIds)
+            else:
+                self.logger.error("Could not store commit %s: %s" % (commits[error['index']].id, error['errmsg']))
+
+    def resolveDuplicateCommit(self, commit, document, hunkIds=()):
+        """ Handles a commit, which is already stored (e.g. by another run of the project at the same time). The file actions and hunks,
+        which were created for it, are deleted again and the branches and tags of the stored commit are updated (see: \
+        :func:`pyvcsshark.datastores.mongostore.CommitStorageProcess.checkAndUpdateBranchesAndTags`).
+
+        :param commit: object of class :class:`pyvcsshark.dbmodels.models.CommitModel`
+        :param document: document of the commit, which could not be inserted
+        :param hunkIds: ids of the hunks, which were inserted for the file actions of the commit
+
+        .. NOTE:: The hunks are deleted by their ids and not only via the stored file actions, so that the hunks of a file action, \
+        which could not be inserted, are removed as well.
+
+        .. NOTE:: Deduplicated hunks are not deleted here, as a file action of another process, which is not inserted yet, can \
+        reference them. They are kept until all processes are stopped (see: :func:`pyvcsshark.datastores.mongostore.MongoStore.finalize`).
+        """
+        hunkIds = MongoStore.deleteFileActions(FileAction.objects(id__in=document.get('fileActionIds', []))) | set(hunkIds)
+        if self.hunkDeduplication:
+            self.keptHunkIds.update(hunkIds)
+        else:
+            MongoStore.deleteHunks(hunkIds)
+
+        oldCommit = Commit.objects(projectId=self.projectId, revisionHash=commit.id, committerDate__exists=True).first()
+        if oldCommit is not None:
+            self.checkAndUpdateBranchesAndTags(commit, oldCommit)
+
+    def storeCommit(self, commit):
+        """ Stores one commit, which consists of several steps:
+
+        1. Check if this commit was stored before and if it is so: update branches and tags (if they have changed)
+        2. Store author and committer in mongodb
+        3. Store Tags in mongodb
+        4. Create a list of branches, where the commit belongs to
+        5. Save the different file actions, which were done in this commit in the mongodb
+        6. Save the commit itself
+
+        :param commit: object of class :class:`pyvcsshark.dbmodels.models.CommitModel`
 
         .. NOTE:: The committer date is used to check if a commit was already stored before. Meaning: We get the \
         last commit out of the database and check if the committer date of the commits we process are > than the \
@@ -159,53 +586,126 @@ class CommitStorageProcess(multiprocessing.Process):
 
         .. WARNING:: We only look for changed tags and branches here for already processed commits!
         """
-        while True:
-            commit = self.queue.get()
-
-            # Check if commitdate > lastcommit date
-            if self.lastCommitDate is not None and commit.committerDate <= self.lastCommitDate:
-                oldCommit = Commit.objects(projectId=self.projectId, revisionHash=commit.id).first()
-
-                if oldCommit is not None:
-                    # We have parsed that commit before, now we need to check if branches or tags were changed
-                    self.checkAndUpdateBranchesAndTags(commit, oldCommit)
-
-                    # Nothing more than branches or tags can be changed, therefore we only need to update the commit here
-                    self.queue.task_done()
-                    continue
+        # Check if commitdate > lastcommit date
+        if self.lastCommitDate is not None and commit.committerDate <= self.lastCommitDate:
+            oldCommit = Commit.objects(projectId=self.projectId, revisionHash=commit.id, committerDate__exists=True).first()
+
+            if oldCommit is not None:
+                # We have parsed that commit before, now we need to check if branches or tags were changed
+                self.checkAndUpdateBranchesAndTags(commit, oldCommit)
+
+                # Nothing more than branches or tags can be changed, therefore we only need to update the commit here
+                return
+
+        # Create people
+        authorId = self.createPeople(commit.author.name, commit.author.email)
+        committerId = self.createPeople(commit.committer.name, commit.committer.email)
+
+        # Create tag list
+        tagIds = self.createTagList(commit.tags)
+
+        # Create branchlist
+        branches = self.createBranchList(commit.branches)
+
+
+        # Create fileActions
+        fileActionIds = self.createFileActions(commit.changedFiles, commit.id)
+
+
+        # The parts of the file actions can be stored by other processes before or after the commit. The commit is only completed,
+        # when all of them are stored
+        if commit.hasStreamedFiles:
+            self.hunkIdsOfFileActions.update(self.insertFileActions())
+            document = self.updateCommit(commit.id,
+                                         set__branches=branches,
+                                         set__tagIds=tagIds,
+                                         set__parents=commit.parents,
+                                         set__authorId=authorId,
+                                         set__authorDate=commit.authorDate,
+                                         set__authorOffset=commit.authorOffset,
+                                         set__committerId=committerId,
+                                         set__streamedCommitterDate=commit.committerDate,
+                                         set__committerOffset=commit.committerOffset,
+                                         set__message=commit.message,
+                                         set__similarityMode=commit.similarityMode,
+                                         set__fileActionChunks=commit.streamedChunks,
+                                         push_all__fileActionIds=fileActionIds)
+            self.completeCommit(document)
+            return
+
+        # Create Revision object, it is inserted together with the other collected commits
+        mongoCommit = Commit(id=ObjectId(),
+                             projectId = self.projectId,
+                             revisionHash = commit.id,
+                             branches = branches,
+                             tagIds = tagIds ,
+                             parents=commit.parents,
+                             authorId=authorId,
+                             authorDate=commit.authorDate,
+                             authorOffset=commit.authorOffset,
+                             committerId=committerId,
+                             committerDate=commit.committerDate,
+                             committerOffset=commit.committerOffset,
+                             message=commit.message,
+                             fileActionIds= fileActionIds,
+                             similarityMode=commit.similarityMode)
+        mongoCommit.validate()
+
+        if self.firstPendingTime is None:
+            self.firstPendingTime = timeit.default_timer()
+        self.pendingCommits.append((mongoCommit, commit))
+
+    def storeFileActions(self, revisionHash, files):
+        """ Stores a part of the changed files of a commit as file actions (see: :func:`pyvcsshark.datastores.mongostore.CommitStorageProcess.createFileActions`),
+        adds their ids to the commit document and counts the part as stored.
+
+        :param revisionHash: revision hash of the commit
+        :param files: list of changed files of type :class:`pyvcsshark.dbmodels.models.FileModel`
 
-            # Create people
-            authorId = self.createPeople(commit.author.name, commit.author.email)
-            committerId = self.createPeople(commit.committer.name, commit.committer.email)
+        .. NOTE:: Until the commit itself and all parts are stored, the commit document has no committer date and does not count \
+        as stored (see: :func:`pyvcsshark.datastores.mongostore.CommitStorageProcess.completeCommit`).
+        """
+        fileActionIds = self.createFileActions(files, revisionHash)
 
-            # Create tag list
-            tagIds = self.createTagList(commit.tags)
+        # The file actions of the collected commits are inserted as well, their hunks are still needed for the flush
+        self.hunkIdsOfFileActions.update(self.insertFileActions())
+        document = self.updateCommit(revisionHash, push_all__fileActionIds=fileActionIds, inc__storedFileActionChunks=1)
+        self.completeCommit(document)
 
-            # Create branchlist
-            branches = self.createBranchList(commit.branches)
+    def updateCommit(self, revisionHash, **update):
+        """ Updates the commit document of the project with the given revision hash and creates it, if it does not exist. Returns
+        the updated document.
 
+        :param revisionHash: revision hash of the commit
+        :param update: update of :func:`mongoengine.queryset.QuerySet.modify` (e.g. push_all__fileActionIds)
 
-            # Create fileActions
-            fileActionIds = self.createFileActions(commit.changedFiles, commit.id)
+        .. NOTE:: The parts of a commit can be stored by several processes at the same time. If two of them create the document, \
+        the unique index lets one of them fail, which then updates the document of the other one.
+        """
+        commits = Commit.objects(projectId=self.projectId, revisionHash=revisionHash)
+        try:
+            return commits.modify(upsert=True, new=True, **update)
+        except (DuplicateKeyError, NotUniqueError):
+            return commits.modify(new=True, **update)
 
+    def completeCommit(self, document):
+        """ Sets the committer date of a commit, whose file actions were stored in parts, as soon as the commit itself and all parts
+        are stored. Then, the commit counts as stored.
 
-            # Create Revision object#
-            mongoCommit = Commit(projectId = self.projectId,
-                                 revisionHash = commit.id,
-                                 branches = branches,
-                                 tagIds = tagIds ,
-                                 parents=commit.parents,
-                                 authorId=authorId,
-                                 authorDate=commit.authorDate,
-                                 authorOffset=commit.authorOffset,
-                                 committerId=committerId,
-                                 committerDate=commit.committerDate,
-                                 committerOffset=commit.committerOffset,
-                                 message=commit.message,
-                                 fileActionIds= fileActionIds).save()
+        :param document: commit document of class :class:`pyvcsshark.dbmodels.mongomodels.Commit`, as returned by \
+        :func:`pyvcsshark.datastores.mongostore.CommitStorageProcess.updateCommit`
 
+        .. NOTE:: The parts and the commit arrive in any order at the storage processes. Every update returns the document after it \
+        was applied atomically. Therefore, exactly the process, which stores the last of them, sees that all are stored. If the run \
+        is aborted before, the commit is deleted in the next run (see: :func:`pyvcsshark.datastores.mongostore.MongoStore.deleteIncompleteCommits`).
+        """
+        if document.fileActionChunks is None or (document.storedFileActionChunks or 0) < document.fileActionChunks:
+            return
 
-            self.queue.task_done()
+        Commit.objects(id=document.id, committerDate__exists=False).update_one(set__committerDate=document.streamedCommitterDate,
+                                                                               unset__streamedCommitterDate=True,
+                                                                               unset__fileActionChunks=True,
+                                                                               unset__storedFileActionChunks=True)
 
     def checkAndUpdateBranchesAndTags(self, commit, oldCommit):
         """ Method that checks if the commit that was stored in the database has the same
@@ -222,6 +722,11 @@ class CommitStorageProcess(multiprocessing.Process):
         oldBranchList = set(oldCommit.branches)
         newBranchList = set(self.createBranchList(commit.branches))
 
+        # A partial run only knows a part of the branches and tags
+        if self.additive:
+            newTagList |= oldTagList
+            newBranchList |= oldBranchList
+
         # If they are not equal, we need to update the commit and delete old tags
         if(oldTagList != newTagList):
             tagsToDelete = list(oldTagList - newTagList)
@@ -286,13 +791,37 @@ class CommitStorageProcess(multiprocessing.Process):
         :param email: email of the contributer
 
         .. NOTE:: The call to :func:`mongoengine.queryset.QuerySet.upsert_one` is thread/process safe
+
+        .. NOTE:: If the id is cached, nothing is stored or looked up
         """
+        people_id = self.peopleCache.get((name, email))
+        if people_id is not None:
+            return people_id
+
         try:
             people_id = People(name=name, email=email).save().id
         except (DuplicateKeyError, NotUniqueError):
             people_id = People.objects(name=name, email=email).only('id').get().id
+        self.peopleCache.put((name, email), people_id)
         return people_id
 
+    def createFile(self, path):
+        """ Creates a file object of type :class:`pyvcsshark.dbmodels.mongomodels.File` and returns the object id of the
+        type :class:`bson.objectid.ObjectId` of the stored object. If the id is cached, nothing is stored or looked up.
+
+        :param path: path of the file
+        """
+        file_id = self.fileCache.get(path)
+        if file_id is not None:
+            return file_id
+
+        try:
+            file_id = File(projectId=self.projectId, path=path, name=os.path.basename(path)).save().id
+        except (DuplicateKeyError, NotUniqueError):
+            file_id = File.objects(projectId=self.projectId, path=path, name=os.path.basename(path)).only('id').get().id
+        self.fileCache.put(path, file_id)
+        return file_id
+
     def createFileActions(self, files, revisionHash):
         """ Creates a list of object ids of type :class:`bson.objectid.ObjectId` for the different file actions of the commit by
         transforming the files into file actions of type :class:`pyvcsshark.dbmodels.mongomodels.FileAction`, :class:`pyvcsshark.dbmodels.mongomodels.File`, and
@@ -303,52 +832,45 @@ class CommitStorageProcess(multiprocessing.Process):
 
         .. NOTE:: The call to :func:`mongoengine.queryset.QuerySet.upsert_one` is thread/process safe
 
-        .. NOTE:: Hunks (type :class:`pyvcsshark.dbmodels.mongomodels.Hunk`)  and the file action itself are inserted via bulk insert.
+        .. NOTE:: Hunks (type :class:`pyvcsshark.dbmodels.mongomodels.Hunk`) and the file actions get their ids here and are only \
+        collected. They are inserted via bulk insert (see: :func:`pyvcsshark.datastores.mongostore.CommitStorageProcess.insertFileActions`).
+
+        .. NOTE:: Hunks are only stored, if the diff level is **full**. Depending on the hunk storage, they are stored in the hunk collection \
+        (see: :func:`pyvcsshark.datastores.mongostore.CommitStorageProcess.createHunks`) or in the file action. If the hunks do not fit \
+        into the file action, only the line statistics are stored.
         """
 
-        fileActionList = []
+        fileActionIds = []
         for file in files:
 
             # Check if the file was a copy or move action (then the oldPath attribute is not None)
             old_file_id = None
             if file.oldPath is not None:
-                try:
-                    old_file_id = File(projectId=self.projectId, path=file.oldPath,
-                                       name=os.path.basename(file.oldPath)).save().id
-                except (DuplicateKeyError, NotUniqueError):
-                    old_file_id = File.objects(projectId=self.projectId, path=file.oldPath,
-                                               name=os.path.basename(file.oldPath)).only('id').get().id
-
-            # Create hunk objects for bulk insert
-            hunks = []
-            for hunk in file.hunks:
-                mongoHunk = Hunk(new_start=hunk.new_start, new_lines=hunk.new_lines, old_start=hunk.old_start,
-                                 old_lines=hunk.old_lines, content=hunk.content)
-                hunks.append(mongoHunk)
+                old_file_id = self.createFile(file.oldPath)
 
-            # Get hunk ids from insert if hunks is not empty
+            # Create the hunks (only if hunks are wanted at all)
             hunkIds = []
-            if hunks:
-                try:
-                    hunkIds = Hunk.objects.insert(hunks, load_bulk=False)
-                except DocumentTooLarge:
-                    for hunk in hunks:
-                        try:
-                            hunkIds.append(hunk.save().id)
-                        except DocumentTooLarge:
-                            #TODO
-                            pass
-
+            embeddedHunks = []
+            compressedHunks = None
+            hunkCompression = None
+            hunkBytes = 0
+            if self.diffLevel == 'full' and file.hunks:
+                if self.hunkStorage == 'embedded':
+                    embeddedHunks = [EmbeddedHunk(new_start=hunk.new_start, new_lines=hunk.new_lines, old_start=hunk.old_start,
+                                                  old_lines=hunk.old_lines, content=hunk.content) for hunk in file.hunks]
+                    hunkBytes = sum(4*len(hunk.content)+64 for hunk in file.hunks)
+                elif self.hunkStorage == 'compressed':
+                    compressedHunks, hunkCompression = FileAction.compressHunks(file.hunks)
+                    hunkBytes = len(compressedHunks)
+                else:
+                    hunkIds = self.createHunks(file, revisionHash)
 
             # Create a new file object
-            try:
-                new_file_id = File(projectId=self.projectId, path=file.path, name=os.path.basename(file.path)).save().id
-            except (DuplicateKeyError, NotUniqueError):
-                new_file_id = File.objects(projectId=self.projectId, path=file.path,
-                                           name=os.path.basename(file.path)).only('id').get().id
+            new_file_id = self.createFile(file.path)
 
             # Create the new file action and append it to the file action list for bulk insert
-            fileAction = FileAction(projectId=self.projectId,
+            fileAction = FileAction(id=ObjectId(),
+                                    projectId=self.projectId,
                                     fileId=new_file_id,
                                     revisionHash=revisionHash,
                                     sizeAtCommit=file.size,
@@ -357,23 +879,62 @@ class CommitStorageProcess(multiprocessing.Process):
                                     isBinary = file.isBinary,
                                     mode = file.mode,
                                     hunkIds = hunkIds,
-                                    oldFilePathId=old_file_id)
-            fileActionList.append(fileAction)
-            
-        # Bulk insert all action ids
-        fileActionIds = [] 
-        if fileActionList:
-            try:
-                fileActionIds = FileAction.objects.insert(fileActionList, load_bulk=False)
-            except DocumentTooLarge:
-                for fileAction in fileActionList:
-                    try:
-                        fileActionIds.append(fileAction.save().id)
-                    except DocumentTooLarge:
-                        pass
+                                    hunks = embeddedHunks,
+                                    compressedHunks = compressedHunks,
+                                    hunkCompression = hunkCompression,
+                                    oldFilePathId=old_file_id).to_mongo()
+
+            if self.isTooLarge(fileAction, hunkBytes+1024):
+                self.logger.error("Could not store the hunks of %s in %s: document too large" % (file.path, revisionHash))
+                for field in ('hunks', 'compressedHunks', 'hunkCompression'):
+                    fileAction.pop(field, None)
+            self.pendingFileActions.append(fileAction)
+            fileActionIds.append(fileAction['_id'])
 
         return fileActionIds
 
+    def createHunks(self, file, revisionHash):
+        """ Creates the hunk documents of type :class:`pyvcsshark.dbmodels.mongomodels.Hunk` of a changed file for the bulk insert and
+        returns their object ids
+
+        :param file: changed file of type :class:`pyvcsshark.dbmodels.models.FileModel`
+        :param revisionHash: revisionhash of the commit which is processed
+        """
+        hunkIds = []
+        for hunk in file.hunks:
+            hunkId = self.getHunkId(hunk)
+            if hunkId in self.pendingHunkIds:
+                hunkIds.append(hunkId)
+                continue
+
+            mongoHunk = Hunk(id=hunkId, new_start=hunk.new_start, new_lines=hunk.new_lines, old_start=hunk.old_start,
+                             old_lines=hunk.old_lines, content=hunk.content).to_mongo()
+
+            # A character takes at most 4 bytes, only hunks with a huge content need to be encoded to know their size
+            if self.isTooLarge(mongoHunk, 4*len(hunk.content)+64):
+                self.logger.error("Could not store hunk of %s in %s: document too large" % (file.path, revisionHash))
+                continue
+            self.pendingHunks.append(mongoHunk)
+            self.pendingHunkIds.add(hunkId)
+            hunkIds.append(hunkId)
+        return hunkIds
+
+    def getHunkId(self, hunk):
+        """ Returns the object id of type :class:`bson.objectid.ObjectId` for a hunk. Without deduplication, every hunk gets a new one.
+        With deduplication, the id consists of the first 12 bytes of the SHA-1 hash of the project id, the positions and the content
+        of the hunk. Therefore, identical hunks of cherry-picks, backports or rebased commits get the same id and are stored once.
+
+        :param hunk: hunk of type :class:`pyvcsshark.dbmodels.models.Hunk`
+
+        .. NOTE:: The project id is part of the hash, so that no hunk is shared between projects and deleting a project does \
+        not touch the hunks of another one.
+        """
+        if not self.hunkDeduplication:
+            return ObjectId()
+
+        key = "%s:%d:%d:%d:%d:" % (self.projectId, hunk.old_start, hunk.old_lines, hunk.new_start, hunk.new_lines)
+        return ObjectId(hashlib.sha1(key.encode('utf-8')+hunk.content.encode('utf-8', 'surrogateescape')).digest()[:12])
+
     @staticmethod
     def create_chunks(list, n):
         """Yield successive n-sized chunks from huks.
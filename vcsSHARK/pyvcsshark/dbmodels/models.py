@@ -15,13 +15,16 @@ class CommitModel(object):
     :param authorOffset: offset for the authordate (timezone)
     :param committerDate: date of the commit (must be a UNIX timestamp)
     :param committerOffset: offset for the committerdate (timezone)
+    :param similarityMode: which detection of renamed and copied files produced the changed files (e.g. **copies** for git)
+    :param streamedChunks: number of parts of the changed files, which were handed over to the datastore before the commit \
+    (see: :func:`pyvcsshark.datastores.basestore.BaseStore.addFileActions`). Then, the changed files are only the last part
     
     .. NOTE:: If your parser do not provide all information, then just use the default ones
     """
     
     def __init__(self, id, branches=[], tags=[], parents=[], 
                  author=None, committer=None, message=None, changedFiles=[], authorDate=None,
-                 authorOffset=None, committerDate=None, committerOffset=None):
+                 authorOffset=None, committerDate=None, committerOffset=None, similarityMode=None, streamedChunks=0):
         self.id = id
         self.branches = branches
         self.tags = tags
@@ -34,6 +37,13 @@ class CommitModel(object):
         self.authorOffset = authorOffset
         self.committerDate = committerDate
         self.committerOffset = committerOffset
+        self.similarityMode = similarityMode
+        self.streamedChunks = streamedChunks
+        
+    @property
+    def hasStreamedFiles(self):
+        """ True, if a part of the changed files was handed over to the datastore before the commit """
+        return self.streamedChunks > 0
         
     @property
     def authorDate(self):
@@ -125,6 +135,13 @@ class CommitModel(object):
         
         self._changedFiles = value
         
+    def getApproximateSize(self):
+        """ Returns the approximate size of the commit in bytes. It is dominated by the message and the content of the hunks
+        and is used to bound the size of batches of commits."""
+        size = 256 + len(self.message or "")
+        for file in self.changedFiles or []:
+            size += file.getApproximateSize()
+        return size
         
 
     def __str__(self):
@@ -185,6 +202,13 @@ class FileModel(object):
             raise Exception("Hunks must be a list!")
         
         self._hunks = value
+        
+    def getApproximateSize(self):
+        """ Returns the approximate size of the changed file in bytes, which is dominated by the content of the hunks"""
+        size = 64 + len(self.path)
+        for hunk in self.hunks or []:
+            size += 32 + len(hunk.content)
+        return size
 
 
 class Hunk(object):
@@ -1,4 +1,26 @@
-from mongoengine import Document, StringField, DateTimeField, ListField, DateTimeField, IntField, BooleanField, ObjectIdField
+from mongoengine import Document, StringField, DateTimeField, ListField, DateTimeField, IntField, BooleanField, ObjectIdField,\
+    EmbeddedDocument, EmbeddedDocumentField, BinaryField
+import json
+import zlib
+
+# zstd is optional, without it the hunks are compressed with zlib
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class EmbeddedHunk(EmbeddedDocument):
+    """ Document that inherits from :class:`mongoengine.EmbeddedDocument`. Holds a hunk, which is embedded in its file action \
+    (see: :class:`pyvcsshark.dbmodels.mongomodels.Hunk` for the fields). The field names in the database are shortened, as they \
+    are repeated for every hunk.
+    """
+    new_start = IntField(db_field='ns', required=True)
+    new_lines = IntField(db_field='nl', required=True)
+    old_start = IntField(db_field='os', required=True)
+    old_lines = IntField(db_field='ol', required=True)
+    content = StringField(db_field='c', required=True)
+
 
 class FileAction(Document):
     """ Document that inherits from :class:`mongoengine.Document`. Holds information for the fileaction collection.
@@ -17,14 +39,22 @@ class FileAction(Document):
     :property isBinary: indicates if the file is a binary file or not (type: :class:`mongoengine.fields.BooleanField`)
     :property oldFilePathId: object id of old file (if it was moved or copied) (type: :class:`mongoengine.fields.ObjectIdField`)
     :property hunkIds: list of ids to the different hunks of this action (type: :class:`mongoengine.fields.ListField(:class:`mongoengine.fields.ObjectIdField`)`)
+    :property hunks: list of the hunks of this action, if they are embedded (type: :class:`mongoengine.fields.ListField(:class:`mongoengine.fields.EmbeddedDocumentField(:class:`pyvcsshark.dbmodels.mongomodels.EmbeddedHunk`)`)`)
+    :property compressedHunks: hunks of this action, if they are compressed (see: :func:`pyvcsshark.dbmodels.mongomodels.FileAction.compressHunks`) \
+    (type: :class:`mongoengine.fields.BinaryField`)
+    :property hunkCompression: compression of the compressed hunks: zlib or zstd (type: :class:`mongoengine.fields.StringField`)
         
     .. NOTE:: Unique (or primary key) are the fields: projectId, fileId, and revisionHash.
     
     .. NOTE:: oldFilePathId only exists, if the file was created due to a copy or move action
     
+    .. NOTE:: Only one of hunkIds, hunks and compressedHunks is set, depending on the hunk storage of the run (see: \
+    :attr:`pyvcsshark.config.Config.HUNK_STORAGES`). :func:`pyvcsshark.dbmodels.mongomodels.FileAction.getHunks` reads all of them.
+    
 
     """
     MODES = ('A', 'M', 'D', 'C', 'T')
+    COMPRESSIONS = ('zlib', 'zstd')
     #pk fileId, revisionhash, projectId
     projectId = ObjectIdField(required=True,unique_with=['fileId', 'revisionHash'] )
     fileId = ObjectIdField(required=True,unique_with=['projectId', 'revisionHash'] )
@@ -38,6 +68,56 @@ class FileAction(Document):
     # oldFilePathId is only set, if we detected a copy or move operation
     oldFilePathId = ObjectIdField()
     hunkIds = ListField(ObjectIdField())
+    hunks = ListField(EmbeddedDocumentField(EmbeddedHunk))
+    compressedHunks = BinaryField()
+    hunkCompression = StringField(max_length=4, choices=COMPRESSIONS)
+
+    @staticmethod
+    def compressHunks(hunks):
+        """ Compresses a list of hunks (e.g. of class :class:`pyvcsshark.dbmodels.models.Hunk`) into a blob. The hunks are written as \
+        JSON list of [old_start, old_lines, new_start, new_lines, content] lists, which is compressed with zstd, if the zstandard package \
+        is installed, and with zlib otherwise. Returns a tuple of the blob and the compression.
+
+        :param hunks: list of hunks, which have the attributes old_start, old_lines, new_start, new_lines and content
+        """
+        data = json.dumps([[hunk.old_start, hunk.old_lines, hunk.new_start, hunk.new_lines, hunk.content] for hunk in hunks]).encode('utf-8')
+        if zstandard is not None:
+            return zstandard.ZstdCompressor().compress(data), 'zstd'
+        return zlib.compress(data), 'zlib'
+
+    @staticmethod
+    def decompressHunks(blob, compression):
+        """ Returns the list of hunks of class :class:`pyvcsshark.dbmodels.mongomodels.EmbeddedHunk` of a blob, which was created by \
+        :func:`pyvcsshark.dbmodels.mongomodels.FileAction.compressHunks`
+
+        :param blob: compressed hunks
+        :param compression: compression of the blob: zlib or zstd
+        """
+        if compression == 'zstd':
+            if zstandard is None:
+                raise Exception("Hunks are compressed with zstd, but the zstandard package is not installed")
+            data = zstandard.ZstdDecompressor().decompress(blob)
+        else:
+            data = zlib.decompress(blob)
+        return [EmbeddedHunk(old_start=old_start, old_lines=old_lines, new_start=new_start, new_lines=new_lines, content=content)
+                for old_start, old_lines, new_start, new_lines, content in json.loads(data.decode('utf-8'))]
+
+    def getHunks(self):
+        """ Returns the list of hunks of this action, regardless of how they are stored. Hunks in the hunk collection are queried and
+        compressed hunks are decompressed, when they are requested for the first time. Afterwards, the list is kept.
+
+        .. NOTE:: Hunks from the hunk collection are of class :class:`pyvcsshark.dbmodels.mongomodels.Hunk`, the others of class \
+        :class:`pyvcsshark.dbmodels.mongomodels.EmbeddedHunk`. Both have the same attributes.
+        """
+        if getattr(self, '_loadedHunks', None) is None:
+            if self.compressedHunks:
+                self._loadedHunks = self.decompressHunks(self.compressedHunks, self.hunkCompression)
+            elif self.hunkIds:
+                hunksById = dict((hunk.id, hunk) for hunk in Hunk.objects(id__in=self.hunkIds))
+                self._loadedHunks = [hunksById[hunkId] for hunkId in self.hunkIds if hunkId in hunksById]
+            else:
+                self._loadedHunks = list(self.hunks)
+        return self._loadedHunks
     
         
     
@@ -115,12 +195,23 @@ class People(Document):
         return hash(self.name+self.email)
     
     
+class RefTip(EmbeddedDocument):
+    """ Document that inherits from :class:`mongoengine.EmbeddedDocument`. Holds the target of one reference at the end of a run.
+    
+    :property name: name of the reference (type: :class:`mongoengine.fields.StringField`)
+    :property revisionHash: hash of the target of the reference (type: :class:`mongoengine.fields.StringField`)
+    """
+    name = StringField(required=True)
+    revisionHash = StringField(max_length=50, required=True)
+    
+
 class Project(Document):
     """ Document that inherits from :class:`mongoengine.Document`. Holds information for the project collection.
     
     :property url: url to the project repository (type: :class:`mongoengine.fields.StringField`)
     :property name: name of the project (type: :class:`mongoengine.fields.StringField`)
     :property repositoryType: type of the repository (type: :class:`mongoengine.fields.StringField`)
+    :property refTips: targets of all references at the end of the last run (type: :class:`mongoengine.fields.ListField(:class:`mongoengine.fields.EmbeddedDocumentField(:class:`pyvcsshark.dbmodels.mongomodels.RefTip`)`)`)
     
     .. NOTE:: Unique (or primary key) is the field url.
     """
@@ -128,6 +219,7 @@ class Project(Document):
     url = StringField(max_length=400, required=True, unique=True)
     name = StringField(max_length=100, required=True)
     repositoryType = StringField(max_length=15)
+    refTips = ListField(EmbeddedDocumentField(RefTip))
     
         
 
@@ -147,6 +239,10 @@ class Commit(Document):
     :property committerOffset: offset of the committerDate (type: :class:`mongoengine.fields.IntField`)
     :property message: commit message (type: :class:`mongoengine.fields.StringField`)
     :property fileActionIds: list of file action ids, which belong to the commit (type: :class:`mongoengine.fields.ListField(:class:`mongoengine.fields.ObjectIdField`)`)
+    :property similarityMode: detection of renamed and copied files, which produced the file actions: off, renames, copies or exact (type: :class:`mongoengine.fields.StringField`)
+    :property fileActionChunks: number of parts, in which the file actions of a big commit were stored, while the commit is not complete (type: :class:`mongoengine.fields.IntField`)
+    :property storedFileActionChunks: number of these parts, which are stored already (type: :class:`mongoengine.fields.IntField`)
+    :property streamedCommitterDate: committer date of a commit, which is set as committerDate, as soon as all parts are stored (type: :class:`mongoengine.fields.DateTimeField`)
     
     .. NOTE:: Unique (or primary key) are the fields projectId and revisionHash.
     """
@@ -165,6 +261,10 @@ class Commit(Document):
     committerOffset = IntField()
     message = StringField()
     fileActionIds = ListField(ObjectIdField())
+    similarityMode = StringField(max_length=10)
+    fileActionChunks = IntField()
+    storedFileActionChunks = IntField()
+    streamedCommitterDate = DateTimeField()
 
     
     def __str__(self):
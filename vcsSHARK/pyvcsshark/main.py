@@ -7,6 +7,7 @@ from pyvcsshark.parser.baseparser import BaseParser
 
 from .utils import findCorrectParser, findCorrectDatastore
 import logging
+import json
 import sys
 import traceback
 import timeit
@@ -16,11 +17,12 @@ class Application(object):
     
     1. The correct datastore is found (inherits from: :class:`pyvcsshark.datastores.basestore.BaseStore`) by looking at which one was chosen by the user and the class is instantiated
     2. The correct parser (inherits from: :class:`pyvcsshark.parser.baseparser.BaseParser`) for the specified repository is instantiated
-    3. :func:`pyvcsshark.parser.baseparser.BaseParser.initialize` is called (concreter: the **implemented function** of the **correct parser**)
-    4. :func:`pyvcsshark.datastores.basestore.BaseStore.initialize` is called with the different configuration parameters and values from the parser (concreter: the **implemented function** of the **correct datastore**)
+    3. :func:`pyvcsshark.datastores.basestore.BaseStore.initialize` is called with the different configuration parameters and values from the parser (concreter: the **implemented function** of the **correct datastore**)
+    4. :func:`pyvcsshark.parser.baseparser.BaseParser.initialize` is called with the datastore, so that already stored commits can be skipped (concreter: the **implemented function** of the **correct parser**)
     5. :func:`pyvcsshark.baseparser.BaseParser.parse` is called to start the parsing process of the repository (concreter: the **implemented function** of the **correct parser**)
     6. :func:`pyvcsshark.parser.baseparser.BaseParser.finalize` is called to finalize the parsing process (e.g. closing files) (concreter: the **implemented function** of the **correct parser**)
     7. :func:`pyvcsshark.datastores.basestore.BaseStore.finalize` is called to finalize the storing process (e.g. closing connections) (concreter: the **implemented function** of the **correct datastore**)
+    8. If a report file is configured, the report of the parser (see: :func:`pyvcsshark.parser.baseparser.BaseParser.getReport`) is written to it
     
     
     
@@ -49,24 +51,37 @@ class Application(object):
             
         # Set projectName, url and repository type, as they
         # are most likely required for storing into a datastore (e.g. creating a project table)
-        parser.initialize()
         datastore.initialize(self.config.db_database,
                              self.config.db_hostname,
                              self.config.db_port,
                              parser.getProjectName(),
                              parser.getProjectURL(),
                              parser.repositoryType,
+                             config=self.config
                              )
+        parser.initialize(datastore, self.config)
         parser.parse(self.config.uri, datastore)
         parser.finalize()
         datastore.finalize()
+        
+        if self.config.report_file:
+            self.writeReport(parser)
             
         elapsed = timeit.default_timer() - start_time
         
         
         self.logger.info("Execution time: %0.5f s" % elapsed)
-
-            
-            
-            
-            
\ No newline at end of file
+    
+    def writeReport(self, parser):
+        """ Writes the report of the parser as JSON to the configured report file
+        
+        :param parser: subclass of :class:`pyvcsshark.parser.baseparser.BaseParser`, which parsed the repository
+        """
+        report = parser.getReport()
+        if report is None:
+            self.logger.info("%s does not create a report" % (parser.__class__.__name__))
+            return
+        
+        with open(self.config.report_file, 'w') as reportFile:
+            json.dump(report, reportFile, indent=2)
+        self.logger.info("Wrote report of %d commits to %s" % (report.get('commits', 0), self.config.report_file))
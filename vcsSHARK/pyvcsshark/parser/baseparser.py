@@ -25,8 +25,13 @@ class BaseParser(metaclass=abc.ABCMeta):
         return
     
     @abc.abstractmethod
-    def initialize(self):
-        """Initialization process for parser"""
+    def initialize(self, datastore=None, config=None):
+        """Initialization process for parser
+        
+        :param datastore: subclass of :class:`pyvcsshark.datastores.basestore.BaseStore`, which is already initialized. \
+        The parser can use it to find out what is already stored (e.g. via :func:`pyvcsshark.datastores.basestore.BaseStore.getStoredRevisionHashes`)
+        :param config: object of class :class:`pyvcsshark.config.Config` with the options of the run (e.g. the diff level)
+        """
         return
     
     @abc.abstractmethod
@@ -66,6 +71,10 @@ class BaseParser(metaclass=abc.ABCMeta):
         """Retrieves the project url from the repository. This need to be
         put here, as only the parser is specific to the repository type"""
     
+    def getReport(self):
+        """Returns a report about the parsing process (e.g. the slowest commits) as dictionary, which can be written as JSON,
+        or None, if the parser does not create one"""
+        return None
     
     def getImmediateSubdirectories(self, a_dir):
         """ Helper method, which gets the **immediate** subdirectoriesof a path. Is helpful, if one want to create a 
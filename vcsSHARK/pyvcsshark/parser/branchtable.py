@@ -0,0 +1,140 @@
+from pyvcsshark.dbmodels.models import BranchModel
+
+
+class BranchTable(object):
+    """ Compact table, which holds the information of which branches a commit belongs to and which tags it has.
+    Every branch name is stored only once and gets an id. The branches of a commit are stored as a bitset of these ids.
+
+    The table is filled via :func:`pyvcsshark.parser.branchtable.BranchTable.add` and must be frozen via
+    :func:`pyvcsshark.parser.branchtable.BranchTable.freeze` before it can be read. After freezing, all commits are held in two
+    byte strings: the sorted binary revision hashes (the position of a hash is the dense index of the commit) and the
+    bitsets of all commits with a fixed width. As these are only two objects, processes that are forked afterwards can read
+    the table without copying it.
+
+    :param branchNames: names of all branches, which can be part of the table
+
+    :property branchNames: sorted list of the names of the branches. The position in the list is the id of the branch
+    :property tags: dictionary, which maps the binary revision hash of tagged commits to a list of :class:`pyvcsshark.dbmodels.models.TagModel`
+    """
+
+    HASH_LENGTH = 20
+
+    def __init__(self, branchNames):
+        self.branchNames = sorted(set(branchNames))
+        self.branchIds = dict((name, branchId) for branchId, name in enumerate(self.branchNames))
+        self.branchModels = [BranchModel(name) for name in self.branchNames]
+        self.tags = {}
+        self.width = max(1, (len(self.branchNames) + 7) // 8)
+        self.frozen = False
+        self._hashes = bytearray()
+        self._bitsets = bytearray()
+
+    def __len__(self):
+        return len(self._hashes) // self.HASH_LENGTH
+
+    def __contains__(self, commitHash):
+        return self.index(commitHash) is not None
+
+    def _toRaw(self, commitHash):
+        """ Converts a revision hash to its binary representation
+
+        :param commitHash: revision hash as hex string or as binary string
+        """
+        if isinstance(commitHash, str):
+            return bytes.fromhex(commitHash)
+        return bytes(commitHash)
+
+    def getBitset(self, branches):
+        """ Returns the bitset (as integer) for the given branch names
+
+        :param branches: iterable of branch names, which must be known to the table
+        """
+        bitset = 0
+        for branch in branches:
+            bitset |= 1 << self.branchIds[branch]
+        return bitset
+
+    def add(self, commitHash, bitset):
+        """ Adds a commit to the table. Every commit must only be added once.
+
+        :param commitHash: revision hash of the commit (hex or binary)
+        :param bitset: integer, where the bits of the branch ids of the commit are set
+        """
+        if self.frozen:
+            raise Exception("Commits can not be added to a frozen branch table!")
+
+        self._hashes += self._toRaw(commitHash)
+        self._bitsets += bitset.to_bytes(self.width, 'little')
+
+    def addTag(self, commitHash, tagModel):
+        """ Adds a tag to a commit, which is part of the table
+
+        :param commitHash: revision hash of the commit (hex or binary)
+        :param tagModel: object of class :class:`pyvcsshark.dbmodels.models.TagModel`
+        """
+        self.tags.setdefault(self._toRaw(commitHash), []).append(tagModel)
+
+    def freeze(self):
+        """ Sorts the commits by their revision hash, so that they can be looked up, and turns the buffers into
+        immutable byte strings.
+        """
+        length = self.HASH_LENGTH
+        hashes = self._hashes
+        bitsets = self._bitsets
+        order = sorted(range(len(self)), key=lambda i: hashes[i*length:(i+1)*length])
+
+        self._hashes = b''.join([hashes[i*length:(i+1)*length] for i in order])
+        self._bitsets = b''.join([bitsets[i*self.width:(i+1)*self.width] for i in order])
+        self.frozen = True
+
+    def index(self, commitHash):
+        """ Returns the dense index of the commit or None, if the commit is not part of the table.
+
+        :param commitHash: revision hash of the commit (hex or binary)
+        """
+        rawHash = self._toRaw(commitHash)
+        length = self.HASH_LENGTH
+        low = 0
+        high = len(self)
+        while low < high:
+            middle = (low + high) // 2
+            current = self._hashes[middle*length:(middle+1)*length]
+            if current < rawHash:
+                low = middle + 1
+            elif current > rawHash:
+                high = middle
+            else:
+                return middle
+        return None
+
+    def hashes(self):
+        """ Yields the revision hashes (hex) of all commits in the order of their index """
+        length = self.HASH_LENGTH
+        for i in range(len(self)):
+            yield self._hashes[i*length:(i+1)*length].hex()
+
+    def getBranches(self, commitHash):
+        """ Returns the set of :class:`pyvcsshark.dbmodels.models.BranchModel` to which the commit belongs to
+
+        :param commitHash: revision hash of the commit (hex or binary)
+        """
+        index = self.index(commitHash)
+        if index is None:
+            raise KeyError(commitHash)
+
+        bitset = int.from_bytes(self._bitsets[index*self.width:(index+1)*self.width], 'little')
+        branches = set()
+        branchId = 0
+        while bitset:
+            if bitset & 1:
+                branches.add(self.branchModels[branchId])
+            bitset >>= 1
+            branchId += 1
+        return branches
+
+    def getTags(self, commitHash):
+        """ Returns the list of :class:`pyvcsshark.dbmodels.models.TagModel` of the commit
+
+        :param commitHash: revision hash of the commit (hex or binary)
+        """
+        return self.tags.get(self._toRaw(commitHash), [])
@@ -0,0 +1,331 @@
+import heapq
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+import pygit2
+
+
+class CommitGraph(object):
+    """ Compact, memory-mappable index of the commit graph of a repository. It holds, for every commit that is reachable
+    from a reference, its parents, its commit and author time and its generation number. Ancestry queries, topological
+    walks and reachability checks can be answered with it, without touching the object database.
+
+    The commits are sorted by their binary revision hash, the position of a hash is the index of the commit. The file has
+    the following layout (little endian):
+
+        1. header: magic (8 bytes), version, number of commits N and number of parent entries P (uint32 each)
+        2. commit times (N int64)
+        3. author times (N int64)
+        4. generation numbers (N uint32). Commits without parents have generation 1, every other commit has one more than \
+        the maximum of its parents. Therefore, a child always has a higher generation number than its parents
+        5. parent offsets (N+1 uint32): the parents of commit i are parents[offsets[i]:offsets[i+1]]
+        6. parents (P uint32): indices of the parent commits
+        7. binary revision hashes (N times 20 bytes)
+
+    The file is stored as :attr:`FILE_NAME` in the git directory and is extended, when references point to commits, which are not
+    part of it (see: :func:`pyvcsshark.parser.commitgraph.CommitGraph.open`).
+
+    :param data: buffer (e.g. :class:`mmap.mmap` or bytes) with the content of the file
+
+    :property logger: logger, which is acquired via logging.getLogger("parser")
+    """
+
+    FILE_NAME = 'vcsshark-commit-graph'
+    MAGIC = b'VCSGRAPH'
+    VERSION = 1
+    HEADER = struct.Struct('<8sIII')
+    HASH_LENGTH = 20
+
+    logger = logging.getLogger("parser")
+
+    def __init__(self, data):
+        magic, version, commitCount, parentCount = self.HEADER.unpack_from(data, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError("Not a commit graph of version %d" % (self.VERSION))
+
+        self.data = data
+        self.commitCount = commitCount
+        view = memoryview(data)
+        offset = self.HEADER.size
+        self.commitTimes = view[offset:offset+8*commitCount].cast('q')
+        offset += 8*commitCount
+        self.authorTimes = view[offset:offset+8*commitCount].cast('q')
+        offset += 8*commitCount
+        self.generations = view[offset:offset+4*commitCount].cast('I')
+        offset += 4*commitCount
+        self.parentOffsets = view[offset:offset+4*(commitCount+1)].cast('I')
+        offset += 4*(commitCount+1)
+        self.parentIndices = view[offset:offset+4*parentCount].cast('I')
+        offset += 4*parentCount
+        self.hashes = view[offset:offset+self.HASH_LENGTH*commitCount]
+
+        if len(self.hashes) != self.HASH_LENGTH*commitCount:
+            raise ValueError("Commit graph is truncated")
+
+    def __len__(self):
+        return self.commitCount
+
+    def __contains__(self, commitHash):
+        return self.index(commitHash) is not None
+
+    @classmethod
+    def getPath(cls, repository):
+        """ Returns the path of the commit graph file of a repository
+
+        :param repository: object of class :class:`pygit2.Repository`
+        """
+        return os.path.join(repository.path, cls.FILE_NAME)
+
+    @classmethod
+    def load(cls, path):
+        """ Memory-maps the commit graph file. Returns None, if the file does not exist or can not be read.
+
+        :param path: path to the commit graph file
+        """
+        # The arrays are read with the native byte order
+        if sys.byteorder != 'little':
+            return None
+
+        try:
+            with open(path, 'rb') as graphFile:
+                data = mmap.mmap(graphFile.fileno(), 0, access=mmap.ACCESS_READ)
+            return cls(data)
+        except (OSError, ValueError, struct.error) as e:
+            if os.path.exists(path):
+                cls.logger.warning("Could not read commit graph %s. Original message: %s" % (path, e))
+            return None
+
+    @classmethod
+    def open(cls, repository, references=None):
+        """ Returns the commit graph of the repository. It is loaded from the git directory and extended by the commits, which are
+        reachable from the references, but not part of it yet. If it was changed, it is written back. If the git directory is not
+        writable, the graph is only kept in memory.
+
+        :param repository: object of class :class:`pygit2.Repository`
+        :param references: names of the references, whose commits must be part of the graph. If it is None, all references are used
+        """
+        path = cls.getPath(repository)
+        graph = cls.load(path)
+
+        if references is None:
+            references = repository.listall_references()
+
+        tips = []
+        for reference in references:
+            try:
+                commit = repository.lookup_reference(reference).peel(pygit2.Commit)
+            except (ValueError, KeyError, pygit2.GitError):
+                # Reference does not point to a commit (e.g. a tag of a tree)
+                continue
+            tips.append(commit.id)
+
+        if graph is not None and all(tip.raw in graph for tip in tips):
+            return graph
+
+        commits = cls.collectCommits(repository, tips, graph)
+        cls.logger.info("Adding %d commits to the commit graph..." % (len(commits)))
+        data = cls.serialize(commits, graph)
+
+        try:
+            fileDescriptor, tempPath = tempfile.mkstemp(dir=repository.path, prefix='.tmp-'+cls.FILE_NAME)
+            with os.fdopen(fileDescriptor, 'wb') as tempFile:
+                tempFile.write(data)
+            os.replace(tempPath, path)
+        except OSError as e:
+            cls.logger.warning("Could not write commit graph %s. Original message: %s" % (path, e))
+        else:
+            loadedGraph = cls.load(path)
+            if loadedGraph is not None:
+                return loadedGraph
+        return cls(data)
+
+    @staticmethod
+    def collectCommits(repository, tips, graph=None):
+        """ Reads all commits, which are reachable from the tips, but not part of the graph, from the object database.
+        Returns a dictionary, which maps the binary revision hash to a tuple of commit time, author time and the list of
+        binary revision hashes of the parents.
+
+        :param repository: object of class :class:`pygit2.Repository`
+        :param tips: list of :class:`pygit2.Oid`, where the search starts
+        :param graph: object of class :class:`pyvcsshark.parser.commitgraph.CommitGraph` or None
+        """
+        commits = {}
+        stack = [tip.raw for tip in tips]
+        while stack:
+            rawHash = stack.pop()
+            if rawHash in commits or (graph is not None and rawHash in graph):
+                continue
+            commit = repository[pygit2.Oid(raw=rawHash)]
+            parents = [parentId.raw for parentId in commit.parent_ids]
+            commits[rawHash] = (commit.commit_time, commit.author.time, parents)
+            stack.extend(parents)
+        return commits
+
+    @classmethod
+    def serialize(cls, commits, graph=None):
+        """ Creates the content of a commit graph file from the new commits and the commits of the existing graph
+
+        :param commits: dictionary of the new commits (see: :func:`pyvcsshark.parser.commitgraph.CommitGraph.collectCommits`)
+        :param graph: object of class :class:`pyvcsshark.parser.commitgraph.CommitGraph`, whose commits are kept, or None
+        """
+        entries = {}
+        generations = {}
+        if graph is not None:
+            for index in range(len(graph)):
+                rawHash = graph.getRawHash(index)
+                entries[rawHash] = (graph.commitTimes[index], graph.authorTimes[index],
+                                    [graph.getRawHash(parent) for parent in graph.getParents(index)])
+                generations[rawHash] = graph.generations[index]
+        entries.update(commits)
+
+        # Generation numbers of the new commits. Parents must be computed before their children
+        for rawHash in commits:
+            stack = [rawHash]
+            while stack:
+                current = stack[-1]
+                if current in generations:
+                    stack.pop()
+                    continue
+                missingParents = [parent for parent in entries[current][2] if parent not in generations]
+                if missingParents:
+                    stack.extend(missingParents)
+                else:
+                    generations[current] = 1 + max([generations[parent] for parent in entries[current][2]] or [0])
+                    stack.pop()
+
+        sortedHashes = sorted(entries)
+        indices = dict((rawHash, index) for index, rawHash in enumerate(sortedHashes))
+
+        commitTimes = []
+        authorTimes = []
+        generationNumbers = []
+        parentOffsets = [0]
+        parentIndices = []
+        for rawHash in sortedHashes:
+            commitTime, authorTime, parents = entries[rawHash]
+            commitTimes.append(commitTime)
+            authorTimes.append(authorTime)
+            generationNumbers.append(generations[rawHash])
+            parentIndices.extend(indices[parent] for parent in parents)
+            parentOffsets.append(len(parentIndices))
+
+        commitCount = len(sortedHashes)
+        return b''.join([cls.HEADER.pack(cls.MAGIC, cls.VERSION, commitCount, len(parentIndices)),
+                         struct.pack('<%dq' % commitCount, *commitTimes),
+                         struct.pack('<%dq' % commitCount, *authorTimes),
+                         struct.pack('<%dI' % commitCount, *generationNumbers),
+                         struct.pack('<%dI' % (commitCount+1), *parentOffsets),
+                         struct.pack('<%dI' % len(parentIndices), *parentIndices),
+                         b''.join(sortedHashes)])
+
+    def index(self, commitHash):
+        """ Returns the index of the commit or None, if the commit is not part of the graph
+
+        :param commitHash: revision hash of the commit (hex, binary or :class:`pygit2.Oid`)
+        """
+        if isinstance(commitHash, str):
+            rawHash = bytes.fromhex(commitHash)
+        elif isinstance(commitHash, pygit2.Oid):
+            rawHash = commitHash.raw
+        else:
+            rawHash = bytes(commitHash)
+
+        length = self.HASH_LENGTH
+        low = 0
+        high = self.commitCount
+        while low < high:
+            middle = (low + high) // 2
+            current = self.hashes[middle*length:(middle+1)*length].tobytes()
+            if current < rawHash:
+                low = middle + 1
+            elif current > rawHash:
+                high = middle
+            else:
+                return middle
+        return None
+
+    def getRawHash(self, index):
+        """ Returns the binary revision hash of the commit with the given index """
+        return self.hashes[index*self.HASH_LENGTH:(index+1)*self.HASH_LENGTH].tobytes()
+
+    def getHash(self, index):
+        """ Returns the revision hash (hex) of the commit with the given index """
+        return self.getRawHash(index).hex()
+
+    def getParents(self, index):
+        """ Returns the indices of the parents of the commit with the given index """
+        return self.parentIndices[self.parentOffsets[index]:self.parentOffsets[index+1]].tolist()
+
+    def isAncestor(self, ancestor, descendant):
+        """ Returns true, if the commit with the index ancestor is reachable from the commit with the index descendant (every
+        commit is its own ancestor). Commits, whose generation number is not higher than the one of the ancestor, are not
+        followed, as the ancestor can not be reachable from them.
+
+        :param ancestor: index of the possible ancestor
+        :param descendant: index of the possible descendant
+        """
+        minimumGeneration = self.generations[ancestor]
+        stack = [descendant]
+        visited = set()
+        while stack:
+            index = stack.pop()
+            if index == ancestor:
+                return True
+            if index in visited or self.generations[index] <= minimumGeneration:
+                continue
+            visited.add(index)
+            stack.extend(self.getParents(index))
+        return False
+
+    def walk(self, tips, hidden=(), since=None):
+        """ Yields the indices of all commits, which are reachable from the tips, but not from the hidden commits. Children are
+        always yielded before their parents (ordered by generation number, then by commit time).
+
+        The walk stops, as soon as only commits are left, which are reachable from a hidden commit. Therefore, walking from
+        tips that moved forward with their old positions hidden only visits the new commits (and the boundary).
+
+        :param tips: indices of the commits, where the walk starts
+        :param hidden: indices of the commits, whose history is excluded
+        :param since: UNIX timestamp or None. Commits, which were committed before, are neither yielded nor followed to their \
+        parents. Therefore, the walk stops at this date boundary
+        """
+        TIP = 1
+        HIDDEN = 2
+
+        flags = {}
+        heap = []
+        for index in tips:
+            flags[index] = flags.get(index, 0) | TIP
+        for index in hidden:
+            flags[index] = flags.get(index, 0) | HIDDEN
+        for index in flags:
+            heapq.heappush(heap, (-self.generations[index], -self.commitTimes[index], index))
+
+        # Number of commits in the heap, which are not hidden. If there are none, the rest of the history is hidden
+        interesting = sum(1 for flag in flags.values() if not flag & HIDDEN)
+        while heap and interesting > 0:
+            index = heapq.heappop(heap)[2]
+            flag = flags[index]
+            if not flag & HIDDEN:
+                interesting -= 1
+                if since is not None and self.commitTimes[index] < since:
+                    continue
+                yield index
+
+            # All children of a commit have a higher generation number, so its flags are final here
+            for parent in self.getParents(index):
+                oldFlag = flags.get(parent, 0)
+                newFlag = oldFlag | flag
+                if newFlag == oldFlag:
+                    continue
+                flags[parent] = newFlag
+                if oldFlag == 0:
+                    heapq.heappush(heap, (-self.generations[parent], -self.commitTimes[parent], parent))
+                    if not newFlag & HIDDEN:
+                        interesting += 1
+                elif newFlag & HIDDEN and not oldFlag & HIDDEN:
+                    interesting -= 1
@@ -0,0 +1,136 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import pickle
+import tempfile
+import zlib
+
+
+class DiffCache(object):
+    """ On-disk cache for the changed files (list of :class:`pyvcsshark.dbmodels.models.FileModel`) of a diff. As git objects
+    never change, the result of a diff only depends on the two trees that are compared and the options of the diff. Therefore,
+    the entries are keyed by the OIDs of the old and the new tree and a variant string, which describes the options
+    (e.g. the diff level).
+
+    Every entry is a zlib compressed pickle in its own file. Files are written to a temporary file first and then
+    renamed, so that several processes can use the same cache directory. The modification time of a file is
+    updated on every hit, so that the least recently used entries are evicted first, if the cache grows over its size limit.
+
+    :param cacheDir: directory, where the entries are stored. It is created, if it does not exist
+    :param maxSize: maximum size of the cache in bytes
+
+    :property logger: logger, which is acquired via logging.getLogger("parser")
+    :property sharedSize: size of the cache in bytes as :class:`multiprocessing.Value`. It is inherited by the parsing processes, \
+    which are forked after the cache was created, so that all of them count against the same maximum size
+
+    .. NOTE:: Another cache object on the same directory (e.g. of another run at the same time) has its own size. Its entries are \
+    only taken into account, when the cache is scanned during an eviction.
+    """
+
+    # After an eviction, the cache is filled to this fraction of the maximum size, so that not every write triggers a scan
+    EVICTION_TARGET = 0.9
+
+    def __init__(self, cacheDir, maxSize):
+        self.cacheDir = cacheDir
+        self.maxSize = maxSize
+        self.logger = logging.getLogger("parser")
+        os.makedirs(self.cacheDir, exist_ok=True)
+        self.sharedSize = multiprocessing.Value('q', sum(size for path, size, mtime in self.listEntries()))
+
+    @property
+    def size(self):
+        """ Size of the cache in bytes """
+        return self.sharedSize.value
+
+    def getPath(self, oldTreeId, newTreeId, variant):
+        """ Returns the path of the cache file for a diff
+
+        :param oldTreeId: OID of the old tree or None, if the new tree is diffed against the empty tree
+        :param newTreeId: OID of the new tree
+        :param variant: string, which describes the options of the diff
+        """
+        key = hashlib.sha1(("%s:%s:%s" % (oldTreeId or '', newTreeId, variant)).encode('utf-8')).hexdigest()
+        return os.path.join(self.cacheDir, key[:2], key[2:])
+
+    def get(self, oldTreeId, newTreeId, variant):
+        """ Returns the cached list of changed files or None, if the diff is not in the cache
+
+        :param oldTreeId: OID of the old tree or None, if the new tree is diffed against the empty tree
+        :param newTreeId: OID of the new tree
+        :param variant: string, which describes the options of the diff
+        """
+        path = self.getPath(oldTreeId, newTreeId, variant)
+        try:
+            with open(path, 'rb') as cacheFile:
+                changedFiles = pickle.loads(zlib.decompress(cacheFile.read()))
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # A broken entry is recomputed and overwritten
+            self.logger.warning("Could not read diff cache entry %s. Original message: %s" % (path, e))
+            return None
+        return changedFiles
+
+    def put(self, oldTreeId, newTreeId, variant, changedFiles):
+        """ Stores a list of changed files in the cache and evicts the least recently used entries, if the cache is too big
+
+        :param oldTreeId: OID of the old tree or None, if the new tree is diffed against the empty tree
+        :param newTreeId: OID of the new tree
+        :param variant: string, which describes the options of the diff
+        :param changedFiles: list of :class:`pyvcsshark.dbmodels.models.FileModel`
+        """
+        path = self.getPath(oldTreeId, newTreeId, variant)
+        data = zlib.compress(pickle.dumps(changedFiles, pickle.HIGHEST_PROTOCOL))
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fileDescriptor, tempPath = tempfile.mkstemp(dir=directory, prefix='.tmp')
+        try:
+            with os.fdopen(fileDescriptor, 'wb') as tempFile:
+                tempFile.write(data)
+            os.replace(tempPath, path)
+        except OSError as e:
+            self.logger.warning("Could not write diff cache entry %s. Original message: %s" % (path, e))
+            if os.path.exists(tempPath):
+                os.remove(tempPath)
+            return
+
+        with self.sharedSize.get_lock():
+            self.sharedSize.value += len(data)
+            if self.sharedSize.value > self.maxSize:
+                self.evict()
+
+    def listEntries(self):
+        """ Yields a tuple of path, size and modification time for every entry of the cache """
+        for directory, _, fileNames in os.walk(self.cacheDir):
+            for fileName in fileNames:
+                if fileName.startswith('.tmp'):
+                    continue
+                path = os.path.join(directory, fileName)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    # Evicted by another process in the meantime
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def evict(self):
+        """ Removes the least recently used entries, until the cache is below :attr:`EVICTION_TARGET` of its maximum size
+
+        .. NOTE:: The lock of the size must be held, so that only one process evicts at a time
+        """
+        entries = sorted(self.listEntries(), key=lambda entry: entry[2])
+        size = sum(size for path, size, mtime in entries)
+
+        target = self.maxSize * self.EVICTION_TARGET
+        for path, entrySize, mtime in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= entrySize
+        self.sharedSize.value = size
@@ -1,12 +1,22 @@
 from pyvcsshark.parser.baseparser import BaseParser
 import pygit2
 import logging
+import os
+import fnmatch
 import re
 import uuid
 import multiprocessing
-from collections import Counter
-from pyvcsshark.dbmodels.models import BranchModel, PeopleModel, TagModel,\
+import threading
+import queue
+import timeit
+import multiprocessing.pool
+from pyvcsshark.dbmodels.models import PeopleModel, TagModel,\
     FileModel, CommitModel, Hunk
+from pyvcsshark.parser.branchtable import BranchTable
+from pyvcsshark.parser.diffcache import DiffCache
+from pyvcsshark.parser.commitgraph import CommitGraph
+from pyvcsshark.parser.timingreport import TimingReport
+from pyvcsshark.config import Config
 
 
 class GitParser(BaseParser):
@@ -15,27 +25,56 @@ class GitParser(BaseParser):
     :property SIMILARITY_THRESHOLD: sets the threshold for deciding if a file is similar to another. Default: 50%
     :property NUMBER_OF_PROCESSES: number of processes for the parsing process. Calls :func:`multiprocessing.cpu_count()`.
     :property repository: object of class :class:`pygit2.Repository`, which represents the repository
-    :property commitsToBeProcessed: dictionary that is set up the following way: \
-    commitsToBeProcessed = {'<revisionHash>' : {'branches' : set(), 'tags' : []}}, where <revisionHash> must be replaced with the actual hash. Therefore, \
-    this dictionary holds information about every revision and which branches this revision belongs to and which tags it has.
+    :property branchTable: object of class :class:`pyvcsshark.parser.branchtable.BranchTable`. It holds information about every revision \
+    and which branches this revision belongs to and which tags it has.
         
     :property logger: logger, which is acquired via logging.getLogger("parser")
     :property datastore: datestore, where the commits should be saved to
-    :property commitqueue: object of class :class:`multiprocessing.JoinableQueue`, where commits are stored in that can be parsed
+    :property storedCommits: list of revision hashes of commits, which are already stored in the datastore. They are not parsed again, \
+    only their branches and tags are updated
+    :property refSnapshot: dictionary, which maps the name of every reference to the hash of its target at the time of the initialization
+    :property commitsToParse: list of revision hashes of commits, which need to be parsed
+    :property commitqueue: object of class :class:`multiprocessing.JoinableQueue`, where chunks of commits are stored in that can be parsed. \
+    It holds at most :attr:`QUEUED_CHUNKS_PER_PROCESS` chunks per process, so that the chunks are handed out while the processes work
+    :property config: object of class :class:`pyvcsshark.config.Config`, which holds the options of the parsing process (e.g. the diff level)
+    :property commitGraph: object of class :class:`pyvcsshark.parser.commitgraph.CommitGraph`, which is used to walk the history
+    :property partitionCounts: dictionary, which maps the revision hash of every commit, that is split, to its number of partitions \
+    (see: :func:`pyvcsshark.parser.gitparser.GitParser.scheduleCommits`)
+    :property partitionModes: dictionary, which maps the revision hash of every commit, that is split, to the similarity mode of its \
+    merged partitions (see: :func:`pyvcsshark.parser.gitparser.GitParser.getPartitionMode`)
+    :property report: object of class :class:`pyvcsshark.parser.timingreport.TimingReport`, which holds the merged timings of all \
+    workers after the parsing process
     
     """
     
     # Includes rename and copy threshold, 50% is the default git threshold
     SIMILARITY_THRESHOLD = 50
     NUMBER_OF_PROCESSES = multiprocessing.cpu_count()
+    
+    # Scheduling: every process should get about this many chunks and a chunk never has more commits than MAX_CHUNK_SIZE
+    CHUNKS_PER_PROCESS = 16
+    MAX_CHUNK_SIZE = 64
+    QUEUED_CHUNKS_PER_PROCESS = 2
+    
+    # Number of commits, whose costs a process of the cost estimation estimates at once
+    ESTIMATE_BATCH_SIZE = 256
 
     def __init__(self):
         self.repository = None
-        self.commitsToBeProcessed = {}
+        self.branchTable = None
+        self.storedCommits = []
+        self.commitsToParse = []
+        self.storedRevisionHashes = set()
+        self.refSnapshot = {}
         self.logger = logging.getLogger("parser")
         self.datastore = None
+        self.config = Config(None)
+        self.commitGraph = None
+        self.partitionCounts = {}
+        self.partitionModes = {}
+        self.report = None
        
-        self.commitQueue = multiprocessing.JoinableQueue()
+        self.commitQueue = multiprocessing.JoinableQueue(self.NUMBER_OF_PROCESSES*self.QUEUED_CHUNKS_PER_PROCESS)
         
     @property   
     def repositoryType(self):
@@ -65,6 +104,13 @@ class GitParser(BaseParser):
     def finalize(self):
         """Finalization process for paser"""
         return
+    
+    def getReport(self):
+        """Returns the timing report of the parsing process as dictionary
+        (see: :func:`pyvcsshark.parser.timingreport.TimingReport.toDict`) or None, if nothing was parsed"""
+        if self.report is None:
+            return None
+        return self.report.toDict()
   
     def detect(self, repositoryPath):
         """Try to detect the repository, if its not there an exception is raised and therfore false can be returned"""
@@ -76,30 +122,26 @@ class GitParser(BaseParser):
             return False
 
 
-    def addBranch(self, commitHash, branch):
-        """ Does two things: First it adds the commitHash to the commitqueue, so that the parsing processes can process this commit. Second it
-        creates objects of type :class:`pyvcsshark.dbmodels.models.BranchModel` and stores it in the dictionary.
+    def addBranches(self, commitHash, branches):
+        """ Does two things: First it adds the commitHash to the commits to parse, so that the parsing processes can process this commit. Second it
+        stores the branches of the commit in the branch table.
         
-        :param commitHash: revision hash of the commit to be processed
-        :param branch: branch that should be added for the commit
+        :param commitHash: revision hash of the commit to be processed (type: :class:`pygit2.Oid`)
+        :param branches: bitset of the ids of all branches the commit belongs to (see: :class:`pyvcsshark.parser.branchtable.BranchTable`)
+        
+        .. NOTE:: If the commit is already stored in the datastore, it is not added to the commits to parse, as it does not need to be diffed again. \
+        It is remembered in storedCommits instead, so that its branches and tags can be updated.
         """
         strCommitHash = str(commitHash)
-        
-        branchModel = BranchModel(branch)
-        
-        # If the commit is already in the dict, we only need to append the branch (because then it was already parsed)
-        if(strCommitHash in self.commitsToBeProcessed):
-            self.commitsToBeProcessed[strCommitHash]['branches'].add(branchModel)
+        if strCommitHash in self.storedRevisionHashes:
+            self.storedCommits.append(strCommitHash)
         else:
-            self.commitQueue.put(strCommitHash)
-            self.commitsToBeProcessed[strCommitHash] = {
-                                           'branches' : set([branchModel]),
-                                           'tags' : []
-                                           }
+            self.commitsToParse.append(strCommitHash)
+        self.branchTable.add(commitHash.raw, branches)
 
     def addTag(self, taggedCommit, tagName, tagObject):
         """
-        Creates objects of type :class:`pyvcsshark.dbmodels.models.TagModel` and stores it in the dictionary mentioned above. 
+        Creates objects of type :class:`pyvcsshark.dbmodels.models.TagModel` and stores it in the branch table. 
         
         
         :param taggedCommit: revision hash of the commit to be processed
@@ -109,7 +151,7 @@ class GitParser(BaseParser):
         
         .. NOTE:: It can happen, that people committed to a tag and therefore created \
         a "tag-branch" which is normally not possible in git. Therefore, we go through all tags and check \
-        if they respond to a commit, which is already in the dictionary. \
+        if they respond to a commit, which is already in the branch table. \
         If **yes** -> we **tag** that commit \
         If **no** -> we **ignore** it
         """
@@ -120,7 +162,7 @@ class GitParser(BaseParser):
         tagName = tagName.split("/")[-1]
                 
         
-        if(commitId in self.commitsToBeProcessed):
+        if(commitId in self.branchTable):
             
             # If we have an annotated tag, get all the information we can out of it
             if(isinstance(tagObject, pygit2.Tag)):
@@ -129,40 +171,247 @@ class GitParser(BaseParser):
             else:
                 tagModel = TagModel(tagName)
                 
-            self.commitsToBeProcessed[commitId]['tags'].append(tagModel)
+            self.branchTable.addTag(commitId, tagModel)
 
           
-    def initialize(self):
+    def createRefSnapshot(self, references):
+        """ Creates a dictionary, which maps the name of every reference to the hash of its target. Symbolic references are resolved
+        and for annotated tags the hash of the tag object is used.
+        
+        :param references: names of the references
+        """
+        snapshot = {}
+        for reference in references:
+            snapshot[reference] = str(self.repository.lookup_reference(reference).resolve().target)
+        return snapshot
+    
+    def getReferences(self):
+        """ Returns a set of the names of all references of the repository, which match one of the ref include patterns of the
+        configuration (if there are any) and none of the ref exclude patterns (e.g. **refs/pull/*** for pull requests on GitHub)
+        """
+        references = set()
+        for reference in self.repository.listall_references():
+            if self.config.ref_include and not any(fnmatch.fnmatchcase(reference, pattern) for pattern in self.config.ref_include):
+                continue
+            if any(fnmatch.fnmatchcase(reference, pattern) for pattern in self.config.ref_exclude):
+                continue
+            references.add(reference)
+        
+        excluded = len(self.repository.listall_references()) - len(references)
+        if excluded:
+            self.logger.info("Ignoring %d references, which do not match the ref patterns" % (excluded))
+        return references
+    
+    def selectBranches(self, branches):
+        """ Returns the set of branches, which were selected by the branches option of the configuration. A branch is selected, if
+        its name is given (e.g. **refs/heads/master** or **master** for a local branch) or if it matches one of the given glob patterns.
+        
+        :param branches: names of the branch references
+        """
+        selectedBranches = set()
+        for branch in branches:
+            for pattern in self.config.branches:
+                if branch == pattern or branch == 'refs/heads/'+pattern or fnmatch.fnmatchcase(branch, pattern):
+                    selectedBranches.add(branch)
+                    break
+        
+        if not selectedBranches:
+            self.logger.warning("No branch matches %s" % (", ".join(self.config.branches)))
+        return selectedBranches
+    
+    def groupByTip(self, branches):
+        """ Groups the branches by the commit they point to. Returns a dictionary, which maps the id (type: :class:`pygit2.Oid`) of
+        every commit, that is the tip of a branch, to the sorted list of names of the branches, which point to it.
+        
+        :param branches: names of the branch references
+        """
+        branchesOfTip = {}
+        for branch in branches:
+            tip = self.repository.lookup_reference(branch).peel().id
+            branchesOfTip.setdefault(tip, []).append(branch)
+        
+        for tipBranches in branchesOfTip.values():
+            tipBranches.sort()
+        return branchesOfTip
+    
+    def getHiddenTips(self, previousSnapshot, branches, tags):
+        """ Compares the references with the snapshot of the previous run and returns the branch tips of the previous run, \
+        which can be hidden in the walk. If the history can not be walked partially, None is returned.
+        
+        Only the commits, which were added since the previous run, are walked, if:
+        
+            1. no reference was deleted or newly created (apart from tags that point to new commits)
+            2. every branch, which has changed, was moved forward (the old tip is an ancestor of the new tip)
+            3. the new commits of every branch, which has changed, were not reachable from the old tips of other branches \
+            (e.g. a branch, which was fast-forwarded to or merged another branch)
+            4. no tag was moved (the commit it pointed to before would keep the tag)
+            5. every new tag points to a commit, that is not reachable from the old tips
+        
+        Otherwise, already stored commits would belong to other branches or have other tags than before. Tags, which do not \
+        point to a commit (e.g. to a tree), are ignored.
+        
+        :param previousSnapshot: dictionary of the previous run (see: :func:`pyvcsshark.parser.gitparser.GitParser.createRefSnapshot`)
+        :param branches: names of the branch references
+        :param tags: names of the tag references
+        
+        .. NOTE:: The returned tips are indices in the commit graph (see: :class:`pyvcsshark.parser.commitgraph.CommitGraph`), \
+        which must be opened before.
+        """
+        if not previousSnapshot:
+            return None
+        
+        if set(previousSnapshot.keys()) - set(self.refSnapshot.keys()):
+            self.logger.info("References were deleted since the previous run, walking the whole history...")
+            return None
+        
+        hiddenTips = []
+        movedTips = []
+        for branch in branches:
+            if branch not in previousSnapshot:
+                self.logger.info("Branch %s is new, walking the whole history..." % (branch))
+                return None
+            
+            oldTip = self.commitGraph.index(previousSnapshot[branch])
+            if oldTip is None:
+                self.logger.info("Old tip of branch %s does not exist anymore, walking the whole history..." % (branch))
+                return None
+            
+            newTip = self.commitGraph.index(self.refSnapshot[branch])
+            if not self.commitGraph.isAncestor(oldTip, newTip):
+                self.logger.info("Branch %s was not moved forward, walking the whole history..." % (branch))
+                return None
+            movedTips.append((branch, oldTip, newTip))
+            hiddenTips.append(oldTip)
+        
+        # The old tips of all branches are hidden together. This is only correct, if every branch only gains commits, which
+        # no other branch had before. Otherwise, stored commits would miss the branch
+        for branch, oldTip, newTip in movedTips:
+            if oldTip == newTip:
+                continue
+            
+            newCommits = set(self.commitGraph.walk([newTip], hiddenTips))
+            for commit in self.commitGraph.walk([newTip], [oldTip]):
+                if commit not in newCommits:
+                    self.logger.info("Branch %s reaches commits of other branches, walking the whole history..." % (branch))
+                    return None
+        
+        for tag in tags:
+            if previousSnapshot.get(tag) == self.refSnapshot[tag]:
+                continue
+            
+            if tag in previousSnapshot:
+                self.logger.info("Tag %s was moved, walking the whole history..." % (tag))
+                return None
+            
+            taggedCommit = self.commitGraph.index(self.repository.lookup_reference(tag).peel().id)
+            if taggedCommit is None:
+                continue
+            
+            for oldTip in hiddenTips:
+                if self.commitGraph.isAncestor(taggedCommit, oldTip):
+                    self.logger.info("Tag %s points to an old commit, walking the whole history..." % (tag))
+                    return None
+        
+        self.logger.info("Walking only the commits, which were added since the previous run...")
+        return hiddenTips
+
+    def initialize(self, datastore=None, config=None):
         """ Initializes the parser. It gets all the branch and tag information and puts it into two different locations: First the commit id
-        is put into the commitqueue for the processing with the parsing processes. Second a dictionary is created, which holds the information of
+        is added to the commits to parse for the processing with the parsing processes. Second a branch table is created, which holds the information of
         which branches a commit is on and which tags it has
+        
+        :param datastore: subclass of :class:`pyvcsshark.datastores.basestore.BaseStore`. If it is given, the snapshot of the references \
+        of the previous run (see: :func:`pyvcsshark.datastores.basestore.BaseStore.getRefSnapshot`) and the revision hashes of all \
+        commits that are already stored are requested from it (see: :func:`pyvcsshark.datastores.basestore.BaseStore.getStoredRevisionHashes`) \
+        and only the commits, which are not stored, are added to the commits to parse.
+        :param config: object of class :class:`pyvcsshark.config.Config`. If it is not given, the default options are used
+        
+        .. NOTE:: The history is walked only once from all branch tips together. Therefore, the time needed grows with the number \
+        of commits and not with the number of commits times the number of branches. Branches, which point to the same commit, \
+        share one tip of the walk (see: :func:`pyvcsshark.parser.gitparser.GitParser.groupByTip`).
+        
+        .. NOTE:: Only the references, which pass the include and exclude patterns of the configuration, are used \
+        (see: :func:`pyvcsshark.parser.gitparser.GitParser.getReferences`).
+        
+        .. NOTE:: In a partial run (see: :func:`pyvcsshark.config.Config.isPartialRun`), only the selected branches are walked \
+        (see: :func:`pyvcsshark.parser.gitparser.GitParser.selectBranches`) and the walk stops at commits, which are older than \
+        the since date of the configuration. The references of the previous run are not used.
+        
+        .. NOTE:: If the references only moved forward since the previous run, the branch tips of the previous run are hidden in \
+        the walk (see: :func:`pyvcsshark.parser.gitparser.GitParser.getHiddenTips`). Then, only the new commits are visited.
+        
+        .. NOTE:: The history is walked on the commit graph (see: :class:`pyvcsshark.parser.commitgraph.CommitGraph`), which is \
+        stored in the git directory and only extended by the new commits. The object database is not read for the walk.
         """
+        if config is not None:
+            self.config = config
+        
         # Get all references (branches, tags)
-        references = set(self.repository.listall_references())
+        references = self.getReferences()
         
         # Get all tags
         regex = re.compile('^refs/tags')
-        tags = set(filter(lambda r: regex.match(r), self.repository.listall_references()))
+        tags = set(filter(lambda r: regex.match(r), references))
         
         # Get all branches
         branches = references-tags
+        if self.config.branches:
+            branches = self.selectBranches(branches)
+            self.logger.info("Only parsing the branches %s" % (", ".join(sorted(branches))))
+        
+        self.logger.info("Opening commit graph...")
+        self.commitGraph = CommitGraph.open(self.repository, references)
+        
+        self.refSnapshot = self.createRefSnapshot(references)
+        
+        hiddenTips = None
+        if datastore is not None:
+            # A partial run can not be compared with the references of the previous run
+            if not self.config.isPartialRun():
+                hiddenTips = self.getHiddenTips(datastore.getRefSnapshot(), branches, tags)
+            
+            # Even if only the new commits are walked, some of them can be stored already (e.g. by an aborted run)
+            self.storedRevisionHashes = datastore.getStoredRevisionHashes()
+            self.logger.info("Found %d commits, which are already stored" % (len(self.storedRevisionHashes)))
 
         self.logger.info("Getting branch information...")
-        for branch in branches:
-            self.logger.info("Getting information from branch %s" % (branch))
-            commit = self.repository.lookup_reference(branch).peel()
-            # Walk through every child
-            for child in self.repository.walk(commit.id,
-                                              pygit2.GIT_SORT_TIME | pygit2.GIT_SORT_TOPOLOGICAL):
-                self.addBranch(child.id, branch)
+        
+        self.branchTable = BranchTable(branches)
+        
+        # Every branch tip starts with the branches that point to it. Branches with the same tip (e.g. remote branches, which
+        # mirror local ones) are walked only once
+        branchesOfTip = self.groupByTip(branches)
+        self.logger.info("%d branches point to %d different commits" % (len(branches), len(branchesOfTip)))
+        
+        branchesOfCommit = {}
+        for tip, tipBranches in branchesOfTip.items():
+            self.logger.info("Getting information from branches %s" % (", ".join(tipBranches)))
+            branchesOfCommit[self.commitGraph.index(tip)] = self.branchTable.getBitset(tipBranches)
+        
+        # One walk over the whole history. The walk guarantees, that every child is visited before its parents,
+        # so the branches of a commit are complete once we reach it and can be handed down to its parents.
+        # Commits after the date range are walked, but not parsed
+        for child in self.commitGraph.walk(list(branchesOfCommit.keys()), hiddenTips or [], self.config.since):
+            childBranches = branchesOfCommit.pop(child)
+            if self.config.until is None or self.commitGraph.commitTimes[child] <= self.config.until:
+                self.addBranches(pygit2.Oid(raw=self.commitGraph.getRawHash(child)), childBranches)
+            for parent in self.commitGraph.getParents(child):
+                branchesOfCommit[parent] = branchesOfCommit.get(parent, 0) | childBranches
+        
+        self.branchTable.freeze()
+        
+        # The stored hashes are not needed anymore, as all stored commits of the repository are in storedCommits
+        self.storedRevisionHashes = set()
                 
         self.logger.info("Getting tags...")
     
-        # Walk through every tag and put the information in the dictionary via the addtag method
+        # Walk through every tag and put the information in the branch table via the addtag method. Tags of trees or blobs are ignored
         for tag in tags:
             reference = self.repository.lookup_reference(tag)
-            tagObject = self.repository[reference.target.hex]
+            tagObject = self.repository[reference.target]
             taggedCommit = self.repository.lookup_reference(tag).peel()
+            if not isinstance(taggedCommit, pygit2.Commit):
+                continue
     
             self.addTag(taggedCommit, tag, tagObject)
 
@@ -170,6 +419,248 @@ class GitParser(BaseParser):
 
         
             
+    @staticmethod
+    def getPhysicalMemory():
+        """ Returns the size of the physical memory in bytes or None, if it can not be determined """
+        try:
+            return os.sysconf('SC_PAGE_SIZE')*os.sysconf('SC_PHYS_PAGES')
+        except (AttributeError, ValueError, OSError):
+            return None
+    
+    def getRepositorySettings(self):
+        """ Returns a dictionary with the libgit2 settings (in bytes) for the repository handles of the workers. The keys are
+        **cache_max_size** (object cache of every process), **mwindow_size** (size of one memory mapped packfile window) and
+        **mwindow_mapped_limit** (memory mapped packfiles of every process). Values, which are not configured, are derived
+        from the physical memory: an eighth of it is shared by the object caches of all workers and a quarter by the mapped
+        packfiles. A value of None keeps the libgit2 default.
+        
+        .. NOTE:: Both limits are global for a process in libgit2 and not per repository handle. Therefore, the derived values \
+        are divided by the number of workers only for processes, the threads of the parser share them.
+        """
+        megabyte = 1024*1024
+        workers = self.NUMBER_OF_PROCESSES
+        memory = self.getPhysicalMemory()
+        
+        # Both limits are per process, threads share one process
+        cacheMaxSize = self.config.cache_max_size*megabyte or None
+        if cacheMaxSize is None and memory is not None:
+            cacheMaxSize = memory//8
+            if self.config.worker_type == 'processes':
+                cacheMaxSize //= workers
+        
+        mappedLimit = self.config.mwindow_mapped_limit*megabyte or None
+        if mappedLimit is None and memory is not None:
+            mappedLimit = memory//4
+            if self.config.worker_type == 'processes':
+                mappedLimit //= workers
+        
+        return {'cache_max_size': cacheMaxSize,
+                'mwindow_size': self.config.mwindow_size*megabyte or None,
+                'mwindow_mapped_limit': mappedLimit}
+    
+    @staticmethod
+    def getChanges(commit):
+        """ Returns a list of tuples of the path, the status (e.g. :data:`pygit2.GIT_DELTA_ADDED`) and the ids of the old and the new
+        blob (as strings) of the files, which differ between the trees of the commit and its first parent (or the empty tree for an
+        initial commit). Only the trees are compared, no patches are generated.
+        
+        :param commit: commit object of type :class:`pygit2.Commit`
+        """
+        if commit.parents:
+            diff = commit.parents[0].tree.diff_to_tree(commit.tree)
+        else:
+            diff = commit.tree.diff_to_tree()
+        return [(delta.new_file.path, delta.status, str(delta.old_file.id), str(delta.new_file.id)) for delta in diff.deltas]
+    
+    @staticmethod
+    def estimateCost(commit):
+        """ Estimates the cost of parsing a commit by the number of its changed files (see: \
+        :func:`pyvcsshark.parser.gitparser.GitParser.getChanges`).
+        
+        :param commit: commit object of type :class:`pygit2.Commit`
+        """
+        # Every commit has some overhead, even if nothing was changed
+        return len(GitParser.getChanges(commit)) + 1
+    
+    def estimateCosts(self):
+        """ Estimates the costs of all commits to parse (see: :func:`pyvcsshark.parser.gitparser.GitParser.estimateCost`) with one
+        process (or thread, depending on the worker type) per parsing process. Returns a tuple of a list of tuples of the cost and
+        the revision hash of every commit and a dictionary, which maps the revision hashes of the commits, that have more changed
+        files than the split threshold, to their changes (see: :func:`pyvcsshark.parser.gitparser.GitParser.getChanges`).
+        
+        .. NOTE:: The trees of every commit are compared only once in the parser. The changed paths of the commits, which are split, \
+        are partitioned without comparing the trees again (see: :func:`pyvcsshark.parser.gitparser.GitParser.getPartitions`).
+        """
+        splitThreshold = self.config.split_threshold if self.NUMBER_OF_PROCESSES > 1 else 0
+        estimator = CostEstimator(self.repository.path, splitThreshold)
+        batches = [self.commitsToParse[i:i+self.ESTIMATE_BATCH_SIZE] for i in range(0, len(self.commitsToParse), self.ESTIMATE_BATCH_SIZE)]
+        
+        if self.NUMBER_OF_PROCESSES > 1 and len(batches) > 1:
+            poolClass = multiprocessing.pool.ThreadPool if self.config.worker_type == 'threads' else multiprocessing.Pool
+            pool = poolClass(self.NUMBER_OF_PROCESSES)
+            try:
+                results = pool.map(estimator, batches)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = [estimator(batch) for batch in batches]
+        
+        costs = []
+        changesOfCommit = {}
+        for result in results:
+            for cost, strCommitHash, changes in result:
+                costs.append((cost, strCommitHash))
+                if changes is not None:
+                    changesOfCommit[strCommitHash] = changes
+        return costs, changesOfCommit
+    
+    def getPartitionMode(self, changes):
+        """ Returns the similarity mode of a split commit or None, if the commit must not be split.
+        
+        The partitions are diffed without rename detection. Only renames with an identical blob can be found across them (see: \
+        :func:`pyvcsshark.parser.gitparser.GitParser.getExactRenames`). Therefore,
+        a commit is only split, if the parsing worker would not detect similar files either (see: \
+        :func:`pyvcsshark.parser.gitparser.CommitParserWorker.findSimilar`): the rename detection is off, there are no candidates \
+        for renames and copies or only renames with an identical blob are detected (mode **exact**).
+        
+        :param changes: changes of the commit (see: :func:`pyvcsshark.parser.gitparser.GitParser.getChanges`)
+        """
+        if self.config.rename_detection == 'off':
+            return 'off'
+        
+        candidates = CommitParserWorker.countRenameCandidates([change[:2] for change in changes], self.config.rename_detection,
+                                                              self.config.include_paths, self.config.exclude_paths)
+        if CommitParserWorker.isExactOnly(candidates, self.config.rename_limit):
+            return 'exact'
+        
+        sources, targets, excludedSources, excludedTargets = candidates
+        if (sources+excludedSources)*(targets+excludedTargets) == 0:
+            return self.config.rename_detection
+        return None
+    
+    def getExactRenames(self, changes):
+        """ Returns a dictionary, which maps the path of every added file of a split commit, whose blob is identical to the blob of a
+        deleted file, to the path of that deleted file. Every deleted file is paired only once. Files, which are filtered out by the path
+        patterns of the configuration, are not paired (see: :func:`pyvcsshark.parser.gitparser.CommitParserWorker.matchesPathPatterns`).
+        
+        :param changes: changes of the commit (see: :func:`pyvcsshark.parser.gitparser.GitParser.getChanges`)
+        """
+        deletedPaths = {}
+        for path, status, oldId, newId in changes:
+            if status == pygit2.GIT_DELTA_DELETED and \
+                    CommitParserWorker.matchesPathPatterns(path, self.config.include_paths, self.config.exclude_paths):
+                deletedPaths.setdefault(oldId, []).append(path)
+        
+        renames = {}
+        for path, status, oldId, newId in changes:
+            if status == pygit2.GIT_DELTA_ADDED and deletedPaths.get(newId) and \
+                    CommitParserWorker.matchesPathPatterns(path, self.config.include_paths, self.config.exclude_paths):
+                renames[path] = deletedPaths[newId].pop(0)
+        return renames
+    
+    def getPartitions(self, paths, partitionCount):
+        """ Splits the changed files of a commit by their path prefix into at most partitionCount partitions of about the same
+        number of files. A directory, which holds more files than a partition should have, is split by its subdirectories.
+        Returns a list of partitions, where every partition is a tuple of path prefixes (directories or files).
+        
+        :param paths: changed paths of the commit (see: :func:`pyvcsshark.parser.gitparser.GitParser.getChanges`)
+        :param partitionCount: maximum number of partitions
+        """
+        targetSize = len(paths) / partitionCount
+        
+        # Group the paths by prefix, prefixes with too many paths are split by the next path component
+        groups = []
+        pending = [(None, 0, paths)]
+        while pending:
+            prefix, depth, groupPaths = pending.pop()
+            if prefix is not None and (len(groupPaths) <= targetSize or prefix in groupPaths):
+                groups.append((len(groupPaths), prefix))
+                continue
+            
+            children = {}
+            for path in groupPaths:
+                children.setdefault('/'.join(path.split('/')[:depth+1]), []).append(path)
+            for childPrefix, childPaths in children.items():
+                pending.append((childPrefix, depth+1, childPaths))
+        
+        # The biggest groups first, every group goes to the partition with the fewest files
+        groups.sort(reverse=True)
+        partitions = [[0, i, []] for i in range(partitionCount)]
+        for size, prefix in groups:
+            partition = min(partitions)
+            partition[0] += size
+            partition[2].append(prefix)
+        
+        return [tuple(sorted(prefixes)) for size, i, prefixes in partitions if prefixes]
+    
+    def scheduleCommits(self):
+        """ Splits the commits to parse into chunks for the parsing processes. The commits are sorted by their estimated
+        cost (see: :func:`pyvcsshark.parser.gitparser.GitParser.estimateCosts`), largest first, so that huge commits (e.g. initial
+        imports) are not left for the end, where one process works on them while the others are idle. A chunk is closed when
+        its cost reaches the total cost divided by :attr:`NUMBER_OF_PROCESSES` times :attr:`CHUNKS_PER_PROCESS` or when it has
+        :attr:`MAX_CHUNK_SIZE` commits. Therefore, expensive commits are dispatched on their own and cheap ones in larger chunks.
+        
+        Commits with more changed files than the split threshold of the configuration are split into one partition per process
+        (see: :func:`pyvcsshark.parser.gitparser.GitParser.getPartitions`). Every partition is a chunk of its own, so that the
+        processes diff the commit in parallel. Commits, whose renamed and copied files could span several partitions, are not split \
+        (see: :func:`pyvcsshark.parser.gitparser.GitParser.getPartitionMode`).
+        
+        Returns a list of chunks, where every chunk is either a list of revision hashes or a list with one tuple of a revision hash,
+        the path prefixes of a partition and the renamed files of the commit (see: :func:`pyvcsshark.parser.gitparser.GitParser.getExactRenames`)
+        or None, if the similarity mode is not **exact**.
+        """
+        self.logger.info("Estimating the cost of %d commits..." % (len(self.commitsToParse)))
+        costs, changesOfCommit = self.estimateCosts()
+        costs.sort(reverse=True)
+        
+        targetCost = sum(cost for cost, strCommitHash in costs) / (self.NUMBER_OF_PROCESSES*self.CHUNKS_PER_PROCESS)
+        
+        chunks = []
+        chunk = []
+        chunkCost = 0
+        self.partitionCounts = {}
+        self.partitionModes = {}
+        for cost, strCommitHash in costs:
+            # Only the commits with more changed files than the split threshold have their changes
+            changes = changesOfCommit.pop(strCommitHash, None)
+            partitionMode = self.getPartitionMode(changes) if changes is not None else None
+            if changes is not None and partitionMode is None:
+                self.logger.info("Not splitting commit %s with %d changed files, as it has candidates for renames and copies..." %
+                                 (strCommitHash, cost-1))
+            elif changes is not None:
+                partitions = self.getPartitions([change[0] for change in changes], self.NUMBER_OF_PROCESSES)
+                if len(partitions) > 1:
+                    self.logger.info("Splitting commit %s with %d changed files into %d partitions..." % (strCommitHash, cost-1, len(partitions)))
+                    self.partitionCounts[strCommitHash] = len(partitions)
+                    self.partitionModes[strCommitHash] = partitionMode
+                    renames = self.getExactRenames(changes) if partitionMode == 'exact' else None
+                    chunks.extend([[(strCommitHash, prefixes, renames)] for prefixes in partitions])
+                    continue
+            
+            chunk.append(strCommitHash)
+            chunkCost += cost
+            if chunkCost >= targetCost or len(chunk) >= self.MAX_CHUNK_SIZE:
+                chunks.append(chunk)
+                chunk = []
+                chunkCost = 0
+        
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+            
+    def mergePartitions(self, partialResults):
+        """ Merges the changed files of the partitions of a split commit, which were not handed over to the datastore by the
+        partitions themselves (see: :func:`pyvcsshark.parser.gitparser.CommitParserWorker.parsePartition`). Returns a tuple of the
+        list of changed files and the number of parts, in which the partitions handed over their changed files.
+        
+        :param partialResults: list of the results of the partitions. Every result is a tuple of the list of changed files \
+        (type: :class:`pyvcsshark.dbmodels.models.FileModel`) and the number of parts, which were handed over
+        """
+        changedFiles = [changedFile for partialFiles, streamedChunks in partialResults for changedFile in partialFiles]
+        changedFiles.sort(key=lambda changedFile: changedFile.path)
+        return changedFiles, sum(streamedChunks for partialFiles, streamedChunks in partialResults)
+    
     def parse(self, repositoryPath, datastore):
         """ Parses the repository, which is located at the repositoryPath and save the parsed commits in the
         datastore, by calling the :func:`pyvcsshark.datastores.basestore.BaseStore.addCommit` method of the chosen datastore. It
@@ -179,118 +670,481 @@ class GitParser(BaseParser):
         
             1. A list of all branches and tags are created
             2. All branches and tags are parsed. So we create dictionary of all commits with their corresponding tags and branches and add all \
-        revision hashes to the commitqueue
-            3. Add the poison pills for terminating of the parsing process to the commitqueue
-            4. Create processes of class :class:`pyvcsshark.parser.gitparser.CommitParserProcess`, which parse all commits.
+        revision hashes to the commits to parse
+            3. The commits to parse are split into chunks, largest first (see: :func:`pyvcsshark.parser.gitparser.GitParser.scheduleCommits`)
+            4. Create workers, which parse all commits. Depending on the worker type, these are processes of class \
+        :class:`pyvcsshark.parser.gitparser.CommitParserProcess` or threads of class :class:`pyvcsshark.parser.gitparser.CommitParserThread`
+            5. Put the chunks and the poison pills for terminating of the parsing process into the commitqueue
+            6. Hand over the commits, which are already stored, without changed files, so that the datastore can update their branches and tags
+            7. Merge the partitions of the split commits (see: :func:`pyvcsshark.parser.gitparser.GitParser.mergePartitions`), while the \
+        workers parse, and hand them over
+            8. Log the utilisation of every parsing process
         
         
         """
         self.datastore = datastore
         self.logger.info("Starting parsing process...")
         
+        chunks = self.scheduleCommits()
+        
+        # Threads do not need to pickle the chunks, therefore they use a normal queue
+        if self.config.worker_type == 'threads':
+            workerClass = CommitParserThread
+            self.commitQueue = queue.Queue(self.NUMBER_OF_PROCESSES*self.QUEUED_CHUNKS_PER_PROCESS)
+            statsQueue = queue.Queue()
+            partitionQueue = queue.Queue()
+        else:
+            workerClass = CommitParserProcess
+            statsQueue = multiprocessing.Queue()
+            partitionQueue = multiprocessing.Queue()
+        
+        repositorySettings = self.getRepositorySettings()
+        self.logger.info("Using libgit2 settings %s" % (repositorySettings))
+        
+        diffCache = None
+        if self.config.diff_cache_dir:
+            self.logger.info("Using diff cache in %s..." % (self.config.diff_cache_dir))
+            diffCache = DiffCache(self.config.diff_cache_dir, self.config.diff_cache_size*1024*1024)
+        
+        # Parsing all commits of the queue
+        self.logger.info("Parsing commits with %d %s..." % (self.NUMBER_OF_PROCESSES, self.config.worker_type))
+        for i in range(self.NUMBER_OF_PROCESSES):
+            worker = workerClass(self.commitQueue, self.branchTable, self.repository.path, self.datastore,
+                                 self.config.diff_level, diffCache, self.config.rename_detection,
+                                 self.config.rename_limit, statsQueue, repositorySettings, self.config.include_paths,
+                                 self.config.exclude_paths, self.config.stats_only_size, partitionQueue, self.config.report_top)
+            worker.daemon=True
+            worker.start()
+        
+        for chunk in chunks:
+            self.commitQueue.put(chunk)
+        
         # Set up the poison pills
         for i in range(self.NUMBER_OF_PROCESSES):
             self.commitQueue.put(None)
         
-        # Parsing all commits of the queue
-        self.logger.info("Parsing commits...")
-        lock = multiprocessing.Lock()
-        for i in range(self.NUMBER_OF_PROCESSES):
-            thread = CommitParserProcess(self.commitQueue, self.commitsToBeProcessed, self.repository, self.datastore, lock)
-            thread.daemon=True
-            thread.start()
+        # Commits that are already stored are not diffed again. The datastore only needs to check their branches and tags
+        self.logger.info("Updating %d already stored commits..." % (len(self.storedCommits)))
+        batch = CommitBatch(self.datastore)
+        for strCommitHash in self.storedCommits:
+            commit = self.repository[pygit2.Oid(hex=strCommitHash)]
+            batch.add(CommitParserWorker.createCommitModel(commit, self.branchTable, []))
+        
+        # The partitions are collected, while the workers parse, so that they do not pile up in the queue. Every partition only
+        # holds the changed files, which it did not hand over to the datastore itself
+        partialResults = {}
+        for i in range(sum(self.partitionCounts.values())):
+            strCommitHash, partialFiles, streamedChunks = partitionQueue.get()
+            partialResults.setdefault(strCommitHash, []).append((partialFiles, streamedChunks))
+            if len(partialResults[strCommitHash]) == self.partitionCounts[strCommitHash]:
+                commit = self.repository[pygit2.Oid(hex=strCommitHash)]
+                changedFiles, streamedChunks = self.mergePartitions(partialResults.pop(strCommitHash))
+                commitModel = CommitParserWorker.createCommitModel(commit, self.branchTable, changedFiles, self.partitionModes[strCommitHash])
+                commitModel.streamedChunks = streamedChunks
+                batch.add(commitModel)
         
         self.commitQueue.join()
+        batch.flush()
+        
+        # Every process reports its utilisation and its timings before it takes its poison pill
+        self.report = TimingReport(self.config.report_top)
+        for i in range(self.NUMBER_OF_PROCESSES):
+            name, parsedCommits, busyTime, totalTime, report = statsQueue.get()
+            self.logger.info("%s parsed %d commits and was busy for %0.2f s of %0.2f s (%0.1f%%)" %
+                             (name, parsedCommits, busyTime, totalTime, 100*busyTime/max(totalTime, 1e-9)))
+            self.report.merge(report)
+        
+        # All commits were handed over, now the datastore can remember the references for the next run. After a partial run,
+        # the commits of the references are not complete
+        if self.config.isPartialRun():
+            self.logger.info("Partial run, the references are not remembered for the next run")
+        else:
+            self.datastore.storeRefSnapshot(self.refSnapshot)
         self.logger.info("Parsing complete...")
 
         return
 
 
-class CommitParserProcess(multiprocessing.Process):
+class CommitBatch(object):
+    """ Collects commit models and hands them over to the datastore via :func:`pyvcsshark.datastores.basestore.BaseStore.addCommits`.
+    A batch is handed over, as soon as it has :attr:`MAX_COMMITS` commits or its approximate size
+    (see: :func:`pyvcsshark.dbmodels.models.CommitModel.getApproximateSize`) reaches :attr:`MAX_BYTES`.
+    
+    :param datastore: object, that is a subclass of :class:`pyvcsshark.datastores.basestore.BaseStore`
+    
+    .. WARNING:: :func:`pyvcsshark.parser.gitparser.CommitBatch.flush` must be called in the end, otherwise the last commits are lost
+    """
+    
+    MAX_COMMITS = 100
+    MAX_BYTES = 8*1024*1024
+    
+    def __init__(self, datastore):
+        self.datastore = datastore
+        self.commitModels = []
+        self.size = 0
+    
+    def add(self, commitModel):
+        """ Adds a commit to the batch and hands the batch over, if it is full
+        
+        :param commitModel: object of class :class:`pyvcsshark.dbmodels.models.CommitModel`
+        """
+        self.commitModels.append(commitModel)
+        self.size += commitModel.getApproximateSize()
+        if len(self.commitModels) >= self.MAX_COMMITS or self.size >= self.MAX_BYTES:
+            self.flush()
+    
+    def flush(self):
+        """ Hands the collected commits over to the datastore """
+        if self.commitModels:
+            self.datastore.addCommits(self.commitModels)
+        self.commitModels = []
+        self.size = 0
+
+
+class ChangedFilesStream(object):
+    """ Collects the changed files of one commit. If the datastore streams file actions (see:
+    :attr:`pyvcsshark.datastores.basestore.BaseStore.streamsFileActions`), the collected files are handed over via
+    :func:`pyvcsshark.datastores.basestore.BaseStore.addFileActions`, as soon as their approximate size
+    (see: :func:`pyvcsshark.dbmodels.models.FileModel.getApproximateSize`) reaches :attr:`MAX_BYTES`. Therefore, a commit with
+    very many changes is never held in memory completely.
+    
+    :param datastore: object, that is a subclass of :class:`pyvcsshark.datastores.basestore.BaseStore`, or None, if nothing \
+    should be handed over
+    :param revisionHash: revision hash of the commit
+    
+    :property files: list of the changed files, which were not handed over yet
+    :property streamed: true, if changed files were handed over
+    :property streamedChunks: number of parts, in which the changed files were handed over
+    :property streamedFiles: number of changed files, which were handed over
+    :property streamedBytes: approximate size of the changed files, which were handed over
+    :property handoffTime: time in seconds, which the hand over took
+    """
+    
+    MAX_BYTES = 8*1024*1024
+    
+    def __init__(self, datastore, revisionHash):
+        self.datastore = datastore
+        self.revisionHash = revisionHash
+        self.files = []
+        self.size = 0
+        self.streamed = False
+        self.streamedChunks = 0
+        self.streamedFiles = 0
+        self.streamedBytes = 0
+        self.handoffTime = 0.0
+        self.streaming = datastore is not None and getattr(datastore, 'streamsFileActions', False)
+    
+    def append(self, changedFile):
+        """ Adds a changed file and hands the collected files over, if they are too big
+        
+        :param changedFile: object of class :class:`pyvcsshark.dbmodels.models.FileModel`
+        """
+        self.files.append(changedFile)
+        if not self.streaming:
+            return
+        
+        self.size += changedFile.getApproximateSize()
+        if self.size >= self.MAX_BYTES:
+            startTime = timeit.default_timer()
+            self.datastore.addFileActions(self.revisionHash, self.files)
+            self.handoffTime += timeit.default_timer()-startTime
+            self.streamedChunks += 1
+            self.streamedFiles += len(self.files)
+            self.streamedBytes += self.size
+            self.files = []
+            self.size = 0
+            self.streamed = True
+
+
+class CostEstimator(object):
+    """ Estimates the costs of batches of commits (see: :func:`pyvcsshark.parser.gitparser.GitParser.estimateCost`). It is called by
+    the processes or threads of a pool (see: :func:`pyvcsshark.parser.gitparser.GitParser.estimateCosts`), every one of them opens
+    its own repository handle.
+    
+    :param repositoryPath: path to the repository
+    :param splitThreshold: the changes of commits, which have more changed files, are returned as well. If it is 0, \
+    no changes are returned
     """
-    A process, which inherits from :class:`multiprocessing.Process`, that will parse the branches it 
-    gets from the queue and call the :func:`pyvcsshark.datastores.basestore.BaseStore.addCommit` function to add
+    
+    local = threading.local()
+    
+    def __init__(self, repositoryPath, splitThreshold):
+        self.repositoryPath = repositoryPath
+        self.splitThreshold = splitThreshold
+    
+    def __call__(self, strCommitHashes):
+        """ Returns a list of tuples of the cost, the revision hash and the changes (or None, if the commit has not more \
+        changed files than the split threshold) of the commits
+        
+        :param strCommitHashes: list of revision hashes
+        """
+        # A forked process must not use the handle of its parent
+        key = (os.getpid(), self.repositoryPath)
+        if getattr(self.local, 'key', None) != key:
+            self.local.repository = pygit2.Repository(self.repositoryPath)
+            self.local.key = key
+        
+        result = []
+        for strCommitHash in strCommitHashes:
+            changes = GitParser.getChanges(self.local.repository[pygit2.Oid(hex=strCommitHash)])
+            cost = len(changes) + 1
+            if not self.splitThreshold or len(changes) <= self.splitThreshold:
+                changes = None
+            result.append((cost, strCommitHash, changes))
+        return result
+
+
+class CommitParserWorker(object):
+    """
+    Base class of the parsing workers (see: :class:`pyvcsshark.parser.gitparser.CommitParserProcess` and
+    :class:`pyvcsshark.parser.gitparser.CommitParserThread`). A worker will parse the chunks of commits it 
+    gets from the queue and call the :func:`pyvcsshark.datastores.basestore.BaseStore.addCommits` function to add
     the commits
     
     :property logger: logger acquired by calling logging.getLogger("parser")
     
-    :param queue: queue, where the different commithashes are stored in
-    :param commitsToBeProcessed: dictionary, which contains information about the branches and tags of each commit
-    :param repository: repository object of type :class:`pygit2.Repository`
-    :param datastore: object, that is a subclass of :class:`pyvcsshark.datastores.basestore.BaseStore`
-    :param lock: lock that is used, so that only one process at a time is calling the :func:`pyvcsshark.datastores.basestore.BaseStore.addCommit` function
+    :param queue: queue, where the chunks (lists) of commithashes are stored in
+    :param branchTable: object of class :class:`pyvcsshark.parser.branchtable.BranchTable`, which contains information about the branches and tags of each commit
+    :param repositoryPath: path to the repository. Every worker opens its own :class:`pygit2.Repository`, when it is started
+    :param datastore: object, that is a subclass of :class:`pyvcsshark.datastores.basestore.BaseStore`. The commits are handed over \
+    in batches (see: :class:`pyvcsshark.parser.gitparser.CommitBatch`)
+    :param diffLevel: level of detail of the changed files (see: :attr:`pyvcsshark.config.Config.DIFF_LEVELS`). With **stats**, no hunks \
+    are created and with **names**, not even the patches are generated
+    :param diffCache: object of class :class:`pyvcsshark.parser.diffcache.DiffCache`, where the changed files are looked up before \
+    a diff is computed. If it is None, every diff is computed
+    :param renameDetection: detection of renamed and copied files (see: :attr:`pyvcsshark.config.Config.RENAME_DETECTIONS`)
+    :param renameLimit: limit for the rename detection. If the candidate pairs of a commit exceed its square, only renames with \
+    identical content are detected
+    :param statsQueue: queue (e.g. :class:`multiprocessing.Queue`). If it is given, the worker puts a tuple of its name, the number \
+    of parsed commits, the time it was busy parsing, the time it was running and its timing report into it, before it exits
+    :param repositorySettings: dictionary with the libgit2 settings, which are applied before the repository is opened \
+    (see: :func:`pyvcsshark.parser.gitparser.GitParser.getRepositorySettings`). None values keep the libgit2 defaults
+    :param includePaths: list of glob patterns. If it is not empty, only changed files, which match one of them, are diffed \
+    (see: :func:`pyvcsshark.parser.gitparser.CommitParserWorker.isPathIncluded`)
+    :param excludePaths: list of glob patterns. Changed files, which match one of them, are not diffed
+    :param statsOnlySize: size in bytes, above which no hunks are created for a file. If it is 0, there is no limit
+    :param partitionQueue: queue, where the changed files of the partitions of split commits, which were not handed over to the \
+    datastore, are put into (see: :func:`pyvcsshark.parser.gitparser.CommitParserWorker.parsePartition`)
+    
+    :param reportTop: number of slowest commits, which are kept in the timing report
+    
+    :property repository: object of class :class:`pygit2.Repository`, which is opened by :func:`pyvcsshark.parser.gitparser.CommitParserWorker.openRepository`
+    :property report: object of class :class:`pyvcsshark.parser.timingreport.TimingReport` with the timings of the parsed commits
+    :property timings: dictionary, which maps the stages of the timing report to the time, which the current commit took in them
+    
+    :property MODES: dictionary, which maps the status of a :class:`pygit2.DiffDelta` to the mode of the file action
     """
     
-    def __init__(self, queue, commitsToBeProcessed, repository, datastore, lock):
-        multiprocessing.Process.__init__(self)
+    MODES = {
+        pygit2.GIT_DELTA_ADDED: 'A',
+        pygit2.GIT_DELTA_DELETED: 'D',
+        pygit2.GIT_DELTA_MODIFIED: 'M',
+        pygit2.GIT_DELTA_RENAMED: 'R',
+        pygit2.GIT_DELTA_COPIED: 'C',
+        pygit2.GIT_DELTA_IGNORED: 'I',
+        pygit2.GIT_DELTA_UNTRACKED: 'U',
+        pygit2.GIT_DELTA_TYPECHANGE: 'T',
+    }
+    
+    # Not exported by pygit2, value taken from libgit2 (git_diff_find_t)
+    GIT_DIFF_FIND_EXACT_MATCH_ONLY = getattr(pygit2, 'GIT_DIFF_FIND_EXACT_MATCH_ONLY', 1 << 14)
+    
+    def __init__(self, queue, branchTable, repositoryPath, datastore, diffLevel='full', diffCache=None,
+                 renameDetection='copies', renameLimit=1000, statsQueue=None, repositorySettings=None,
+                 includePaths=None, excludePaths=None, statsOnlySize=0, partitionQueue=None, reportTop=20):
         self.queue = queue
-        self.commitsToBeProcessed = commitsToBeProcessed
+        self.branchTable = branchTable
         self.datastore = datastore
         self.logger = logging.getLogger("parser")
-        self.repository = repository
-        self.lock = lock
+        self.repositoryPath = repositoryPath
+        self.repositorySettings = repositorySettings or {}
+        self.repository = None
+        self.batch = CommitBatch(datastore)
+        self.diffLevel = diffLevel
+        self.diffCache = diffCache
+        self.renameDetection = renameDetection
+        self.renameLimit = renameLimit
+        self.statsQueue = statsQueue
+        self.includePaths = list(includePaths or [])
+        self.excludePaths = list(excludePaths or [])
+        self.statsOnlySize = statsOnlySize
+        self.partitionQueue = partitionQueue
+        self.report = TimingReport(reportTop)
+        self.timings = {}
+        
+        # Everything besides the trees, that changes the result of a diff
+        self.cacheVariant = "%s:%d:%s:%d:%s:%s:%d" % (self.diffLevel, GitParser.SIMILARITY_THRESHOLD, self.renameDetection, self.renameLimit,
+                                                     ",".join(self.includePaths), ",".join(self.excludePaths), self.statsOnlySize)
         
     def run(self):
         """
-        The process gets a commit out of the queue and processes it.
-        We use the poisonous pill technique here. Means, our queue has #Processes times "None" in it in the end.
-        If a process encounters that None, he will stop and terminate.
+        The worker gets a chunk of commits out of the queue and processes them.
+        We use the poisonous pill technique here. Means, our queue has #Workers times "None" in it in the end.
+        If a worker encounters that None, he will stop and terminate.
         """
+        self.openRepository()
+        startTime = timeit.default_timer()
+        busyTime = 0
+        parsedCommits = 0
         while True:
             nextTask = self.queue.get()
             # If process pulls the poisoned pill, he exits
             if(nextTask is None):
+                self.batch.flush()
+                if self.statsQueue is not None:
+                    self.statsQueue.put((self.name, parsedCommits, busyTime, timeit.default_timer()-startTime, self.report))
                 self.queue.task_done()
                 break
-            commitHash = pygit2.Oid(hex=nextTask)
-            commit = self.repository[commitHash]
-            self.parseCommit(commit)
+            
+            taskStartTime = timeit.default_timer()
+            for task in nextTask:
+                if isinstance(task, tuple):
+                    self.parsePartition(*task)
+                else:
+                    commit = self.repository[pygit2.Oid(hex=task)]
+                    self.parseCommit(commit)
+            busyTime += timeit.default_timer()-taskStartTime
+            parsedCommits += len(nextTask)
             self.queue.task_done()
 
                
             
         return
     
+    def openRepository(self):
+        """ Applies the libgit2 settings and opens the repository. It is called after the worker was started, so that no
+        worker shares the file descriptors, the object cache or the memory mapped packfiles of the parser.
+        
+        .. NOTE:: The libgit2 settings are global for a process. If the workers are threads, every thread sets the same values.
+        """
+        if self.repositorySettings.get('cache_max_size'):
+            pygit2.settings.cache_max_size(self.repositorySettings['cache_max_size'])
+        if self.repositorySettings.get('mwindow_size'):
+            pygit2.settings.mwindow_size = self.repositorySettings['mwindow_size']
+        if self.repositorySettings.get('mwindow_mapped_limit'):
+            pygit2.settings.mwindow_mapped_limit = self.repositorySettings['mwindow_mapped_limit']
+        
+        self.repository = pygit2.Repository(self.repositoryPath)
+    
+    def addTiming(self, stage, startTime):
+        """ Adds the time since the start time to the stage of the current commit
+        
+        :param stage: stage of the timing report (see: :attr:`pyvcsshark.parser.timingreport.TimingReport.STAGES`)
+        :param startTime: start time, as returned by :func:`timeit.default_timer`
+        """
+        self.timings[stage] = self.timings.get(stage, 0.0)+timeit.default_timer()-startTime
+    
+    def recordCommit(self, revisionHash, changedFiles, stream, partition=False):
+        """ Adds the timings of the current commit to the report and resets them
+        
+        :param revisionHash: revision hash of the commit
+        :param changedFiles: list of :class:`pyvcsshark.dbmodels.models.FileModel`, which were not handed over by the stream
+        :param stream: object of class :class:`pyvcsshark.parser.gitparser.ChangedFilesStream` or None
+        :param partition: true, if only a partition of a split commit was parsed
+        """
+        files = len(changedFiles)
+        size = sum(changedFile.getApproximateSize() for changedFile in changedFiles)
+        if stream is not None:
+            self.timings['handoff'] = self.timings.get('handoff', 0.0)+stream.handoffTime
+            files += stream.streamedFiles
+            size += stream.streamedBytes
+        self.report.addCommit(revisionHash, self.timings, files, size, partition)
+        self.timings = {}
+    
     def parseCommit(self, commit):
         """ Function for parsing a commit.
         
-        1. changedFiles are created (type: list of :class:`pyvcsshark.dbmodels.models.FileModel`)
-        2. author and commiter are created (type: :class:`pyvcsshark.dbmodels.models.PeopleModel`)
-        3. parents are added (list of strings)
-        4. commit model is created (type: :class:`pyvcsshark.dbmodels.models.CommitModel`)
-        5. :func:`pyvcsshark.datastores.basestore.BaseStore.addCommit` is called
+        1. changedFiles are created (type: list of :class:`pyvcsshark.dbmodels.models.FileModel`). For big commits, a part of them is \
+        handed over to the datastore on the way (see: :class:`pyvcsshark.parser.gitparser.ChangedFilesStream`)
+        2. commit model is created (type: :class:`pyvcsshark.dbmodels.models.CommitModel`) via :func:`pyvcsshark.parser.gitparser.CommitParserWorker.createCommitModel`
+        3. commit model is added to the batch, which is handed over to :func:`pyvcsshark.datastores.basestore.BaseStore.addCommits`
         
         :param commit: commit object of type :class:`pygit2.Commit`
-        
-        .. NOTE:: The call to :func:`pyvcsshark.datastores.basestore.BaseStore.addCommit` is thread/process safe, as a lock is used to regulate the calls
         """
-        changedFiles = []
+        # Big commits hand over their changed files in parts, while they are diffed
+        stream = ChangedFilesStream(self.datastore, str(commit.id))
+        
         # If there are parents, we need to get the normal changed files, if not we need to get the files for initial commit
         if commit.parents:
-            changedFiles = self.getChangedFilesWithSimiliarity(commit.parents[0], commit)
+            changedFiles, similarityMode = self.getChangedFilesWithSimiliarity(commit.parents[0], commit, stream)
+        else:
+            # There is nothing to detect, as all files are added
+            changedFiles = self.getChangedFilesForInitialCommit(commit, stream)
+            similarityMode = self.renameDetection
+            
+        commitModel = self.createCommitModel(commit, self.branchTable, changedFiles, similarityMode)
+        commitModel.streamedChunks = stream.streamedChunks
+        startTime = timeit.default_timer()
+        self.batch.add(commitModel)
+        self.addTiming('handoff', startTime)
+        self.recordCommit(str(commit.id), changedFiles, stream)
+
+    def parsePartition(self, strCommitHash, prefixes, renames=None):
+        """ Parses the changed files of a split commit, whose paths start with one of the prefixes (see:
+        :func:`pyvcsshark.parser.gitparser.GitParser.getPartitions`). No rename detection is run and the diff cache is not used.
+        Like for a commit, which is not split, big partitions hand over their changed files in parts to the datastore (see:
+        :class:`pyvcsshark.parser.gitparser.ChangedFilesStream`). The remaining changed files are put into the partition queue together
+        with the number of parts, so that the parser can merge them (see: :func:`pyvcsshark.parser.gitparser.GitParser.mergePartitions`).
+        
+        :param strCommitHash: revision hash of the commit
+        :param prefixes: tuple of path prefixes of the partition
+        :param renames: dictionary, which maps the paths of the renamed files of the commit to their old paths (see: \
+        :func:`pyvcsshark.parser.gitparser.GitParser.getExactRenames`) or None. The old paths are left out and the renamed files \
+        are not added, but renamed
+        """
+        commit = self.repository[pygit2.Oid(hex=strCommitHash)]
+        initialCommit = not commit.parents
+        startTime = timeit.default_timer()
+        if initialCommit:
+            diff = commit.tree.diff_to_tree(context_lines=0, interhunk_lines=1)
         else:
-            changedFiles = self.getChangedFilesForInitialCommit(commit)
+            diff = self.repository.diff(commit.parents[0], commit, context_lines=0, interhunk_lines=1)
+        self.addTiming('diff', startTime)
+        
+        renames = renames or {}
+        oldPaths = set(renames.values())
+        stream = ChangedFilesStream(self.datastore, strCommitHash)
+        for patch, delta in self.iterateDiff(diff, initialCommit, prefixes):
+            mode = 'A' if initialCommit else self.MODES.get(delta.status, 'X')
+            if mode == 'D' and delta.old_file.path in oldPaths:
+                continue
             
+            changedFile = self.createFileModel(patch, delta, mode, initialCommit)
+            if mode == 'A' and changedFile.path in renames:
+                changedFile.mode = 'R'
+                changedFile.oldPath = renames[changedFile.path]
+                changedFile.linesAdded = 0
+                changedFile.linesDeleted = 0
+                changedFile.hunks = []
+            stream.append(changedFile)
+        
+        startTime = timeit.default_timer()
+        self.partitionQueue.put((strCommitHash, stream.files, stream.streamedChunks))
+        self.addTiming('handoff', startTime)
+        self.recordCommit(strCommitHash, stream.files, stream, True)
+
+    @staticmethod
+    def createCommitModel(commit, branchTable, changedFiles, similarityMode=None):
+        """ Creates the commit model (type: :class:`pyvcsshark.dbmodels.models.CommitModel`) for a commit. The author
+        and committer (type: :class:`pyvcsshark.dbmodels.models.PeopleModel`) and the parents (list of strings) are created from the commit and
+        the branches and tags are looked up in the branch table.
+        
+        :param commit: commit object of type :class:`pygit2.Commit`
+        :param branchTable: object of class :class:`pyvcsshark.parser.branchtable.BranchTable`
+        :param changedFiles: list of :class:`pyvcsshark.dbmodels.models.FileModel`
+        :param similarityMode: detection of renamed and copied files, which produced the changed files
+        """
         strCommitHash = str(commit.id)
 
         # Create the different models
         authorModel = PeopleModel(commit.author.name, commit.author.email)
         committerModel = PeopleModel(commit.committer.name, commit.committer.email)
         parentIds = [str(parentId) for parentId in commit.parent_ids]
-                 
-                 
-        
-        commitModel = CommitModel(strCommitHash, self.commitsToBeProcessed[strCommitHash]['branches'],
-                                  self.commitsToBeProcessed[strCommitHash]['tags'], parentIds,
-                                  authorModel, committerModel, commit.message, changedFiles, commit.author.time,
-                                  commit.author.offset, commit.committer.time, commit.committer.offset)
-        
-        # Make sure, that addCommit is only called by one process at a time
-        self.lock.acquire()
-        self.datastore.addCommit(commitModel)
-        self.lock.release()
-        
-        del self.commitsToBeProcessed[strCommitHash]
+
+        return CommitModel(strCommitHash, branchTable.getBranches(strCommitHash),
+                           branchTable.getTags(strCommitHash), parentIds,
+                           authorModel, committerModel, commit.message, changedFiles, commit.author.time,
+                           commit.author.offset, commit.committer.time, commit.committer.offset, similarityMode)
 
     def create_hunks(self, hunks, initialCommit=False):
         """
@@ -305,90 +1159,271 @@ class CommitParserProcess(multiprocessing.Process):
         list_of_hunks = []
 
         for hunk in hunks:
-            output = ""
+            # The content is joined once per hunk, as appending to a string in the loop is quadratic for big hunks
             if initialCommit:
-                for line in hunk.lines:
-                    output+= "%s%s" %('+', line.content)
+                output = "".join(['+' + line.content for line in hunk.lines])
                 gen_hunk = Hunk(hunk.old_start, hunk.old_lines, hunk.new_start, hunk.new_lines, output)
             else:
-                for line in hunk.lines:
-                    output+= "%s%s" %(line.origin, line.content)
+                output = "".join([line.origin + line.content for line in hunk.lines])
                 gen_hunk = Hunk(hunk.new_start, hunk.new_lines, hunk.old_start, hunk.old_lines, output)
             list_of_hunks.append(gen_hunk)
         return list_of_hunks
 
-    def getChangedFilesForInitialCommit(self, commit):
+    def isPathIncluded(self, path):
+        """ Returns true, if the changed file with the given path should be diffed (see: \
+        :func:`pyvcsshark.parser.gitparser.CommitParserWorker.matchesPathPatterns`).
+        
+        :param path: path of the changed file
+        """
+        return self.matchesPathPatterns(path, self.includePaths, self.excludePaths)
+    
+    @staticmethod
+    def matchesPathPatterns(path, includePaths, excludePaths):
+        """ Returns true, if the path matches one of the include patterns (or there are none) and none of the exclude patterns.
+        A pattern matches, if it matches the path or one of its parent directories (e.g. **vendor** and **vendor/*** both exclude
+        everything below vendor). As in git pathspecs, a * also matches slashes.
+        
+        :param path: path of the changed file
+        :param includePaths: list of glob patterns
+        :param excludePaths: list of glob patterns
+        """
+        if not includePaths and not excludePaths:
+            return True
+        
+        parts = path.split('/')
+        candidates = ['/'.join(parts[:i]) for i in range(1, len(parts)+1)]
+        
+        if includePaths and not any(fnmatch.fnmatchcase(candidate, pattern) for pattern in includePaths for candidate in candidates):
+            return False
+        return not any(fnmatch.fnmatchcase(candidate, pattern) for pattern in excludePaths for candidate in candidates)
+    
+    def iterateDiff(self, diff, initialCommit=False, prefixes=None):
+        """ Yields a tuple of the patch (type: :class:`pygit2.Patch`) and the delta (type: :class:`pygit2.DiffDelta`) for every
+        changed file of the diff, that is not filtered out by the path patterns (see: :func:`pyvcsshark.parser.gitparser.CommitParserWorker.isPathIncluded`).
+        If the diff level is **names**, no patch is generated and None is yielded instead.
+        
+        :param diff: object of class :class:`pygit2.Diff`
+        :param initialCommit: indicates if we have an initial commit, whose files are the old files of the diff
+        :param prefixes: tuple of path prefixes. If it is given, only the files below one of them are yielded
+        
+        .. NOTE:: libgit2 generates the patch of a file only when it is requested. Only the deltas (paths, sizes and status) are \
+        read for the files, which are filtered out. pygit2 does not pass pathspecs to the diff, therefore they are matched here.
+        """
+        for index, delta in enumerate(diff.deltas):
+            file = delta.old_file if initialCommit else delta.new_file
+            if not self.isPathIncluded(file.path):
+                continue
+            if prefixes is not None and not any(file.path == prefix or file.path.startswith(prefix+'/') for prefix in prefixes):
+                continue
+            
+            if self.diffLevel == 'names':
+                yield None, delta
+            else:
+                # The sizes of the files are only known, after the patch loaded them
+                startTime = timeit.default_timer()
+                patch = diff[index]
+                self.addTiming('diff', startTime)
+                yield patch, patch.delta
+
+    def createFileModel(self, patch, delta, mode, initialCommit=False):
+        """ Creates the :class:`pyvcsshark.dbmodels.models.FileModel` for one changed file. How much information is filled
+        depends on the diff level: **full** sets everything (but the hunks of files above the stats only size), **stats** leaves out the hunks and **names** only sets the path and the mode.
+        
+        :param patch: object of class :class:`pygit2.Patch` or None, if the diff level is **names**
+        :param delta: object of class :class:`pygit2.DiffDelta` of the changed file
+        :param mode: mode of the file action (e.g. "A" for file was added)
+        :param initialCommit: indicates if we have an initial commit. It is diffed against the empty tree, therefore the old         file is the one that was added and additions and deletions are turned around
+        """
+        file = delta.old_file if initialCommit else delta.new_file
+        if patch is None:
+            return FileModel(file.path, mode=mode, hunks=[])
+        
+        linesAdded = patch.line_stats[1]
+        linesDeleted = patch.line_stats[2]
+        if initialCommit:
+            linesAdded, linesDeleted = linesDeleted, linesAdded
+        
+        # Only in full mode the lines of the patch are materialised, but not for big files
+        hunks = []
+        if self.diffLevel == 'full' and (not self.statsOnlySize or max(delta.old_file.size, delta.new_file.size) <= self.statsOnlySize):
+            startTime = timeit.default_timer()
+            hunks = self.create_hunks(patch.hunks, initialCommit)
+            self.addTiming('hunks', startTime)
+        
+        return FileModel(file.path, file.size, linesAdded, linesDeleted, delta.is_binary, mode, hunks)
+
+    def getChangedFilesForInitialCommit(self, commit, stream=None):
         '''
         Special function for the initial commit, as we need to diff against the empty tree. Creates
         the changed files list, where objects of class :class:`pyvcsshark.dbmodels.models.FileModel` are added.
         For every changed file in the initial commit.
         
         :param commit: commit of type :class:`pygit2.Commit`
+        :param stream: object of class :class:`pyvcsshark.parser.gitparser.ChangedFilesStream`, where the changed files are collected. \
+        If it is given, only the files, which were not handed over to the datastore, are returned
         '''
-        changedFiles = []
+        # Looking up the cache counts as diffing in the timing report
+        startTime = timeit.default_timer()
+        if self.diffCache is not None:
+            changedFiles = self.diffCache.get(None, commit.tree_id, self.cacheVariant)
+            if changedFiles is not None:
+                self.addTiming('diff', startTime)
+                return changedFiles
+        
+        changedFiles = stream or ChangedFilesStream(None, str(commit.id))
         diff = commit.tree.diff_to_tree(context_lines=0, interhunk_lines=1)
+        self.addTiming('diff', startTime)
 
-        for patch in diff:
-            changedFile = FileModel(patch.delta.old_file.path, patch.delta.old_file.size,
-                                    patch.line_stats[2], patch.line_stats[1],
-                                    patch.delta.is_binary, 'A', 
-                                    self.create_hunks(patch.hunks, True))
-            changedFiles.append(changedFile)
-        return changedFiles
+        for patch, delta in self.iterateDiff(diff, True):
+            changedFiles.append(self.createFileModel(patch, delta, 'A', True))
         
+        # Parts of the files, which were handed over, can not be cached
+        if self.diffCache is not None and not changedFiles.streamed:
+            self.diffCache.put(None, commit.tree_id, self.cacheVariant, changedFiles.files)
+        return changedFiles.files
         
-    def getChangedFilesWithSimiliarity(self, parent, commit): 
+        
+    def getChangedFilesWithSimiliarity(self, parent, commit, stream=None):
         """ Creates a list of changed files of the class :class:`pyvcsshark.dbmodels.models.FileModel`. For every
         changed file in the commit such an object is created. Furthermore, hunks are saved an each file is tested for similarity to
-        detect copy and move operations
+        detect copy and move operations (see: :func:`pyvcsshark.parser.gitparser.CommitParserWorker.findSimilar`). Returns a tuple of
+        the list of changed files and the similarity mode, which was used
         
         :param parent: Object of class :class:`pygit2.Commit`, that represents the parent commit
         :param commit: Object of class :class:`pygit2.Commit`, that represents the child commit
+        :param stream: object of class :class:`pyvcsshark.parser.gitparser.ChangedFilesStream`, where the changed files are collected. \
+        If it is given, only the files, which were not handed over to the datastore, are returned
+        
+        .. NOTE:: If a diff cache is set, the changed files are looked up by the tree OIDs of both commits first
         """
+        startTime = timeit.default_timer()
+        if self.diffCache is not None:
+            cachedResult = self.diffCache.get(parent.tree_id, commit.tree_id, self.cacheVariant)
+            if cachedResult is not None:
+                self.addTiming('diff', startTime)
+                return cachedResult
         
-        changedFiles = []
+        changedFiles = stream or ChangedFilesStream(None, str(commit.id))
         diff = self.repository.diff(parent, commit, context_lines=0, interhunk_lines=1)
-                            
-        opts = pygit2.GIT_DIFF_FIND_RENAMES | pygit2.GIT_DIFF_FIND_COPIES
-        diff.find_similar(opts, GitParser.SIMILARITY_THRESHOLD, GitParser.SIMILARITY_THRESHOLD)
+        self.addTiming('diff', startTime)
+        
+        startTime = timeit.default_timer()
+        similarityMode = self.findSimilar(diff)
+        self.addTiming('find_similar', startTime)
 
         alreadyCheckedFilePaths = set()
-        for patch in diff:
+        for patch, delta in self.iterateDiff(diff):
 
             # Only if the filepath was not processed before, add new file
-            if patch.delta.new_file.path in alreadyCheckedFilePaths:
+            if delta.new_file.path in alreadyCheckedFilePaths:
                 continue
 
             # Check change mode
-            mode = 'X'
-            if patch.delta.status == 1:
-                mode = 'A'
-            elif patch.delta.status == 2:
-                mode = 'D'
-            elif patch.delta.status == 3:
-                mode = 'M'
-            elif patch.delta.status == 4:
-                mode = 'R'
-            elif patch.delta.status == 5:
-                mode = 'C'
-            elif patch.delta.status == 6:
-                mode = 'I'
-            elif patch.delta.status == 7:
-                mode = 'U'
-            elif patch.delta.status == 8:
-                mode = 'T'
-
-            changedFile = FileModel(patch.delta.new_file.path, patch.delta.new_file.size,
-                                    patch.line_stats[1], patch.line_stats[2],
-                                    patch.delta.is_binary, mode, 
-                                    self.create_hunks(patch.hunks))
+            mode = self.MODES.get(delta.status, 'X')
+
+            changedFile = self.createFileModel(patch, delta, mode)
             
             # only add oldpath if file was copied/renamed
             if mode in ['C', 'R']:
-                changedFile.oldPath = patch.delta.old_file.path
+                changedFile.oldPath = delta.old_file.path
     
-            alreadyCheckedFilePaths.add(patch.delta.new_file.path)
+            alreadyCheckedFilePaths.add(delta.new_file.path)
             changedFiles.append(changedFile)
             
-            
-        return changedFiles
\ No newline at end of file
+        if self.diffCache is not None and not changedFiles.streamed:
+            self.diffCache.put(parent.tree_id, commit.tree_id, self.cacheVariant, (changedFiles.files, similarityMode))
+        return changedFiles.files, similarityMode
+
+    @staticmethod
+    def countRenameCandidates(changes, renameDetection, includePaths, excludePaths):
+        """ Counts the candidates of the detection of renamed and copied files: the sources (deleted and, for copies, modified files)
+        and the targets (added files). Returns a tuple of the number of sources and targets, which pass the path patterns (see:
+        :func:`pyvcsshark.parser.gitparser.CommitParserWorker.matchesPathPatterns`), and the number of sources and targets, which
+        are filtered out.
+        
+        :param changes: list of tuples of the path and the status (e.g. :data:`pygit2.GIT_DELTA_ADDED`) of the changed files
+        :param renameDetection: detection of renamed and copied files (see: :attr:`pyvcsshark.config.Config.RENAME_DETECTIONS`)
+        :param includePaths: list of glob patterns
+        :param excludePaths: list of glob patterns
+        """
+        counts = [0, 0, 0, 0]
+        for path, status in changes:
+            if status == pygit2.GIT_DELTA_ADDED:
+                index = 1
+            elif status == pygit2.GIT_DELTA_DELETED or (status == pygit2.GIT_DELTA_MODIFIED and renameDetection == 'copies'):
+                index = 0
+            else:
+                continue
+            if not CommitParserWorker.matchesPathPatterns(path, includePaths, excludePaths):
+                index += 2
+            counts[index] += 1
+        return tuple(counts)
+    
+    @staticmethod
+    def isExactOnly(candidates, renameLimit):
+        """ Returns true, if only renames with an identical blob should be detected: the candidate pairs, which pass the path
+        patterns, exceed the square of the rename limit or there are pairs with a candidate, which is filtered out.
+        
+        :param candidates: tuple of the counted candidates (see: :func:`pyvcsshark.parser.gitparser.CommitParserWorker.countRenameCandidates`)
+        :param renameLimit: limit for the rename detection
+        """
+        sources, targets, excludedSources, excludedTargets = candidates
+        if sources*targets > renameLimit*renameLimit:
+            return True
+        return (excludedSources+excludedTargets) > 0 and (sources+excludedSources)*(targets+excludedTargets) > 0
+    
+    def findSimilar(self, diff):
+        """ Detects renamed and copied files in the diff as configured by the rename detection policy and returns the
+        mode, that was used: **off**, **renames**, **copies** or **exact**.
+        
+        The detection compares every source (deleted and, for copies, modified file) with every added file. Only renames with an
+        identical blob are detected (mode **exact**, see: :func:`pyvcsshark.parser.gitparser.CommitParserWorker.isExactOnly`), if
+        the number of these candidate pairs exceeds the square of the rename limit (as git does it with diff.renameLimit), so that
+        a single commit, which moves many files, does not stall the process, or if candidates are filtered out by the path patterns.
+        
+        :param diff: object of class :class:`pygit2.Diff`
+        
+        .. NOTE:: pygit2 can not remove deltas from a diff. The similarity of the files, which are filtered out, could only be \
+        computed by reading their blobs. Therefore, the detection falls back to identical blobs, which are compared by their ids.
+        """
+        if self.renameDetection == 'off':
+            return 'off'
+        
+        candidates = self.countRenameCandidates([(delta.new_file.path, delta.status) for delta in diff.deltas], self.renameDetection,
+                                                self.includePaths, self.excludePaths)
+        if self.isExactOnly(candidates, self.renameLimit):
+            self.logger.info("Too many or filtered out rename candidates (%d sources, %d targets, %d filtered out), "
+                             "only detecting exact renames..." % (candidates[0], candidates[1], candidates[2]+candidates[3]))
+            diff.find_similar(pygit2.GIT_DIFF_FIND_RENAMES | self.GIT_DIFF_FIND_EXACT_MATCH_ONLY)
+            return 'exact'
+        
+        opts = pygit2.GIT_DIFF_FIND_RENAMES
+        if self.renameDetection == 'copies':
+            opts |= pygit2.GIT_DIFF_FIND_COPIES
+        diff.find_similar(opts, GitParser.SIMILARITY_THRESHOLD, GitParser.SIMILARITY_THRESHOLD)
+        return self.renameDetection
+
+
+class CommitParserProcess(CommitParserWorker, multiprocessing.Process):
+    """ Parsing worker (see: :class:`pyvcsshark.parser.gitparser.CommitParserWorker`), which inherits from :class:`multiprocessing.Process`.
+    The branch table is inherited from the parent via fork, the chunks and the parsed commits are pickled,
+    when they are passed between the processes. Takes the same parameters as :class:`pyvcsshark.parser.gitparser.CommitParserWorker`.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        multiprocessing.Process.__init__(self)
+        CommitParserWorker.__init__(self, *args, **kwargs)
+
+
+class CommitParserThread(CommitParserWorker, threading.Thread):
+    """ Parsing worker (see: :class:`pyvcsshark.parser.gitparser.CommitParserWorker`), which inherits from :class:`threading.Thread`.
+    pygit2 releases the GIL while libgit2 diffs, therefore the threads can diff in parallel. All threads share the branch table and
+    nothing is pickled between them and the parser. Takes the same parameters as :class:`pyvcsshark.parser.gitparser.CommitParserWorker`.
+    
+    .. NOTE:: A :class:`pygit2.Repository` must not be used by several threads at the same time. Like every worker, a thread opens its
+    own repository handle, when it is started.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        threading.Thread.__init__(self)
+        CommitParserWorker.__init__(self, *args, **kwargs)
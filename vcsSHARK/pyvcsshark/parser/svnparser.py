@@ -39,7 +39,7 @@ class SVNParser(BaseParser):
     
     
     
-    def initialize(self):
+    def initialize(self, datastore=None, config=None):
         """Initialization process for parser"""
         return
     
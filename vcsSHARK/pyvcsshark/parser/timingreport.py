@@ -0,0 +1,103 @@
+import heapq
+
+
+class TimingReport(object):
+    """ Collects the time, which the parsing of every commit took in the different stages, and keeps a histogram per stage and
+    the slowest commits. The parsing workers have one report each, which are merged by the parser in the end
+    (see: :func:`pyvcsshark.parser.timingreport.TimingReport.merge`).
+
+    The stages are:
+
+        1. **diff**: comparing the trees and generating the patches
+        2. **find_similar**: detection of renamed and copied files
+        3. **hunks**: creation of the hunks out of the patches
+        4. **handoff**: handing over the commit (and streamed changed files) to the datastore
+
+    :param top: number of slowest commits, which are kept
+
+    :property commits: number of commits in the report
+    :property totals: dictionary, which maps every stage to the sum of its times in seconds
+    :property histograms: dictionary, which maps every stage to a list with the number of commits per bucket (see: :attr:`BUCKETS`)
+    :property slowestCommits: heap of tuples of the total time, the revision hash, a sequence number and the record of the \
+    slowest commits. The sequence number breaks ties (e.g. between partitions of the same commit), so that the records are never compared
+    :property sequence: number of records, which were added to the heap so far
+
+    .. NOTE:: The report is pickled, when it is sent from a parsing process to the parser. Therefore, it only holds plain data.
+    """
+
+    STAGES = ('diff', 'find_similar', 'hunks', 'handoff')
+
+    # Upper bounds of the histogram buckets in seconds, the last bucket holds everything above
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100)
+
+    def __init__(self, top=20):
+        self.top = top
+        self.commits = 0
+        self.totals = dict((stage, 0.0) for stage in self.STAGES)
+        self.histograms = dict((stage, [0]*(len(self.BUCKETS)+1)) for stage in self.STAGES)
+        self.slowestCommits = []
+        self.sequence = 0
+
+    def getBucket(self, seconds):
+        """ Returns the index of the histogram bucket for the given time
+
+        :param seconds: time in seconds
+        """
+        for index, upperBound in enumerate(self.BUCKETS):
+            if seconds <= upperBound:
+                return index
+        return len(self.BUCKETS)
+
+    def addCommit(self, revisionHash, timings, files, size, partition=False):
+        """ Adds the timings of one commit to the report
+
+        :param revisionHash: revision hash of the commit
+        :param timings: dictionary, which maps the stages to the time in seconds, which the commit took in them
+        :param files: number of changed files of the commit
+        :param size: approximate size of the changed files in bytes (see: :func:`pyvcsshark.dbmodels.models.FileModel.getApproximateSize`)
+        :param partition: true, if only a partition of a split commit was parsed
+        """
+        self.commits += 1
+        total = 0.0
+        for stage in self.STAGES:
+            seconds = timings.get(stage, 0.0)
+            self.totals[stage] += seconds
+            self.histograms[stage][self.getBucket(seconds)] += 1
+            total += seconds
+
+        record = {'revisionHash': revisionHash, 'total': total, 'files': files, 'bytes': size, 'partition': partition}
+        record.update((stage, timings.get(stage, 0.0)) for stage in self.STAGES)
+        self.addSlowCommit(total, record)
+
+    def addSlowCommit(self, total, record):
+        """ Keeps the record, if it is one of the :attr:`top` slowest commits """
+        self.sequence += 1
+        entry = (total, record['revisionHash'], self.sequence, record)
+        if len(self.slowestCommits) < self.top:
+            heapq.heappush(self.slowestCommits, entry)
+        elif self.slowestCommits and entry[:3] > self.slowestCommits[0][:3]:
+            heapq.heapreplace(self.slowestCommits, entry)
+
+    def merge(self, other):
+        """ Adds the commits of another report to this one
+
+        :param other: object of class :class:`pyvcsshark.parser.timingreport.TimingReport`
+        """
+        self.commits += other.commits
+        for stage in self.STAGES:
+            self.totals[stage] += other.totals[stage]
+            self.histograms[stage] = [count+otherCount for count, otherCount in zip(self.histograms[stage], other.histograms[stage])]
+        for total, revisionHash, sequence, record in other.slowestCommits:
+            self.addSlowCommit(total, record)
+
+    def toDict(self):
+        """ Returns the report as dictionary, which can be written as JSON. The slowest commits are sorted, slowest first """
+        stages = {}
+        for stage in self.STAGES:
+            histogram = [{'le': upperBound, 'count': count} for upperBound, count in zip(self.BUCKETS, self.histograms[stage])]
+            histogram.append({'le': None, 'count': self.histograms[stage][-1]})
+            stages[stage] = {'total': self.totals[stage], 'histogram': histogram}
+
+        return {'commits': self.commits,
+                'stages': stages,
+                'slowestCommits': [entry[-1] for entry in sorted(self.slowestCommits, key=lambda entry: entry[:3], reverse=True)]}
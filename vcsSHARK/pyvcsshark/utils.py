@@ -1,5 +1,9 @@
 import os
+import re
 import sys
+import calendar
+import datetime
+import time
 from pyvcsshark.datastores.basestore import BaseStore
 from pyvcsshark.parser.baseparser import BaseParser
 
@@ -16,6 +20,33 @@ def readable_dir(prospective_dir):
         else:
             raise Exception("readable_dir:{0} is not a readable dir".format(prospective_dir))
         
+def parse_date(value, endOfDay=False):
+    """ Converts a date into a UNIX timestamp. The date can be given as **YYYY-MM-DD** or **YYYY-MM-DDTHH:MM:SS** (both in UTC),
+    as UNIX timestamp or relative to now as a number of days (e.g. **90d**). None is returned unchanged.
+    
+    :param value: string with the date
+    :param endOfDay: if it is true, a date without time (**YYYY-MM-DD**) is converted into the last second of the day instead of \
+    the first one. It is used for the upper bound of a date range, so that the commits of the day are included"""
+    if value is None or isinstance(value, int):
+        return value
+    
+    value = value.strip()
+    match = re.match(r'^(\d+)d$', value)
+    if match:
+        return int(time.time()) - int(match.group(1))*24*60*60
+    if value.isdigit():
+        return int(value)
+    
+    for dateFormat in ('%Y-%m-%d', '%Y-%m-%dT%H:%M:%S'):
+        try:
+            timestamp = calendar.timegm(datetime.datetime.strptime(value, dateFormat).timetuple())
+        except ValueError:
+            continue
+        if endOfDay and dateFormat == '%Y-%m-%d':
+            timestamp += 24*60*60 - 1
+        return timestamp
+    raise Exception("parse_date:{0} is not a valid date".format(value))
+        
 def find_plugins(pluginDir):
     """Finds all python files in the specified path and imports them. This is needed, if we want to
     detect automatically, which datastore and parser we can apply
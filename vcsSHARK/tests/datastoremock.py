@@ -12,15 +12,19 @@ class DatastoreMock(object):
     projectURL = None
     repositoryType = None
     listTest = list()
+    streamsFileActions = False
     
     
     def __init__(self):
         self.datastore = {}
+        self.storedRevisionHashes = set()
+        self.refSnapshot = {}
         self.queue = multiprocessing.SimpleQueue()
+        self.fileActions = []
         return
     
     def initialize(self, dbname=None, host=None, port=None, user=None , 
-                   password=None, projectname=None, repositoryURL=None, type=None):
+                   password=None, projectname=None, repositoryURL=None, type=None, config=None):
         return
 
     def storeIdentifier(self):
@@ -29,6 +33,22 @@ class DatastoreMock(object):
     def addCommit(self, commitModel):
         self.queue.put(commitModel)
         
+    def addCommits(self, commitModels):
+        for commitModel in commitModels:
+            self.queue.put(commitModel)
+        
+    def addFileActions(self, revisionHash, changedFiles):
+        self.fileActions.append((revisionHash, changedFiles))
+        
+    def getStoredRevisionHashes(self):
+        return self.storedRevisionHashes
+    
+    def getRefSnapshot(self):
+        return self.refSnapshot
+    
+    def storeRefSnapshot(self, snapshot):
+        self.refSnapshot = snapshot
+        
     def deleteAll(self):
         return
     
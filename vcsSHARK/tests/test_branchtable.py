@@ -0,0 +1,51 @@
+import unittest
+
+from pyvcsshark.parser.branchtable import BranchTable
+from pyvcsshark.dbmodels.models import TagModel
+
+
+class BranchTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.table = BranchTable(['refs/heads/master', 'refs/heads/testbranch1', 'refs/heads/testbranch2'])
+        self.table.add('5ed91aa4557b5042fa7096bf6c69463024c46b6f',
+                       self.table.getBitset(['refs/heads/master']))
+        self.table.add('022a1584a31ccc0816d20bfbbeb5c45aa290c7dd',
+                       self.table.getBitset(['refs/heads/master', 'refs/heads/testbranch2']))
+        self.table.add('3c0a6fc133b8b50b8c217642fef7eb948f29b690',
+                       self.table.getBitset(['refs/heads/master', 'refs/heads/testbranch1', 'refs/heads/testbranch2']))
+        self.table.freeze()
+
+    def test_contains(self):
+        self.assertEqual(3, len(self.table))
+        self.assertIn('022a1584a31ccc0816d20bfbbeb5c45aa290c7dd', self.table)
+        self.assertIn(bytes.fromhex('3c0a6fc133b8b50b8c217642fef7eb948f29b690'), self.table)
+        self.assertNotIn('830c29f111f261e26897d42e94c15960a512c0e4', self.table)
+
+    def test_index_is_dense(self):
+        indices = [self.table.index(commitHash) for commitHash in self.table.hashes()]
+        self.assertListEqual([0, 1, 2], indices)
+
+    def test_getBranches(self):
+        branchNames = [branch.name for branch in self.table.getBranches('022a1584a31ccc0816d20bfbbeb5c45aa290c7dd')]
+        self.assertEqual(2, len(branchNames))
+        self.assertIn('refs/heads/master', branchNames)
+        self.assertIn('refs/heads/testbranch2', branchNames)
+
+        branchNames = [branch.name for branch in self.table.getBranches('3c0a6fc133b8b50b8c217642fef7eb948f29b690')]
+        self.assertEqual(3, len(branchNames))
+
+        self.assertRaises(KeyError, self.table.getBranches, '830c29f111f261e26897d42e94c15960a512c0e4')
+
+    def test_getTags(self):
+        self.table.addTag('5ed91aa4557b5042fa7096bf6c69463024c46b6f', TagModel('release1'))
+
+        self.assertEqual('release1', self.table.getTags('5ed91aa4557b5042fa7096bf6c69463024c46b6f')[0].name)
+        self.assertListEqual([], self.table.getTags('022a1584a31ccc0816d20bfbbeb5c45aa290c7dd'))
+
+    def test_add_after_freeze(self):
+        self.assertRaises(Exception, self.table.add, '830c29f111f261e26897d42e94c15960a512c0e4', 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
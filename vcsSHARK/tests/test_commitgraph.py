@@ -0,0 +1,82 @@
+import unittest
+import os
+
+from pyvcsshark.parser.commitgraph import CommitGraph
+from tests.test_gitparser import GitRepositoryTest
+
+
+class CommitGraphTest(GitRepositoryTest):
+
+    def createCommit(self, reference, parents, files=None):
+        return GitRepositoryTest.createCommit(self, reference, parents, files or {"test.txt": "test\n"})
+
+    def createHistory(self):
+        # root <- a <- merge (master)
+        #      <- b <-/
+        #         b <- c (feature)
+        root = self.createCommit(None, [])
+        a = self.createCommit(None, [root])
+        b = self.createCommit(None, [root])
+        merge = self.createCommit('refs/heads/master', [a, b])
+        c = self.createCommit('refs/heads/feature', [b])
+        return root, a, b, merge, c
+
+    def test_open_and_walk(self):
+        root, a, b, merge, c = self.createHistory()
+        graph = CommitGraph.open(self.repository)
+
+        self.assertTrue(os.path.exists(CommitGraph.getPath(self.repository)))
+        self.assertEqual(5, len(graph))
+        self.assertEqual([1, 2, 2, 3, 3], sorted(graph.generations[graph.index(oid)] for oid in [root, a, b, merge, c]))
+        self.assertEqual(sorted([graph.index(a), graph.index(b)]), sorted(graph.getParents(graph.index(merge))))
+        self.assertEqual(self.repository[merge].commit_time, graph.commitTimes[graph.index(merge)])
+
+        # Children are walked before their parents
+        walked = [graph.getHash(index) for index in graph.walk([graph.index(merge), graph.index(c)])]
+        self.assertEqual(set(str(oid) for oid in [root, a, b, merge, c]), set(walked))
+        for child, parent in [(merge, a), (merge, b), (c, b), (a, root), (b, root)]:
+            self.assertLess(walked.index(str(child)), walked.index(str(parent)))
+
+        # Hidden history is not walked
+        walked = [graph.getHash(index) for index in graph.walk([graph.index(c)], [graph.index(a)])]
+        self.assertEqual([str(c), str(b)], walked)
+
+    def test_walk_since(self):
+        root, a, b, merge, c = self.createHistory()
+        graph = CommitGraph.open(self.repository)
+
+        # The walk stops at commits, which are older than b
+        since = graph.commitTimes[graph.index(b)]
+        walked = [graph.getHash(index) for index in graph.walk([graph.index(merge), graph.index(c)], since=since)]
+        self.assertCountEqual([str(merge), str(c), str(b)], walked)
+
+    def test_is_ancestor(self):
+        root, a, b, merge, c = self.createHistory()
+        graph = CommitGraph.open(self.repository)
+
+        self.assertTrue(graph.isAncestor(graph.index(root), graph.index(c)))
+        self.assertTrue(graph.isAncestor(graph.index(b), graph.index(merge)))
+        self.assertTrue(graph.isAncestor(graph.index(merge), graph.index(merge)))
+        self.assertFalse(graph.isAncestor(graph.index(a), graph.index(c)))
+        self.assertFalse(graph.isAncestor(graph.index(merge), graph.index(a)))
+
+    def test_graph_is_extended(self):
+        root, a, b, merge, c = self.createHistory()
+        CommitGraph.open(self.repository)
+
+        d = self.createCommit('refs/heads/feature', [c])
+        graph = CommitGraph.open(self.repository)
+        self.assertEqual(6, len(graph))
+        self.assertEqual(4, graph.generations[graph.index(d)])
+
+        # The extended graph is the same as a new one
+        with open(CommitGraph.getPath(self.repository), 'rb') as graphFile:
+            extended = graphFile.read()
+        os.remove(CommitGraph.getPath(self.repository))
+        CommitGraph.open(self.repository)
+        with open(CommitGraph.getPath(self.repository), 'rb') as graphFile:
+            self.assertEqual(extended, graphFile.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
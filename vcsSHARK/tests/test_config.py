@@ -38,6 +38,21 @@ class ConfigTest(unittest.TestCase):
         self.assertEqual("localhost", config.db_hostname)
         self.assertEqual(27017, config.db_port)
         self.assertEqual(".", config.uri)
+        
+    def test_partial_run(self):
+        self.assertFalse(Config(None).isPartialRun())
+        
+        config = Config(None, since="2016-01-21", until="2016-01-22T12:00:00")
+        self.assertTrue(config.isPartialRun())
+        self.assertEqual(1453334400, config.since)
+        self.assertEqual(1453464000, config.until)
+        
+        self.assertTrue(Config(None, branches=["master"]).isPartialRun())
+        
+        # A date without time includes the commits of the whole day
+        config = Config(None, since="2016-01-21", until="2016-01-21")
+        self.assertEqual(1453334400, config.since)
+        self.assertEqual(1453420799, config.until)
     
     
 
@@ -0,0 +1,70 @@
+import unittest
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from pyvcsshark.parser.diffcache import DiffCache
+from pyvcsshark.dbmodels.models import FileModel, Hunk
+
+
+def putEntries(cache, name, count):
+    for i in range(count):
+        cache.put(None, "%s%d" % (name, i), 'full', [FileModel("test.txt", hunks=[Hunk(1, 1, 0, 0, os.urandom(1024).hex())])])
+
+
+class DiffCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cacheDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cacheDir)
+
+    def test_put_and_get(self):
+        cache = DiffCache(self.cacheDir, 1024*1024)
+        changedFiles = [FileModel("test.txt", 6, 1, 0, False, 'M', [Hunk(1, 1, 1, 0, "+test1\n")])]
+        cache.put('022a1584a31ccc0816d20bfbbeb5c45aa290c7dd', '3c0a6fc133b8b50b8c217642fef7eb948f29b690', 'full', changedFiles)
+
+        cachedFiles = cache.get('022a1584a31ccc0816d20bfbbeb5c45aa290c7dd', '3c0a6fc133b8b50b8c217642fef7eb948f29b690', 'full')
+        self.assertEqual(1, len(cachedFiles))
+        self.assertEqual("test.txt", cachedFiles[0].path)
+        self.assertEqual('M', cachedFiles[0].mode)
+        self.assertEqual("+test1\n", cachedFiles[0].hunks[0].content)
+
+        # Other variants and the initial commit are different entries
+        self.assertIsNone(cache.get('022a1584a31ccc0816d20bfbbeb5c45aa290c7dd', '3c0a6fc133b8b50b8c217642fef7eb948f29b690', 'stats'))
+        self.assertIsNone(cache.get(None, '3c0a6fc133b8b50b8c217642fef7eb948f29b690', 'full'))
+
+    def test_least_recently_used_are_evicted(self):
+        cache = DiffCache(self.cacheDir, 1024*1024)
+        changedFiles = [FileModel("test.txt", 6, 1, 0, False, 'A', [Hunk(1, 1, 0, 0, os.urandom(1024).hex())])]
+        cache.put(None, 'old', 'full', changedFiles)
+        os.utime(cache.getPath(None, 'old', 'full'), (0, 0))
+
+        cache.maxSize = cache.size * 3 // 2
+        cache.put(None, 'new', 'full', changedFiles)
+
+        self.assertIsNone(cache.get(None, 'old', 'full'))
+        self.assertIsNotNone(cache.get(None, 'new', 'full'))
+        self.assertLessEqual(cache.size, cache.maxSize)
+
+    def test_size_is_shared_by_processes(self):
+        cache = DiffCache(self.cacheDir, 1024*1024)
+        putEntries(cache, 'probe', 1)
+        cache.maxSize = cache.size * 10
+
+        # Every process alone stays below the maximum size, both together exceed it
+        processes = [multiprocessing.Process(target=putEntries, args=(cache, name, 8)) for name in ['first', 'second']]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        diskSize = sum(size for path, size, mtime in cache.listEntries())
+        self.assertLessEqual(diskSize, cache.maxSize)
+        self.assertEqual(diskSize, cache.size)
+
+
+if __name__ == "__main__":
+    unittest.main()
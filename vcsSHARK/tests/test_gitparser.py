@@ -7,11 +7,15 @@ import unittest
 import logging
 import uuid
 import os
+import shutil
+import tempfile
 import time
 import datetime
-from pyvcsshark.parser.gitparser import GitParser
+import pygit2
+from pyvcsshark.parser.gitparser import GitParser, CommitBatch, ChangedFilesStream, CommitParserWorker
+from pyvcsshark.config import Config
 from tests.datastoremock import DatastoreMock
-from pyvcsshark.dbmodels.models import BranchModel, TagModel
+from pyvcsshark.dbmodels.models import BranchModel, TagModel, CommitModel, FileModel, Hunk
 
 class GitParserTest(unittest.TestCase):
     
@@ -887,6 +891,566 @@ class GitParserCommitsTest(GitParserTest):
         self.assertEqual("+line41\n", testFile.hunks[2].content)
         #self.assertEqual("@@ -40,0 +40,1 @@ \n +line41\n", testFile.hunks[2])
 
+class GitRepositoryTest(unittest.TestCase):
+    """ Base class of the parser tests, which build their own repository with pygit2 in a temporary directory """
+
+    def setUp(self):
+        logging.basicConfig(level=logging.ERROR)
+        self.repositoryDir = tempfile.mkdtemp()
+        self.repository = pygit2.init_repository(self.repositoryDir, bare=True)
+        self.time = 1453334400
+
+    def tearDown(self):
+        shutil.rmtree(self.repositoryDir)
+
+    def createTree(self, files):
+        """ Creates a tree out of a dictionary, which maps the paths of the files to their content """
+        builder = self.repository.TreeBuilder()
+        directories = {}
+        for path, content in files.items():
+            name, _, subPath = path.partition('/')
+            if subPath:
+                directories.setdefault(name, {})[subPath] = content
+            else:
+                builder.insert(name, self.repository.create_blob(content.encode()), pygit2.GIT_FILEMODE_BLOB)
+        for name, directoryFiles in directories.items():
+            builder.insert(name, self.createTree(directoryFiles), pygit2.GIT_FILEMODE_TREE)
+        return builder.write()
+
+    def createCommit(self, reference, parents, files):
+        """ Creates a commit with the given files, which is one minute younger than the previous one, and moves the reference to it """
+        self.time += 60
+        signature = pygit2.Signature("Test", "test@test.de", self.time, 0)
+        commit = self.repository.create_commit(None, signature, signature, "commit %d" % (self.time), self.createTree(files), parents)
+        if reference is not None:
+            self.repository.references.create(reference, commit, force=True)
+        return str(commit)
+
+    def createParser(self, config=None, datastore=None):
+        parser = GitParser()
+        parser.NUMBER_OF_PROCESSES = 2
+        parser.detect(self.repositoryDir)
+        parser.initialize(datastore, config)
+        return parser
+
+    def parseCommits(self, config=None, datastore=None):
+        """ Parses the repository and returns a dictionary, which maps the revision hashes to the parsed commits """
+        datastore = datastore if datastore is not None else DatastoreMock()
+        parser = self.createParser(config, datastore)
+        parser.parse(self.repositoryDir, datastore)
+
+        queue = datastore.getCommitQueue()
+        parsedCommits = {}
+        while(queue.empty() == False):
+            commit = queue.get()
+            parsedCommits[commit.id] = commit
+        return parsedCommits
+
+    def getFile(self, commit, path):
+        return [file for file in commit.changedFiles if file.path == path][0]
+
+class GitParserStoredCommitsTest(GitRepositoryTest):
+
+    def test_stored_commits_are_not_queued(self):
+        first = self.createCommit('refs/heads/master', [], {"test.txt": "test1\n"})
+        second = self.createCommit('refs/heads/master', [first], {"test.txt": "test1\ntest2\n"})
+
+        datastore = DatastoreMock()
+        datastore.storedRevisionHashes = set([first])
+        parser = self.createParser(datastore=datastore)
+
+        self.assertListEqual([first], parser.storedCommits)
+        self.assertIn(first, parser.branchTable)
+        self.assertListEqual([second], parser.commitsToParse)
+
+        # Stored commits are handed over without changed files, so that their branches and tags are updated
+        parsedCommits = self.parseCommits(datastore=datastore)
+        self.assertListEqual([], parsedCommits[first].changedFiles)
+        self.assertListEqual(["refs/heads/master"], [branch.name for branch in parsedCommits[first].branches])
+        self.assertEqual("+test2\n", self.getFile(parsedCommits[second], "test.txt").hunks[0].content)
+
+    def getBranchNames(self, parser, commit):
+        return sorted(branch.name for branch in parser.branchTable.getBranches(commit))
+
+    def test_unchanged_references_are_not_walked(self):
+        first = self.createCommit('refs/heads/master', [], {"test.txt": "test1\n"})
+
+        datastore = DatastoreMock()
+        self.parseCommits(datastore=datastore)
+        datastore.storedRevisionHashes = set([first])
+        parser = self.createParser(datastore=datastore)
+
+        self.assertEqual(0, len(parser.branchTable))
+        self.assertListEqual([], parser.storedCommits)
+        self.assertListEqual([], parser.commitsToParse)
+
+    def test_only_new_commits_are_walked(self):
+        first = self.createCommit('refs/heads/master', [], {"test.txt": "test1\n"})
+        self.createCommit('refs/heads/feature', [first], {"test.txt": "test1\nfeature\n"})
+
+        datastore = DatastoreMock()
+        self.parseCommits(datastore=datastore)
+        second = self.createCommit('refs/heads/master', [first], {"test.txt": "test1\ntest2\n"})
+        third = self.createCommit('refs/heads/master', [second], {"test.txt": "test1\ntest2\ntest3\n"})
+
+        # The third commit was stored by an aborted run, the snapshot is still the one of the complete run before
+        datastore.storedRevisionHashes = set([first, third])
+        parser = self.createParser(datastore=datastore)
+
+        self.assertListEqual([second], parser.commitsToParse)
+        self.assertListEqual([third], parser.storedCommits)
+        self.assertEqual(["refs/heads/master"], self.getBranchNames(parser, second))
+
+    def test_branch_moved_to_other_branch(self):
+        first = self.createCommit('refs/heads/master', [], {"test.txt": "test1\n"})
+        feature = self.createCommit('refs/heads/feature', [first], {"test.txt": "test1\nfeature\n"})
+
+        datastore = DatastoreMock()
+        self.parseCommits(datastore=datastore)
+
+        # master is fast-forwarded to feature, so the stored feature commit belongs to master now
+        self.repository.references.create('refs/heads/master', pygit2.Oid(hex=feature), force=True)
+        datastore.storedRevisionHashes = set([first, feature])
+        parser = self.createParser(datastore=datastore)
+
+        self.assertListEqual([], parser.commitsToParse)
+        self.assertCountEqual([first, feature], parser.storedCommits)
+        self.assertEqual(["refs/heads/feature", "refs/heads/master"], self.getBranchNames(parser, feature))
+
+        # A merge of another branch, which has new commits itself, reaches the stored commits of the other branch as well
+        other = self.createCommit('refs/heads/other', [first], {"other.txt": "other\n"})
+        datastore = DatastoreMock()
+        self.parseCommits(datastore=datastore)
+        otherChild = self.createCommit('refs/heads/other', [other], {"other.txt": "other\nchild\n"})
+        merge = self.createCommit('refs/heads/master', [feature, otherChild], {"test.txt": "test1\nfeature\n", "other.txt": "other\nchild\n"})
+        datastore.storedRevisionHashes = set([first, feature, other])
+        parser = self.createParser(datastore=datastore)
+
+        self.assertCountEqual([otherChild, merge], parser.commitsToParse)
+        self.assertEqual(["refs/heads/master", "refs/heads/other"], self.getBranchNames(parser, other))
+
+    def test_tag_of_tree(self):
+        first = self.createCommit('refs/heads/master', [], {"test.txt": "test1\n"})
+
+        datastore = DatastoreMock()
+        self.parseCommits(datastore=datastore)
+        second = self.createCommit('refs/heads/master', [first], {"test.txt": "test1\ntest2\n"})
+        self.repository.references.create('refs/tags/tree-tag', self.repository[pygit2.Oid(hex=first)].tree.id)
+        datastore.storedRevisionHashes = set([first])
+        parser = self.createParser(datastore=datastore)
+
+        # The tag of the tree is ignored
+        self.assertListEqual([second], parser.commitsToParse)
+        self.assertListEqual([], parser.storedCommits)
+
+        # The tag of an old commit needs the whole history
+        self.repository.references.create('refs/tags/commit-tag', pygit2.Oid(hex=first))
+        parser = self.createParser(datastore=datastore)
+        self.assertListEqual([first], parser.storedCommits)
+        self.assertEqual(["commit-tag"], [tag.name for tag in parser.branchTable.getTags(first)])
+
+    def test_moved_tag(self):
+        first = self.createCommit('refs/heads/master', [], {"test.txt": "test1\n"})
+        self.repository.references.create('refs/tags/v1', pygit2.Oid(hex=first))
+
+        datastore = DatastoreMock()
+        self.parseCommits(datastore=datastore)
+        second = self.createCommit('refs/heads/master', [first], {"test.txt": "test1\ntest2\n"})
+        self.repository.references.create('refs/tags/v1', pygit2.Oid(hex=second), force=True)
+        datastore.storedRevisionHashes = set([first])
+        parser = self.createParser(datastore=datastore)
+
+        # The stored commit loses its tag
+        self.assertListEqual([second], parser.commitsToParse)
+        self.assertListEqual([first], parser.storedCommits)
+        self.assertEqual([], parser.branchTable.getTags(first))
+        self.assertEqual(["v1"], [tag.name for tag in parser.branchTable.getTags(second)])
+
+class CommitBatchTest(unittest.TestCase):
+
+    def test_batches_are_bounded(self):
+        datastore = DatastoreMock()
+        batches = []
+        datastore.addCommits = lambda commitModels: batches.append(list(commitModels))
+
+        batch = CommitBatch(datastore)
+        batch.MAX_COMMITS = 2
+        for i in range(5):
+            batch.add(CommitModel(str(i), set(), [], [], None, None, "message", [], 0, 0, 0, 0))
+        self.assertListEqual([2, 2], [len(commitModels) for commitModels in batches])
+
+        batch.flush()
+        self.assertListEqual([2, 2, 1], [len(commitModels) for commitModels in batches])
+
+        # Big commits are handed over on their own
+        batch.MAX_BYTES = 1
+        batch.add(CommitModel("5", set(), [], [], None, None, "message", [], 0, 0, 0, 0))
+        self.assertEqual(4, len(batches))
+
+class ChangedFilesStreamTest(unittest.TestCase):
+
+    def test_big_commits_are_streamed(self):
+        datastore = DatastoreMock()
+        datastore.streamsFileActions = True
+
+        stream = ChangedFilesStream(datastore, "1")
+        stream.MAX_BYTES = 400
+        for i in range(5):
+            stream.append(FileModel("file%d.txt" % (i), hunks=[Hunk(1, 1, 0, 0, "+" + "x"*100)]))
+
+        self.assertTrue(stream.streamed)
+        self.assertEqual(2, stream.streamedChunks)
+        self.assertListEqual([("1", 2), ("1", 2)], [(revisionHash, len(files)) for revisionHash, files in datastore.fileActions])
+        self.assertEqual(["file4.txt"], [file.path for file in stream.files])
+
+    def test_datastore_without_streaming(self):
+        datastore = DatastoreMock()
+
+        stream = ChangedFilesStream(datastore, "1")
+        stream.MAX_BYTES = 1
+        for i in range(5):
+            stream.append(FileModel("file%d.txt" % (i)))
+
+        self.assertFalse(stream.streamed)
+        self.assertEqual(5, len(stream.files))
+        self.assertListEqual([], datastore.fileActions)
+
+class GitParserRepositorySettingsTest(unittest.TestCase):
+
+    def createParser(self, **kwargs):
+        parser = GitParser()
+        parser.NUMBER_OF_PROCESSES = 4
+        parser.getPhysicalMemory = lambda: 64*1024*1024*1024
+        parser.config = Config(None, **kwargs)
+        return parser
+
+    def test_derived_settings(self):
+        # The limits are per process, threads share them
+        settings = self.createParser(worker_type='processes').getRepositorySettings()
+        self.assertEqual({'cache_max_size': 2*1024*1024*1024, 'mwindow_size': None, 'mwindow_mapped_limit': 4*1024*1024*1024}, settings)
+
+        settings = self.createParser(worker_type='threads').getRepositorySettings()
+        self.assertEqual({'cache_max_size': 8*1024*1024*1024, 'mwindow_size': None, 'mwindow_mapped_limit': 16*1024*1024*1024}, settings)
+
+    def test_configured_settings(self):
+        for workerType in Config.WORKER_TYPES:
+            parser = self.createParser(worker_type=workerType, cache_max_size=256, mwindow_size=32, mwindow_mapped_limit=512)
+            self.assertEqual({'cache_max_size': 256*1024*1024, 'mwindow_size': 32*1024*1024, 'mwindow_mapped_limit': 512*1024*1024},
+                             parser.getRepositorySettings())
+
+        # Without the size of the memory, libgit2 keeps its defaults
+        parser = self.createParser()
+        parser.getPhysicalMemory = lambda: None
+        self.assertEqual({'cache_max_size': None, 'mwindow_size': None, 'mwindow_mapped_limit': None}, parser.getRepositorySettings())
+
+class GitParserSchedulingTest(GitRepositoryTest):
+
+    def test_scheduleCommits(self):
+        files = {}
+        parents = []
+        for changedFiles in [1, 5, 2, 8, 3]:
+            files.update(("dir%d/file%d.txt" % (i % 3, len(files)+i), "content\n") for i in range(changedFiles))
+            parents = [self.createCommit('refs/heads/master', parents, files)]
+
+        parser = self.createParser()
+        chunks = parser.scheduleCommits()
+        scheduledCommits = [strCommitHash for chunk in chunks for strCommitHash in chunk]
+        self.assertCountEqual(parser.commitsToParse, scheduledCommits)
+
+        # The most expensive commit comes first
+        costs = [parser.estimateCost(parser.repository[strCommitHash]) for strCommitHash in scheduledCommits]
+        self.assertListEqual([9, 6, 4, 3, 2], costs)
+
+        # The costs are estimated by several processes with the same result
+        parser.ESTIMATE_BATCH_SIZE = 1
+        costs, changesOfCommit = parser.estimateCosts()
+        self.assertCountEqual([(cost, strCommitHash) for cost, strCommitHash in zip([9, 6, 4, 3, 2], scheduledCommits)], costs)
+        self.assertEqual({}, changesOfCommit)
+
+    def createSplitCommits(self):
+        # The second commit changes a file of every directory, moves an identical file and renames a file with a small change
+        lines = "".join("line%d\n" % (i) for i in range(20))
+        files = dict(("dir%d/file%d.txt" % (i, j), "content%d%d\n" % (i, j)) for i in range(4) for j in range(2))
+        files.update({"dir0/moved.txt": "moved\n", "dir1/renamed.txt": lines})
+        first = self.createCommit('refs/heads/master', [], files)
+
+        files.update(("dir%d/file0.txt" % (i), "changed%d\n" % (i)) for i in range(4))
+        files["dir3/moved.txt"] = files.pop("dir0/moved.txt")
+        files["dir2/renamed.txt"] = files.pop("dir1/renamed.txt") + "line20\n"
+        second = self.createCommit('refs/heads/master', [first], files)
+        return first, second
+
+    def assertPartitions(self, parser, chunks):
+        partitions = [chunk[0] for chunk in chunks if isinstance(chunk[0], tuple)]
+        self.assertEqual(sum(parser.partitionCounts.values()), len(partitions))
+
+        # Every changed file belongs to exactly one partition
+        for strCommitHash in parser.partitionCounts:
+            prefixes = [prefix for partitionHash, partition, renames in partitions if partitionHash == strCommitHash for prefix in partition]
+            for path, status, oldId, newId in parser.getChanges(parser.repository[strCommitHash]):
+                matches = [prefix for prefix in prefixes if path == prefix or path.startswith(prefix+'/')]
+                self.assertEqual(1, len(matches))
+
+    def test_split_commits(self):
+        first, second = self.createSplitCommits()
+
+        # The second commit has candidates for renames, which could span the partitions
+        parser = self.createParser(Config(None, split_threshold=2))
+        self.assertPartitions(parser, parser.scheduleCommits())
+        self.assertEqual({first: 2}, parser.partitionCounts)
+        self.assertEqual({first: 'copies'}, parser.partitionModes)
+
+        parsedCommits = self.parseCommits(Config(None, split_threshold=2))
+        self.assertCountEqual([first, second], parsedCommits.keys())
+        self.assertEqual(10, len(parsedCommits[first].changedFiles))
+        self.assertEqual("+content00\n", self.getFile(parsedCommits[first], "dir0/file0.txt").hunks[0].content)
+        self.assertEqual('copies', parsedCommits[second].similarityMode)
+        self.assertEqual(("R", "dir0/moved.txt"), (self.getFile(parsedCommits[second], "dir3/moved.txt").mode,
+                                                   self.getFile(parsedCommits[second], "dir3/moved.txt").oldPath))
+        self.assertEqual(("R", "dir1/renamed.txt"), (self.getFile(parsedCommits[second], "dir2/renamed.txt").mode,
+                                                     self.getFile(parsedCommits[second], "dir2/renamed.txt").oldPath))
+
+        # Without rename detection, the split commits are parsed as if they were not split
+        parser = self.createParser(Config(None, split_threshold=2, rename_detection='off'))
+        self.assertPartitions(parser, parser.scheduleCommits())
+        self.assertEqual({first: 2, second: 2}, parser.partitionCounts)
+
+        splitCommits = self.parseCommits(Config(None, split_threshold=2, rename_detection='off'))
+        commits = self.parseCommits(Config(None, split_threshold=0, rename_detection='off'))
+        for strCommitHash in [first, second]:
+            self.assertEqual('off', splitCommits[strCommitHash].similarityMode)
+            self.assertListEqual([(file.path, file.mode, file.linesAdded, file.linesDeleted, [hunk.content for hunk in file.hunks])
+                                  for file in sorted(commits[strCommitHash].changedFiles, key=lambda file: file.path)],
+                                 [(file.path, file.mode, file.linesAdded, file.linesDeleted, [hunk.content for hunk in file.hunks])
+                                  for file in splitCommits[strCommitHash].changedFiles])
+
+        # With more candidate pairs than the square of the rename limit, identical files are detected across the partitions
+        parser = self.createParser(Config(None, split_threshold=2, rename_limit=1))
+        self.assertPartitions(parser, parser.scheduleCommits())
+        self.assertEqual({first: 2, second: 2}, parser.partitionCounts)
+        self.assertEqual('exact', parser.partitionModes[second])
+
+        commit = self.parseCommits(Config(None, split_threshold=2, rename_limit=1))[second]
+        self.assertEqual('exact', commit.similarityMode)
+        self.assertEqual(("R", "dir0/moved.txt"), (self.getFile(commit, "dir3/moved.txt").mode, self.getFile(commit, "dir3/moved.txt").oldPath))
+        self.assertEqual("A", self.getFile(commit, "dir2/renamed.txt").mode)
+        self.assertEqual("D", self.getFile(commit, "dir1/renamed.txt").mode)
+
+    def test_split_commits_are_streamed(self):
+        first, second = self.createSplitCommits()
+        datastore = DatastoreMock()
+        datastore.streamsFileActions = True
+
+        # Every changed file is handed over on its own
+        maxBytes = ChangedFilesStream.MAX_BYTES
+        ChangedFilesStream.MAX_BYTES = 1
+        try:
+            parsedCommits = self.parseCommits(Config(None, split_threshold=2, rename_limit=1, worker_type='threads'), datastore)
+        finally:
+            ChangedFilesStream.MAX_BYTES = maxBytes
+
+        for strCommitHash, changedFiles in [(first, 10), (second, 7)]:
+            streamedFiles = [file for revisionHash, files in datastore.fileActions if revisionHash == strCommitHash for file in files]
+            self.assertEqual(changedFiles, len(streamedFiles))
+            self.assertEqual(changedFiles, parsedCommits[strCommitHash].streamedChunks)
+            self.assertListEqual([], parsedCommits[strCommitHash].changedFiles)
+
+        # The exact renames are detected across the partitions, before the files are handed over
+        streamedFiles = dict((file.path, file) for revisionHash, files in datastore.fileActions if revisionHash == second for file in files)
+        self.assertEqual(("R", "dir0/moved.txt"), (streamedFiles["dir3/moved.txt"].mode, streamedFiles["dir3/moved.txt"].oldPath))
+        self.assertNotIn("dir0/moved.txt", streamedFiles)
+        self.assertEqual("A", streamedFiles["dir2/renamed.txt"].mode)
+
+class GitParserConfigTest(GitRepositoryTest):
+
+    def setUp(self):
+        GitRepositoryTest.setUp(self)
+        self.first = self.createCommit('refs/heads/master', [], {"test.txt": "test1\n",
+                                                                 "other.txt": "other1\nother2\nother3\n",
+                                                                 "lib/lib.txt": "lib1\n"})
+
+    def parseCommit(self, config, commitId=None):
+        return self.parseCommits(config)[commitId or self.first]
+
+    def test_stats_level(self):
+        commit = self.parseCommit(Config(None, diff_level='stats'))
+
+        testFile = [file for file in commit.changedFiles if file.path == "test.txt"][0]
+        self.assertEqual(1, testFile.linesAdded)
+        self.assertEqual(0, testFile.linesDeleted)
+        self.assertEqual("A", testFile.mode)
+        self.assertListEqual([], testFile.hunks)
+        self.assertEqual(3, self.getFile(commit, "other.txt").linesAdded)
+
+    def test_names_level(self):
+        commit = self.parseCommit(Config(None, diff_level='names'))
+
+        self.assertCountEqual(["test.txt", "other.txt", "lib/lib.txt"], [file.path for file in commit.changedFiles])
+        testFile = [file for file in commit.changedFiles if file.path == "test.txt"][0]
+        self.assertEqual("A", testFile.mode)
+        self.assertEqual(None, testFile.linesAdded)
+        self.assertEqual(None, testFile.linesDeleted)
+        self.assertListEqual([], testFile.hunks)
+
+    def test_thread_workers(self):
+        second = self.createCommit('refs/heads/master', [self.first], {"test.txt": "test1\ntest2\n", "other.txt": "other1\nother3\n"})
+        self.createCommit('refs/heads/master', [second], {"test.txt": "test2\n", "other.txt": "other1\nother3\n", "lib/new.txt": "new\n"})
+
+        def summarize(commits):
+            return dict((commit.id, sorted((file.path, file.mode, file.linesAdded, file.linesDeleted,
+                                            [hunk.content for hunk in file.hunks]) for file in commit.changedFiles))
+                        for commit in commits.values())
+
+        # Threads parse every commit like processes
+        threadCommits = self.parseCommits(Config(None, worker_type='threads'))
+        self.assertEqual(3, len(threadCommits))
+        self.assertEqual(summarize(self.parseCommits(Config(None))), summarize(threadCommits))
+
+        testFile = self.getFile(threadCommits[second], "test.txt")
+        self.assertEqual("+test2\n", testFile.hunks[0].content)
+        self.assertEqual(["-other2\n"], [hunk.content for hunk in self.getFile(threadCommits[second], "other.txt").hunks])
+
+    def createRenameCommit(self):
+        # other.txt is renamed with a small change, test.txt is changed and copied
+        lines = "".join("line%d\n" % (i) for i in range(20))
+        first = self.createCommit('refs/heads/master', [], {"test.txt": lines, "other.txt": "other1\nother2\nother3\nother4\n"})
+        return self.createCommit('refs/heads/master', [first], {"test.txt": lines+"line20\n", "copy.txt": lines+"copy\n",
+                                                                "renamed.txt": "other1\nother2\nother3\nother4\nother5\n"})
+
+    def test_similarity_mode(self):
+        second = self.createRenameCommit()
+
+        commit = self.parseCommit(Config(None), second)
+        self.assertEqual('copies', commit.similarityMode)
+        self.assertEqual(("R", "other.txt"), (self.getFile(commit, "renamed.txt").mode, self.getFile(commit, "renamed.txt").oldPath))
+        self.assertEqual(("C", "test.txt"), (self.getFile(commit, "copy.txt").mode, self.getFile(commit, "copy.txt").oldPath))
+
+        commit = self.parseCommit(Config(None, rename_detection='renames'), second)
+        self.assertEqual('renames', commit.similarityMode)
+        self.assertEqual("R", self.getFile(commit, "renamed.txt").mode)
+        self.assertEqual("A", self.getFile(commit, "copy.txt").mode)
+
+        commit = self.parseCommit(Config(None, rename_detection='off'), second)
+        self.assertEqual('off', commit.similarityMode)
+        self.assertNotIn('R', [file.mode for file in commit.changedFiles])
+        self.assertIn("other.txt", [file.path for file in commit.changedFiles])
+
+        # With more candidate pairs than the square of the rename limit, only identical files are detected
+        commit = self.parseCommit(Config(None, rename_limit=1), second)
+        self.assertEqual('exact', commit.similarityMode)
+        self.assertEqual("A", self.getFile(commit, "renamed.txt").mode)
+
+    def test_path_filters(self):
+        commit = self.parseCommit(Config(None, exclude_paths=['test.txt']))
+        self.assertCountEqual(["other.txt", "lib/lib.txt"], [file.path for file in commit.changedFiles])
+
+        commit = self.parseCommit(Config(None, include_paths=['*.txt'], exclude_paths=['other*']))
+        self.assertCountEqual(["test.txt", "lib/lib.txt"], [file.path for file in commit.changedFiles])
+
+        # A pattern of a directory matches every file below it
+        commit = self.parseCommit(Config(None, exclude_paths=['lib']))
+        self.assertCountEqual(["test.txt", "other.txt"], [file.path for file in commit.changedFiles])
+
+        commit = self.parseCommit(Config(None, include_paths=['lib']))
+        self.assertListEqual(["lib/lib.txt"], [file.path for file in commit.changedFiles])
+        self.assertEqual("+lib1\n", commit.changedFiles[0].hunks[0].content)
+
+    def test_filtered_rename_candidates(self):
+        # lib/lib.txt is deleted and lib/new.txt is added besides the renamed and copied files
+        lines = "".join("line%d\n" % (i) for i in range(20))
+        first = self.createCommit('refs/heads/master', [], {"test.txt": lines, "other.txt": "other1\nother2\nother3\nother4\n",
+                                                            "lib/lib.txt": "lib1\n"})
+        second = self.createCommit('refs/heads/master', [first], {"test.txt": lines+"line20\n", "copy.txt": lines+"copy\n",
+                                                                  "renamed.txt": "other1\nother2\nother3\nother4\nother5\n",
+                                                                  "lib/new.txt": "new\n"})
+
+        # Only the candidates, which pass the path patterns, are counted as sources and targets
+        changes = [change[:2] for change in GitParser.getChanges(self.repository[second])]
+        self.assertEqual((2, 2, 1, 1), CommitParserWorker.countRenameCandidates(changes, 'copies', [], ['lib']))
+        self.assertEqual((1, 2, 1, 1), CommitParserWorker.countRenameCandidates(changes, 'renames', [], ['lib']))
+        self.assertEqual((3, 3, 0, 0), CommitParserWorker.countRenameCandidates(changes, 'copies', [], []))
+
+        # Filtered out candidates are never compared by their content, only identical files are detected
+        commit = self.parseCommit(Config(None, exclude_paths=['lib']), second)
+        self.assertEqual('exact', commit.similarityMode)
+        self.assertEqual("A", self.getFile(commit, "renamed.txt").mode)
+        self.assertCountEqual(["test.txt", "copy.txt", "renamed.txt", "other.txt"], [file.path for file in commit.changedFiles])
+
+        parser = self.createParser(Config(None, exclude_paths=['lib']))
+        self.assertEqual('exact', parser.getPartitionMode(GitParser.getChanges(self.repository[second])))
+
+        # Modified files are no candidates for renames, so that filtering them out keeps the detection of similar files
+        third = self.createCommit('refs/heads/master', [second], {"test.txt": lines, "copy.txt": lines+"copy\n",
+                                                                  "moved.txt": "other1\nother2\nother3\nother4\nother5\nother6\n",
+                                                                  "lib/new.txt": "new2\n"})
+        commit = self.parseCommit(Config(None, rename_detection='renames', exclude_paths=['lib']), third)
+        self.assertEqual('renames', commit.similarityMode)
+        self.assertEqual(("R", "renamed.txt"), (self.getFile(commit, "moved.txt").mode, self.getFile(commit, "moved.txt").oldPath))
+        self.assertNotIn("lib/new.txt", [file.path for file in commit.changedFiles])
+
+    def test_ref_patterns(self):
+        self.repository.references.create('refs/heads/testbranch1', self.first)
+        self.repository.references.create('refs/pull/1/head', self.first)
+        feature = self.createCommit('refs/heads/testbranch2', [self.first], {"test.txt": "test1\ntest2\n"})
+
+        commit = self.parseCommit(Config(None))
+        self.assertCountEqual(["refs/heads/master", "refs/heads/testbranch1", "refs/heads/testbranch2", "refs/pull/1/head"],
+                              [branch.name for branch in commit.branches])
+
+        commit = self.parseCommit(Config(None, ref_exclude=['refs/pull/*']))
+        self.assertCountEqual(["refs/heads/master", "refs/heads/testbranch1", "refs/heads/testbranch2"],
+                              [branch.name for branch in commit.branches])
+
+        # The commits, which are only reachable from excluded references, are not parsed
+        parsedCommits = self.parseCommits(Config(None, ref_include=['refs/heads/*'], ref_exclude=['refs/heads/testbranch*']))
+        self.assertListEqual([self.first], list(parsedCommits.keys()))
+        self.assertListEqual(["refs/heads/master"], [branch.name for branch in parsedCommits[self.first].branches])
+
+        parsedCommits = self.parseCommits(Config(None, ref_include=['refs/heads/testbranch2']))
+        self.assertCountEqual([self.first, feature], parsedCommits.keys())
+        self.assertListEqual(["refs/heads/testbranch2"], [branch.name for branch in parsedCommits[feature].branches])
+
+    def test_branch_subset(self):
+        second = self.createCommit('refs/heads/master', [self.first], {"test.txt": "test1\ntest2\n"})
+        feature = self.createCommit('refs/heads/feature', [self.first], {"feature.txt": "feature1\n"})
+
+        parsedCommits = self.parseCommits(Config(None, branches=['master']))
+        self.assertCountEqual([self.first, second], parsedCommits.keys())
+        self.assertListEqual(["refs/heads/master"], [branch.name for branch in parsedCommits[self.first].branches])
+
+        parsedCommits = self.parseCommits(Config(None, branches=['refs/heads/feat*']))
+        self.assertCountEqual([self.first, feature], parsedCommits.keys())
+        self.assertListEqual(["refs/heads/feature"], [branch.name for branch in parsedCommits[feature].branches])
+
+    def test_date_range(self):
+        second = self.createCommit('refs/heads/master', [self.first], {"test.txt": "test1\ntest2\n"})
+        third = self.createCommit('refs/heads/master', [second], {"test.txt": "test1\ntest2\ntest3\n"})
+
+        # The commits are one minute apart: 2016-01-21T00:01:00, 00:02:00 and 00:03:00
+        parsedCommits = self.parseCommits(Config(None, since="2016-01-21T00:02:00"))
+        self.assertCountEqual([second, third], parsedCommits.keys())
+
+        parsedCommits = self.parseCommits(Config(None, since="2016-01-21T00:02:00", until="2016-01-21T00:02:00"))
+        self.assertListEqual([second], list(parsedCommits.keys()))
+
+        # A date without time includes the whole day
+        parsedCommits = self.parseCommits(Config(None, until="2016-01-21"))
+        self.assertCountEqual([self.first, second, third], parsedCommits.keys())
+        self.assertEqual({}, self.parseCommits(Config(None, until="2016-01-20")))
+
+    def test_stats_only_size(self):
+        commit = self.parseCommit(Config(None, stats_only_size=10))
+
+        # test.txt has 6 bytes, other.txt 21 bytes
+        testFile = self.getFile(commit, "test.txt")
+        self.assertEqual(1, testFile.linesAdded)
+        self.assertEqual("+test1\n", testFile.hunks[0].content)
+
+        otherFile = self.getFile(commit, "other.txt")
+        self.assertEqual(3, otherFile.linesAdded)
+        self.assertEqual(0, otherFile.linesDeleted)
+        self.assertListEqual([], otherFile.hunks)
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+import pickle
+
+from pyvcsshark.datastores.idcache import IdCache
+
+
+class IdCacheTest(unittest.TestCase):
+
+    def test_least_recently_used_is_dropped(self):
+        cache = IdCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(1, cache.get("a"))
+
+        cache.put("c", 3)
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(1, cache.get("a"))
+        self.assertEqual(3, cache.get("c"))
+
+    def test_warm(self):
+        cache = IdCache(2)
+        cache.warm([(("name", "email"), 1), ("b", 2), ("c", 3)])
+        self.assertEqual(1, cache.get(("name", "email")))
+        self.assertEqual(2, cache.get("b"))
+        self.assertIsNone(cache.get("c"))
+
+        # The storage processes get a copy of the warmed cache
+        self.assertEqual(2, pickle.loads(pickle.dumps(cache)).get("b"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+import threading
+
+from pyvcsshark.datastores.memorybudget import MemoryBudget
+
+
+class MemoryBudgetTest(unittest.TestCase):
+
+    def test_acquire_and_release(self):
+        budget = MemoryBudget(100)
+        budget.acquire(60)
+        budget.acquire(40)
+        self.assertEqual(100, budget.usedBytes)
+        self.assertEqual(2, budget.pendingBatches)
+        self.assertTrue(budget.isUsedUp(1))
+
+        budget.release(60)
+        self.assertEqual(40, budget.usedBytes)
+        self.assertEqual(1, budget.pendingBatches)
+        self.assertFalse(budget.isUsedUp(60))
+
+    def test_producer_blocks_while_used_up(self):
+        budget = MemoryBudget(100)
+        budget.acquire(80)
+
+        producer = threading.Thread(target=budget.acquire, args=(50,))
+        producer.start()
+        producer.join(0.2)
+        self.assertTrue(producer.is_alive())
+
+        budget.release(80)
+        producer.join(5)
+        self.assertFalse(producer.is_alive())
+        self.assertEqual(50, budget.usedBytes)
+
+    def test_oversized_batch_passes_if_nothing_is_in_flight(self):
+        budget = MemoryBudget(100)
+        budget.acquire(500)
+        self.assertEqual(500, budget.usedBytes)
+
+
+if __name__ == "__main__":
+    unittest.main()
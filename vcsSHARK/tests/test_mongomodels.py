@@ -0,0 +1,33 @@
+import unittest
+
+from pyvcsshark.dbmodels.models import Hunk
+from pyvcsshark.dbmodels.mongomodels import FileAction, EmbeddedHunk
+
+
+class FileActionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.hunks = [Hunk(1, 2, 1, 0, "+test1\n+test2\n"), Hunk(10, 1, 8, 1, "-alt\n+neu ä\n")]
+
+    def assertHunksEqual(self, hunks):
+        self.assertEqual([(hunk.old_start, hunk.old_lines, hunk.new_start, hunk.new_lines, hunk.content) for hunk in self.hunks],
+                         [(hunk.old_start, hunk.old_lines, hunk.new_start, hunk.new_lines, hunk.content) for hunk in hunks])
+
+    def test_compressed_hunks(self):
+        blob, compression = FileAction.compressHunks(self.hunks)
+        self.assertIn(compression, FileAction.COMPRESSIONS)
+        self.assertHunksEqual(FileAction.decompressHunks(blob, compression))
+
+        fileAction = FileAction(compressedHunks=blob, hunkCompression=compression)
+        self.assertHunksEqual(fileAction.getHunks())
+        self.assertIs(fileAction.getHunks(), fileAction.getHunks())
+
+    def test_embedded_hunks(self):
+        fileAction = FileAction(hunks=[EmbeddedHunk(old_start=hunk.old_start, old_lines=hunk.old_lines, new_start=hunk.new_start,
+                                                    new_lines=hunk.new_lines, content=hunk.content) for hunk in self.hunks])
+        self.assertHunksEqual(fileAction.getHunks())
+        self.assertEqual([], FileAction().getHunks())
+
+
+if __name__ == "__main__":
+    unittest.main()
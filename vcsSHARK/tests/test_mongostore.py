@@ -10,10 +10,14 @@ import datetime
 from pymongo import MongoClient
 import uuid
 
+from concurrent.futures import ThreadPoolExecutor
+from mongoengine import connect
+
 from pyvcsshark.config import Config
-from pyvcsshark.datastores.mongostore import MongoStore
+from pyvcsshark.datastores.mongostore import MongoStore, CommitStorageProcess
 from pyvcsshark.dbmodels.models import CommitModel, BranchModel, TagModel,\
     PeopleModel, FileModel, Hunk
+from pyvcsshark.dbmodels.mongomodels import Project, FileAction
 
 
 class Test(unittest.TestCase):
@@ -230,6 +234,152 @@ class Test(unittest.TestCase):
         self.assertEqual('tag release 1', tag['message'])
         self.assertEqual(ppl['_id'], tag['taggerId'])
 
+class CommitStorageProcessTest(unittest.TestCase):
+    """ Stores the commits in the test process itself, the storage processes are not started """
+
+    config = None
+    mongoClient = None
+
+    @classmethod
+    def setUpClass(cls):
+        logging.basicConfig(level=logging.ERROR)
+
+        cls.config = Config(None)
+        cls.config.load_from_file(os.path.dirname(os.path.realpath(__file__))+"/data/used_test_config.cfg")
+
+        cls.mongoClient = MongoClient(cls.config.db_hostname, cls.config.db_port)
+        cls.mongoClient.admin.authenticate(cls.config.db_user, cls.config.db_password, mechanism='SCRAM-SHA-1')
+
+    def setUp(self):
+        self.mongoClient.drop_database(self.config.db_database)
+        self.db = self.mongoClient[self.config.db_database]
+
+        connect(self.config.db_database, host=self.config.db_hostname, port=self.config.db_port)
+        self.projectId = Project(url="local/"+str(uuid.uuid4()), name="test", repositoryType="git").save().id
+
+    def createProcess(self, **kwargs):
+        process = CommitStorageProcess(None, None, self.projectId, None, self.config.db_database, self.config.db_hostname,
+                                       self.config.db_port, **kwargs)
+        process.executor = ThreadPoolExecutor(max_workers=2)
+        return process
+
+    def createCommit(self, revisionHash, changedFiles, streamedChunks=0):
+        people = PeopleModel("Fabian Trautsch", "ftrautsch@googlemail.com")
+        return CommitModel(revisionHash, set([BranchModel('refs/heads/master')]), [], [], people, people, "testCommit", changedFiles,
+                           1453380157, 60, 1453380357, 60, streamedChunks=streamedChunks)
+
+    def test_streamed_commit_is_completed_by_the_last_part(self):
+        first = self.createProcess()
+        second = self.createProcess()
+
+        # The commit arrives before its parts, which are stored by different processes
+        first.storeCommit(self.createCommit("1", [FileModel("c.txt", mode='A')], streamedChunks=2))
+        second.storeFileActions("1", [FileModel("a.txt", mode='A')])
+        commit = self.db.commit.find_one({'revisionHash': "1"})
+        self.assertNotIn('committerDate', commit)
+        self.assertEqual(2, len(commit['fileActionIds']))
+        store = MongoStore()
+        store.projectId = self.projectId
+        self.assertNotIn("1", store.getStoredRevisionHashes())
+
+        first.storeFileActions("1", [FileModel("b.txt", mode='A')])
+        commit = self.db.commit.find_one({'revisionHash': "1"})
+        self.assertEqual(datetime.datetime.utcfromtimestamp(1453380357), commit['committerDate'])
+        self.assertEqual(3, len(commit['fileActionIds']))
+        self.assertEqual(3, self.db.file_action.find({'revisionHash': "1"}).count())
+        for field in ('streamedCommitterDate', 'fileActionChunks', 'storedFileActionChunks'):
+            self.assertNotIn(field, commit)
+
+    def test_incomplete_streamed_commit_is_deleted(self):
+        process = self.createProcess()
+        process.storeFileActions("1", [FileModel("a.txt", mode='A', hunks=[Hunk(1, 1, 0, 0, "+a\n")])])
+        process.storeCommit(self.createCommit("1", [], streamedChunks=2))
+
+        # The run was aborted, before the second part was stored
+        self.assertNotIn('committerDate', self.db.commit.find_one({'revisionHash': "1"}))
+        MongoStore().deleteIncompleteCommits(self.projectId)
+        self.assertEqual(0, self.db.commit.find().count())
+        self.assertEqual(0, self.db.file_action.find().count())
+        self.assertEqual(0, self.db.hunk.find().count())
+
+    def test_commits_are_inserted_in_bulk(self):
+        process = self.createProcess()
+        for revisionHash in ["1", "2", "3"]:
+            process.storeCommit(self.createCommit(revisionHash, [FileModel("a.txt", mode='M', hunks=[Hunk(1, 1, 1, 1, "-a\n+%s\n" % (revisionHash))])]))
+
+        # Nothing is written until the flush
+        self.assertEqual(0, self.db.commit.find().count())
+        process.flushCommits()
+        self.assertEqual(3, self.db.commit.find().count())
+        self.assertEqual(3, self.db.file_action.find().count())
+        self.assertEqual(3, self.db.hunk.find().count())
+        self.assertEqual(1, self.db.file.find().count())
+        for commit in self.db.commit.find():
+            fileAction = self.db.file_action.find_one({'_id': commit['fileActionIds'][0]})
+            self.assertEqual(commit['revisionHash'], fileAction['revisionHash'])
+            self.assertEqual(1, self.db.hunk.find({'_id': {'$in': fileAction['hunkIds']}}).count())
+
+    def test_duplicate_commit_leaves_no_hunks(self):
+        other = self.createProcess()
+        other.storeCommit(self.createCommit("1", [FileModel("a.txt", mode='A', hunks=[Hunk(1, 1, 0, 0, "+a\n")])]))
+        other.flushCommits()
+
+        # The file actions of the duplicate are inserted early, when the parts of another commit are stored
+        process = self.createProcess()
+        process.storeCommit(self.createCommit("1", [FileModel("a.txt", mode='A', hunks=[Hunk(1, 1, 0, 0, "+a\n")])]))
+        process.storeFileActions("2", [FileModel("b.txt", mode='A', hunks=[Hunk(1, 1, 0, 0, "+b\n")])])
+        process.flushCommits()
+
+        self.assertEqual(1, self.db.commit.find({'revisionHash': "1"}).count())
+        self.assertEqual(1, self.db.file_action.find({'revisionHash': "1"}).count())
+        self.assertEqual(2, self.db.hunk.find().count())
+        hunkIds = [hunkId for fileAction in self.db.file_action.find() for hunkId in fileAction['hunkIds']]
+        self.assertCountEqual(hunkIds, [hunk['_id'] for hunk in self.db.hunk.find()])
+
+    def test_hunk_ids_are_deterministic(self):
+        process = self.createProcess(hunkDeduplication=True)
+        hunkId = process.getHunkId(Hunk(1, 1, 0, 0, "+a\n"))
+        self.assertEqual(hunkId, process.getHunkId(Hunk(1, 1, 0, 0, "+a\n")))
+        self.assertEqual(hunkId, self.createProcess(hunkDeduplication=True).getHunkId(Hunk(1, 1, 0, 0, "+a\n")))
+        self.assertNotEqual(hunkId, process.getHunkId(Hunk(1, 1, 0, 0, "+b\n")))
+        self.assertNotEqual(hunkId, process.getHunkId(Hunk(2, 1, 0, 0, "+a\n")))
+
+        # Without deduplication, every hunk gets a new id
+        process = self.createProcess()
+        self.assertNotEqual(process.getHunkId(Hunk(1, 1, 0, 0, "+a\n")), process.getHunkId(Hunk(1, 1, 0, 0, "+a\n")))
+
+    def test_referenced_hunks_are_kept(self):
+        process = self.createProcess(hunkDeduplication=True)
+        for revisionHash in ["1", "2"]:
+            process.storeCommit(self.createCommit(revisionHash, [FileModel("a.txt", mode='A', hunks=[Hunk(1, 1, 0, 0, "+a\n")])]))
+        process.flushCommits()
+        self.assertEqual(1, self.db.hunk.find().count())
+
+        hunkIds = MongoStore.deleteFileActions(FileAction.objects(revisionHash="1"))
+        self.assertEqual(1, len(hunkIds))
+        MongoStore.deleteHunks(hunkIds)
+        self.assertEqual(1, self.db.hunk.find().count())
+
+        MongoStore.deleteHunks(MongoStore.deleteFileActions(FileAction.objects(revisionHash="2")))
+        self.assertEqual(0, self.db.hunk.find().count())
+
+    def test_duplicate_commit_keeps_deduplicated_hunks(self):
+        other = self.createProcess(hunkDeduplication=True)
+        other.storeCommit(self.createCommit("1", [FileModel("a.txt", mode='A', hunks=[Hunk(1, 1, 0, 0, "+a\n")])]))
+        other.flushCommits()
+
+        process = self.createProcess(hunkDeduplication=True)
+        process.storeCommit(self.createCommit("1", [FileModel("a.txt", mode='A', hunks=[Hunk(1, 1, 0, 0, "+a\n"),
+                                                                                      Hunk(3, 1, 2, 0, "+b\n")])]))
+        process.flushCommits()
+
+        # The hunks could be referenced by file actions of other processes, they are only deleted after all processes stopped
+        self.assertEqual(2, self.db.hunk.find().count())
+        self.assertEqual(2, len(process.keptHunkIds))
+        MongoStore.deleteHunks(process.keptHunkIds)
+        self.assertEqual(1, self.db.hunk.find().count())
+        self.assertEqual(1, self.db.file_action.find().count())
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,71 @@
+import unittest
+import json
+import pickle
+
+from pyvcsshark.parser.timingreport import TimingReport
+
+
+class TimingReportTest(unittest.TestCase):
+
+    def test_add_commit(self):
+        report = TimingReport()
+        report.addCommit("a", {'diff': 0.002, 'hunks': 0.5}, 3, 1000)
+        report.addCommit("b", {'diff': 0.0005, 'find_similar': 200}, 1, 10)
+
+        self.assertEqual(2, report.commits)
+        self.assertAlmostEqual(0.0025, report.totals['diff'])
+        self.assertEqual(1, report.histograms['diff'][0])
+        self.assertEqual(1, report.histograms['diff'][1])
+        self.assertEqual(1, report.histograms['find_similar'][-1])
+
+        # Stages without a time count as 0 seconds
+        self.assertEqual(1, report.histograms['hunks'][0])
+        self.assertEqual(1, report.histograms['hunks'][report.getBucket(0.5)])
+        self.assertEqual(2, report.histograms['handoff'][0])
+
+    def test_slowest_commits(self):
+        report = TimingReport(top=2)
+        for index, seconds in enumerate([0.1, 3, 0.5, 2]):
+            report.addCommit(str(index), {'diff': seconds}, 1, 100)
+
+        result = report.toDict()
+        self.assertEqual(["1", "3"], [record['revisionHash'] for record in result['slowestCommits']])
+        self.assertEqual({'revisionHash': "1", 'total': 3, 'files': 1, 'bytes': 100, 'partition': False,
+                          'diff': 3, 'find_similar': 0.0, 'hunks': 0.0, 'handoff': 0.0}, result['slowestCommits'][0])
+
+    def test_equal_totals(self):
+        # Partitions of a split commit share the revision hash and can take the same time
+        report = TimingReport(top=2)
+        for index in range(4):
+            report.addCommit("a", {'diff': 1}, index, 100, partition=True)
+
+        result = report.toDict()
+        self.assertEqual(2, len(result['slowestCommits']))
+        self.assertEqual([3, 2], [record['files'] for record in result['slowestCommits']])
+
+        other = TimingReport(top=2)
+        other.addCommit("a", {'diff': 1}, 5, 100, partition=True)
+        report.merge(pickle.loads(pickle.dumps(other)))
+        self.assertEqual(2, len(report.toDict()['slowestCommits']))
+
+    def test_merge(self):
+        report = TimingReport(top=2)
+        report.addCommit("a", {'diff': 1}, 1, 100)
+        other = TimingReport(top=2)
+        other.addCommit("b", {'diff': 3}, 1, 100)
+        other.addCommit("c", {'diff': 2}, 1, 100)
+
+        # The reports of the parsing processes are pickled
+        report.merge(pickle.loads(pickle.dumps(other)))
+        self.assertEqual(3, report.commits)
+        self.assertEqual(6, report.totals['diff'])
+        self.assertEqual(3, sum(report.histograms['diff']))
+
+        result = json.loads(json.dumps(report.toDict()))
+        self.assertEqual(["b", "c"], [record['revisionHash'] for record in result['slowestCommits']])
+        self.assertEqual(len(TimingReport.BUCKETS)+1, len(result['stages']['diff']['histogram']))
+        self.assertIsNone(result['stages']['diff']['histogram'][-1]['le'])
+
+
+if __name__ == "__main__":
+    unittest.main()